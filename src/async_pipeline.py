@@ -0,0 +1,162 @@
+# src/async_pipeline.py
+import os
+import time
+import asyncio
+
+from src.search_client import serpapi_search
+from src.synthesizer import synthesize_stream
+from src.image_client import fetch_image
+from src.pipeline import gather_context
+from src.image_prep import box_to_pixels
+from src.ppt_generator import open_deck, render_slide, save_deck, new_image_stats
+from src.template_profile import template_hash
+from src.deck_spec import build_spec, write_spec as save_spec, spec_path_for, DECK_SPEC
+from src.metrics import get_logger, span
+
+log = get_logger(__name__)
+
+# Maximum in-flight calls per external service
+ASYNC_LLM_CONCURRENCY = int(os.getenv("ASYNC_LLM_CONCURRENCY", "2"))
+ASYNC_SEARCH_CONCURRENCY = int(os.getenv("ASYNC_SEARCH_CONCURRENCY", "4"))
+ASYNC_IMAGE_CONCURRENCY = int(os.getenv("ASYNC_IMAGE_CONCURRENCY", "8"))
+
+
+class ServiceLimits:
+    """Per-service semaphores shared by every deck running on the same event loop."""
+
+    def __init__(self, llm=None, search=None, images=None):
+        self.llm = asyncio.Semaphore(llm or ASYNC_LLM_CONCURRENCY)
+        self.search = asyncio.Semaphore(search or ASYNC_SEARCH_CONCURRENCY)
+        self.images = asyncio.Semaphore(images or ASYNC_IMAGE_CONCURRENCY)
+
+
+async def _call(semaphore, func, *args, **kwargs):
+    """Runs a blocking client call in a worker thread under a service limit."""
+    async with semaphore:
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+
+def _limited(loop, semaphore, func):
+    """
+    Wraps a blocking client call for use from a worker thread: each call
+    waits for the event loop's service limit before it runs.
+    """
+    def call(*args, **kwargs):
+        return asyncio.run_coroutine_threadsafe(_call(semaphore, func, *args, **kwargs), loop).result()
+    return call
+
+
+async def generate_deck_async(topic, output, template, llm_client, limits=None, max_search_results=None,
+                              context_budget=None, fetch_pages=None, topic_reuse=None, write_spec=None,
+                              subqueries=None):
+    """
+    Async variant of pipeline.generate_deck.
+
+    The template is opened while the search query is generated, slides are
+    streamed out of the LLM, each slide's image lookup starts as soon as the
+    slide is parsed, and slides are rendered in order while later slides and
+    images are still in flight. Returns stage timings.
+    """
+    limits = limits or ServiceLimits()
+    timings = {}
+    started = time.perf_counter()
+
+    # The template does not depend on any network stage, so load it alongside them
+    deck_task = asyncio.create_task(asyncio.to_thread(open_deck, template))
+
+    # Query generation and search run in a worker thread; their LLM and search calls
+    # still take slots from this loop's service limits, shared with every other deck
+    loop = asyncio.get_running_loop()
+    search_context = await asyncio.to_thread(
+        gather_context, topic, llm_client, timings, max_search_results=max_search_results,
+        context_budget=context_budget, fetch_pages=fetch_pages, topic_reuse=topic_reuse, subqueries=subqueries,
+        generate=_limited(loop, limits.llm, llm_client.generate), search=_limited(loop, limits.search, serpapi_search))
+
+    deck = await deck_task
+    if deck is None:
+        return timings
+    prs, layout, image_box = deck
+    target_size = box_to_pixels(*image_box)
+
+    start = time.perf_counter()
+    log.info("🧠 Synthesizing content via LLM (streaming)...")
+    slide_queue = asyncio.Queue()
+    render_queue = asyncio.Queue()
+
+    def produce_slides():
+        # Runs in a worker thread; hands each streamed slide to the event loop
+        try:
+            with span("synthesize", slides=0) as attrs:
+                for slide_data in synthesize_stream(topic, search_context, llm_client):
+                    attrs["slides"] += 1
+                    loop.call_soon_threadsafe(slide_queue.put_nowait, slide_data)
+        finally:
+            loop.call_soon_threadsafe(slide_queue.put_nowait, None)
+
+    async def dispatch_images():
+        # Start each slide's image lookup the moment the slide is parsed
+        while True:
+            slide_data = await slide_queue.get()
+            if slide_data is None:
+                timings["synthesize"] = time.perf_counter() - start
+                await render_queue.put(None)
+                return
+            if "first_slide" not in timings:
+                timings["first_slide"] = time.perf_counter() - start
+            image_task = asyncio.create_task(
+                _call(limits.images, fetch_image, slide_data.get("title", ""), target_size=target_size))
+            await render_queue.put((slide_data, image_task))
+
+    producer = asyncio.create_task(_call(limits.llm, produce_slides))
+    dispatcher = asyncio.create_task(dispatch_images())
+
+    log.info("📑 Generating PowerPoint deck...")
+    with span("render", slides=0) as attrs:
+        image_stats = new_image_stats()
+        template_id = template_hash(template)
+        rendered = []
+        pending = []
+        try:
+            # Render in slide order while later slides and images are still in flight
+            while True:
+                item = await render_queue.get()
+                if item is None:
+                    break
+                slide_data, image_task = item
+                pending.append(image_task)
+                try:
+                    image_path = await image_task
+                except Exception as e:
+                    log.warning(f"⚠️ Image lookup failed for '{slide_data.get('title', '')}': {e}")
+                    image_path = None
+                # Pillow, text fitting and python-pptx are CPU-bound: keep them off the event loop so other
+                # decks' streams and searches keep moving. Slides render one at a time, in order, so the
+                # presentation is never used by two threads at once
+                rendered.append(await asyncio.to_thread(render_slide, prs, slide_data, layout, image_path,
+                                                        image_stats, template_id))
+                attrs["slides"] += 1
+            await producer
+            await dispatcher
+        finally:
+            for task in pending + [dispatcher]:
+                task.cancel()
+
+        await asyncio.to_thread(save_deck, prs, output, image_stats)
+    if DECK_SPEC if write_spec is None else write_spec:
+        save_spec(spec_path_for(output), build_spec(topic, template, output, rendered))
+    timings["render"] = time.perf_counter() - start
+    timings["total"] = time.perf_counter() - started
+    return timings
+
+
+async def generate_decks_async(jobs, llm_client, limits=None):
+    """
+    Runs several (topic, output, template) jobs concurrently on one event loop,
+    sharing the per-service limits. Returns one result per job, in order.
+    """
+    limits = limits or ServiceLimits()
+    return await asyncio.gather(
+        *(generate_deck_async(topic, output, template, llm_client, limits=limits)
+          for topic, output, template in jobs),
+        return_exceptions=True,
+    )
@@ -0,0 +1,171 @@
+# src/batch.py
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from src import rate_limit
+from src.config import load_env
+from src.metrics import get_logger, setup_logging
+
+load_env()
+
+log = get_logger(__name__)
+
+# Job fields that may be overridden per topic and are passed to generate_deck
+JOB_OVERRIDES = {"image_workers", "max_search_results", "context_budget", "fetch_pages", "topic_reuse",
+                 "subqueries"}
+
+# One LLM client per worker process (or per batch in thread mode)
+_worker_llm_client = None
+
+
+def _slugify(text):
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", text).strip("_")
+    return slug[:80] or "deck"
+
+
+def read_jobs(path, default_template, output_dir):
+    """
+    Reads batch jobs from a .jsonl file ({"topic", "output", "template",
+    "overrides"} per line) or a plain text file with one topic per line.
+    """
+    jobs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if path.endswith(".jsonl"):
+                job = json.loads(line)
+            else:
+                job = {"topic": line}
+            if not job.get("topic"):
+                raise ValueError(f"{path}:{line_number}: job has no topic")
+            job.setdefault("template", default_template)
+            job.setdefault("output", os.path.join(output_dir, f"{_slugify(job['topic'])}.pptx"))
+            unknown = set(job.get("overrides", {})) - JOB_OVERRIDES
+            if unknown:
+                raise ValueError(f"{path}:{line_number}: unsupported overrides: {', '.join(sorted(unknown))}")
+            job["id"] = len(jobs)
+            jobs.append(job)
+    return jobs
+
+
+def _init_worker(cache, refresh, log_level=None, shared_limits=False):
+    """Builds the LLM client once per worker so every job in it reuses it."""
+    global _worker_llm_client
+    # Pipeline modules are imported here so `--help` and job parsing stay fast
+    from src.llm_client import LLMClient
+
+    if log_level:
+        setup_logging(log_level)
+    if shared_limits:
+        # Worker processes draw from one set of provider quotas
+        rate_limit.configure("sqlite")
+    _worker_llm_client = LLMClient(cache=cache, refresh=refresh)
+
+
+def run_job(job):
+    """Runs one job and returns its manifest record; never raises."""
+    record = {"id": job["id"], "topic": job["topic"], "output": job["output"], "template": job["template"]}
+    start = time.perf_counter()
+    record["started_at"] = time.time()
+    try:
+        from src.pipeline import generate_deck
+
+        if not job["template"]:
+            raise ValueError("no template given for job")
+        output_dir = os.path.dirname(job["output"])
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        # A deck left from an earlier run must not pass for this job's output
+        if os.path.exists(job["output"]):
+            os.remove(job["output"])
+        # Batch jobs yield provider quota to interactive requests unless they ask otherwise
+        with rate_limit.priority(job.get("priority", "batch")):
+            record["timings"] = generate_deck(job["topic"], job["output"], job["template"], _worker_llm_client,
+                                              **job.get("overrides", {}))
+        if not os.path.exists(job["output"]):
+            raise RuntimeError("deck was not saved")
+        record["status"] = "ok"
+    except (Exception, SystemExit) as e:
+        record["status"] = "failed"
+        record["error"] = f"{type(e).__name__}: {e}"
+        record["traceback"] = traceback.format_exc()
+    record["elapsed"] = time.perf_counter() - start
+    return record
+
+
+def run_batch(jobs, manifest_path, workers=2, mode="process", cache=True, refresh=False, log_level=None):
+    """
+    Runs jobs on a process or thread pool and appends one JSON record per
+    finished job to manifest_path. Returns the list of records.
+    """
+    if mode == "process":
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache, refresh, log_level, True))
+    else:
+        # Threads share one client, HTTP pool and template cache
+        _init_worker(cache, refresh)
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+
+    records = []
+    manifest_dir = os.path.dirname(manifest_path)
+    if manifest_dir:
+        os.makedirs(manifest_dir, exist_ok=True)
+    with executor, open(manifest_path, "a", encoding="utf-8") as manifest:
+        futures = {executor.submit(run_job, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                # Worker crashed (e.g. the process died); the batch carries on
+                record = {"id": job["id"], "topic": job["topic"], "output": job["output"],
+                          "status": "failed", "error": f"{type(e).__name__}: {e}"}
+            records.append(record)
+            manifest.write(json.dumps(record) + "\n")
+            manifest.flush()
+            icon = "✅" if record["status"] == "ok" else "❌"
+            print(f"{icon} [{len(records)}/{len(jobs)}] {job['topic']} -> {record['status']}")
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate many decks from a topic list")
+    parser.add_argument("--jobs", required=True, help="Topics file (.txt, one per line) or .jsonl jobs")
+    parser.add_argument("--template", default=None, help="Default PowerPoint template path")
+    parser.add_argument("--output-dir", default="decks", help="Directory for decks without an explicit output")
+    parser.add_argument("--manifest", default=None, help="Result manifest path (default <output-dir>/manifest.jsonl)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Number of parallel workers")
+    parser.add_argument("--mode", choices=["process", "thread"], default="process", help="Worker pool type")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write cached LLM responses")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached LLM responses and store fresh ones")
+    parser.add_argument("--log-level", default="WARNING",
+                        help="Logging level for per-deck progress (default WARNING keeps batch output short)")
+    args = parser.parse_args(argv)
+    setup_logging(args.log_level)
+
+    try:
+        jobs = read_jobs(args.jobs, args.template, args.output_dir)
+    except (OSError, ValueError) as e:
+        log.error(f"❌ Could not read jobs: {e}")
+        sys.exit(1)
+
+    manifest_path = args.manifest or os.path.join(args.output_dir, "manifest.jsonl")
+    start = time.perf_counter()
+    records = run_batch(jobs, manifest_path, workers=args.workers, mode=args.mode,
+                        cache=not args.no_cache, refresh=args.refresh, log_level=args.log_level)
+    failed = sum(1 for record in records if record["status"] != "ok")
+    print(f"✅ Batch finished in {time.perf_counter() - start:.1f}s: {len(records) - failed} ok, {failed} failed. "
+          f"Manifest: {manifest_path}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+# src/benchmark.py
+"""
+Offline benchmark for the full generation pipeline.
+
+The LLM, SerpAPI and Pexels calls are replaced by deterministic stand-ins
+with configurable latency, so timings measure our own code. Each case runs
+in a fresh process to get a clean peak RSS. Results are printed (or written)
+as JSON so they can be compared across commits:
+
+    python -m src.benchmark --slides 7 50 500 --output bench.json
+
+Large decks with one distinct image per slide (time and peak memory at
+each size):
+
+    python -m src.benchmark --slides 10 100 1000 --templates default --images 1000 --image-size 640 480
+
+Cases run with the CLI defaults (slide cache and deck spec on) against an
+empty cache and no prepared images. `--slide-cache cold warm off` reports a first run, a repeat
+run and a run without the slide cache side by side.
+"""
+import os
+import sys
+import json
+import time
+import re
+import asyncio
+import argparse
+import platform
+import threading
+import queue
+import shutil
+import resource
+import tempfile
+import subprocess
+import multiprocessing
+from contextlib import contextmanager, redirect_stdout
+
+DEFAULT_SLIDE_COUNTS = [7, 50, 500]
+TEMPLATE_KINDS = ["default", "advanced"]
+SYNTHETIC_IMAGE_COUNT = 8
+SYNTHETIC_IMAGE_SIZE = (2400, 1600)
+# cold: empty cache, as on a first run; warm: timed after an untimed identical run; off: SLIDE_CACHE=0
+SLIDE_CACHE_MODES = ["cold", "warm", "off"]
+
+# CLI invocations timed from a cold interpreter, and the wall time each may take
+COLD_START_COMMANDS = [["--help"], ["generate", "--help"], ["cache", "--help"], ["images", "--help"]]
+COLD_START_BUDGET_SECONDS = float(os.getenv("COLD_START_BUDGET_SECONDS", "0.5"))
+# Modules that a command which never talks to Gemini or renders a deck should not import
+HEAVY_MODULES = ["google.generativeai", "pptx", "PIL", "requests"]
+# How often an isolated case's process is checked for having died without a result
+CASE_POLL_SECONDS = 1.0
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeLLMClient:
+    """Deterministic LLMClient stand-in that returns `slide_count` slides."""
+
+    def __init__(self, slide_count, latency=0.0, stream_chunks=4):
+        self.slide_count = slide_count
+        self.latency = latency
+        self.stream_chunks = stream_chunks
+        self.calls = 0
+
+    def _response(self, prompt):
+        if '"slides"' not in prompt:
+            count = re.search(r"Write exactly (\d+) queries", prompt)
+            if count:
+                return "\n".join(f"offline benchmark search query {i + 1}" for i in range(int(count.group(1))))
+            return "offline benchmark search query"
+        slides = []
+        for i in range(self.slide_count):
+            slides.append({
+                "title": f"Benchmark Slide {i + 1}: AI in Business",
+                "subtitle": "Synthetic content",
+                "bullets": [f"Point {j + 1} about topic {i + 1} with some detail" for j in range(5)],
+                "notes": " ".join(f"Speaker note sentence {j} for slide {i + 1}." for j in range(12)),
+                "sources": ["https://example.com/source"],
+            })
+        return "```json\n" + json.dumps({"slides": slides}, indent=2) + "\n```"
+
+    def generate(self, prompt, stage=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self._response(prompt)
+
+    def generate_stream(self, prompt, stage=None):
+        self.calls += 1
+        text = self._response(prompt)
+        size = max(1, len(text) // self.stream_chunks)
+        for start in range(0, len(text), size):
+            time.sleep(self.latency / self.stream_chunks)
+            yield text[start:start + size]
+
+
+def make_fake_search(latency):
+    def fake_search(query, num_results=5):
+        time.sleep(latency)
+        # The top two pages are the same for every query, like overview pages across sub-queries
+        return [{"title": f"Result {i} for {query}", "snippet": f"Snippet {i} about {query}.",
+                 "link": f"https://example.com/{i}" if i < 2 else f"https://example.com/{sum(map(ord, query))}/{i}"}
+                for i in range(num_results)]
+    return fake_search
+
+
+def make_fake_fetch_image(image_paths, latency):
+    """Gives each new query the next image in turn, so N images cover N slides without repeats."""
+    assigned = {}
+    lock = threading.Lock()
+
+    def fake_fetch_image(query, save_dir="images", target_size=None):
+        time.sleep(latency)
+        with lock:
+            index = assigned.setdefault(query, len(assigned) % len(image_paths))
+        return image_paths[index]
+    return fake_fetch_image
+
+
+def make_synthetic_images(directory, count=SYNTHETIC_IMAGE_COUNT, size=SYNTHETIC_IMAGE_SIZE):
+    """Writes `count` full-resolution JPEGs, similar in size to Pexels originals."""
+    from PIL import Image
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"synthetic_{i}.jpg")
+        gradient = Image.linear_gradient("L").resize(size)
+        noise = Image.effect_noise(size, 40 + i * 5)
+        image = Image.merge("RGB", (gradient, noise, gradient.rotate(90 * (i % 4)).resize(size)))
+        image.save(path, format="JPEG", quality=95)
+        paths.append(path)
+    return paths
+
+
+def make_templates(directory):
+    """Builds the default and advanced templates from create_template.py."""
+    from src.create_template import create_default_template, create_advanced_template
+
+    templates = {
+        "default": os.path.join(directory, "default.pptx"),
+        "advanced": os.path.join(directory, "advanced.pptx"),
+    }
+    create_default_template(templates["default"])
+    create_advanced_template(templates["advanced"])
+    return templates
+
+
+@contextmanager
+def stand_ins(search_fn, image_fn, cache_dir, slide_cache=True):
+    """
+    Swaps the network clients used by the pipeline modules for stand-ins, and
+    the shared cache for a private one in `cache_dir`, so cases never see
+    each other's (or a previous run's) cached slides and template profiles.
+    """
+    import src.cache as cache
+    import src.pipeline as pipeline
+    import src.ppt_generator as ppt_generator
+    import src.async_pipeline as async_pipeline
+
+    patches = [
+        (pipeline, "serpapi_search", search_fn),
+        (async_pipeline, "serpapi_search", search_fn),
+        (ppt_generator, "fetch_image", image_fn),
+        (async_pipeline, "fetch_image", image_fn),
+        (ppt_generator, "SLIDE_CACHE", slide_cache),
+        (cache, "_backend", cache.SQLiteCacheBackend(os.path.join(cache_dir, cache.CACHE_DB_FILE))),
+    ]
+    originals = [(module, name, getattr(module, name)) for module, name, _ in patches]
+    for module, name, value in patches:
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for module, name, value in originals:
+            setattr(module, name, value)
+
+
+def _peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_case(case, result_queue=None):
+    """Runs one benchmark case in the current process and returns its record."""
+    from src.pipeline import generate_deck
+    from src.async_pipeline import generate_deck_async
+    from src.image_prep import PREPARED_DIR
+
+    record = dict(case)
+    try:
+        # Downscaled images from earlier cases would otherwise be reused like a warm cache
+        shutil.rmtree(os.path.join(os.path.dirname(case["images"][0]), PREPARED_DIR), ignore_errors=True)
+        llm_client = FakeLLMClient(case["slides"], latency=case["llm_latency"])
+        search_fn = make_fake_search(case["search_latency"])
+        image_fn = make_fake_fetch_image(case["images"], case["image_latency"])
+        name = f"bench_{case['template_kind']}_{case['slides']}_{case['pipeline']}_{case['slide_cache']}"
+        output = os.path.join(case["workdir"], f"{name}.pptx")
+        cache_dir = tempfile.mkdtemp(prefix=f"{name}-cache-", dir=case["workdir"])
+
+        def run():
+            if case["pipeline"] == "async":
+                return asyncio.run(generate_deck_async("Offline benchmark", output, case["template"], llm_client,
+                                                       **options))
+            return generate_deck("Offline benchmark", output, case["template"], llm_client, **options)
+
+        # Pipeline progress output goes to stderr so stdout stays valid JSON. Every
+        # case runs every stage, with no topic reuse or page fetching
+        options = {"fetch_pages": False, "topic_reuse": False, "subqueries": case["subqueries"]}
+        with stand_ins(search_fn, image_fn, cache_dir, slide_cache=case["slide_cache"] != "off"), \
+                redirect_stdout(sys.stderr):
+            if case["slide_cache"] == "warm":
+                run()
+            rss_before = _peak_rss_bytes()
+            start = time.perf_counter()
+            timings = run()
+            wall = time.perf_counter() - start
+
+        record.update({
+            "status": "ok",
+            "wall_seconds": wall,
+            "stages": timings,
+            "peak_rss_bytes": _peak_rss_bytes(),
+            "peak_rss_before_bytes": rss_before,
+            "pptx_bytes": os.path.getsize(output) if os.path.exists(output) else None,
+            "decks_per_minute": 60.0 / wall if wall else None,
+            "slides_per_second": case["slides"] / wall if wall else None,
+        })
+    except Exception as e:
+        record.update({"status": "failed", "error": f"{type(e).__name__}: {e}"})
+
+    record["images"] = len(case["images"])
+    record.pop("workdir", None)
+    if result_queue is not None:
+        result_queue.put(record)
+    return record
+
+
+def _run_isolated(case, target=run_case):
+    """Runs a case in a fresh spawned process so peak RSS is per case."""
+    context = multiprocessing.get_context("spawn")
+    result_queue = context.Queue()
+    process = context.Process(target=target, args=(case, result_queue))
+    process.start()
+    while True:
+        try:
+            record = result_queue.get(timeout=CASE_POLL_SECONDS)
+            break
+        except queue.Empty:
+            if process.is_alive():
+                continue
+        # The child exited; its record may have arrived just before it did
+        try:
+            record = result_queue.get(timeout=CASE_POLL_SECONDS)
+        except queue.Empty:
+            # Killed (e.g. by the OOM killer) or crashed before reporting
+            record = dict(case, status="failed", error=f"case process exited with code {process.exitcode}",
+                          images=len(case["images"]))
+            record.pop("workdir", None)
+        break
+    process.join()
+    return record
+
+
+def _parse_importtime(stderr):
+    """Returns {module: (self_us, cumulative_us)} from `python -X importtime` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure_cold_start(commands=COLD_START_COMMANDS, repeat=3, budget=COLD_START_BUDGET_SECONDS):
+    """
+    Times `python -m src.main <args>` from a fresh interpreter for each
+    command and records what it imported (via -X importtime).
+    """
+    results = []
+    for args in commands:
+        walls = []
+        modules = {}
+        for _ in range(repeat):
+            start = time.perf_counter()
+            completed = subprocess.run([sys.executable, "-X", "importtime", "-m", "src.main", *args],
+                                       cwd=PROJECT_ROOT, capture_output=True, text=True)
+            walls.append(time.perf_counter() - start)
+            modules = _parse_importtime(completed.stderr)
+        wall = min(walls)
+        slowest = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)[:10]
+        results.append({
+            "command": " ".join(args),
+            "exit_code": completed.returncode,
+            "wall_seconds": wall,
+            "import_seconds": sum(self_us for self_us, _ in modules.values()) / 1e6,
+            "modules_imported": len(modules),
+            "heavy_modules": [name for name in HEAVY_MODULES if name in modules],
+            "slowest_imports": [{"module": name, "cumulative_seconds": cumulative / 1e6}
+                                for name, (_, cumulative) in slowest],
+            "budget_seconds": budget,
+            "within_budget": wall <= budget,
+        })
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(slide_counts=DEFAULT_SLIDE_COUNTS, template_kinds=TEMPLATE_KINDS, pipelines=("sync",),
+                  llm_latency=0.0, search_latency=0.0, image_latency=0.0, repeat=1, isolated=True,
+                  cold_start=True, image_count=SYNTHETIC_IMAGE_COUNT, image_size=SYNTHETIC_IMAGE_SIZE, subqueries=1,
+                  slide_cache_modes=("cold",)):
+    """Runs every (template, slide count, pipeline, slide cache mode) case and returns the JSON report."""
+    results = []
+    cold_start_results = None
+    if cold_start:
+        print("⏱️ Cold-start CLI timings", file=sys.stderr)
+        cold_start_results = measure_cold_start()
+    with tempfile.TemporaryDirectory(prefix="slide-bench-") as workdir:
+        with redirect_stdout(sys.stderr):
+            templates = make_templates(workdir)
+            images = make_synthetic_images(os.path.join(workdir, "images"), image_count, tuple(image_size))
+        for template_kind in template_kinds:
+            for slides in slide_counts:
+                for pipeline in pipelines:
+                    for slide_cache in slide_cache_modes:
+                        for iteration in range(repeat):
+                            case = {
+                                "template_kind": template_kind,
+                                "template": templates[template_kind],
+                                "slides": slides,
+                                "pipeline": pipeline,
+                                "slide_cache": slide_cache,
+                                "iteration": iteration,
+                                "llm_latency": llm_latency,
+                                "search_latency": search_latency,
+                                "image_latency": image_latency,
+                                "subqueries": subqueries,
+                                "images": images,
+                                "workdir": workdir,
+                            }
+                            print(f"⏱️ {template_kind} template, {slides} slides, {pipeline} pipeline, "
+                                  f"{slide_cache} slide cache (run {iteration + 1}/{repeat})", file=sys.stderr)
+                            record = _run_isolated(case) if isolated else run_case(case)
+                            record.pop("template", None)
+                            results.append(record)
+
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.time(),
+        "cold_start": cold_start_results,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark")
+    parser.add_argument("--slides", type=int, nargs="+", default=DEFAULT_SLIDE_COUNTS, help="Deck sizes to run")
+    parser.add_argument("--templates", nargs="+", choices=TEMPLATE_KINDS, default=TEMPLATE_KINDS,
+                        help="Generated templates to run against")
+    parser.add_argument("--pipelines", nargs="+", choices=["sync", "async"], default=["sync"],
+                        help="Pipeline variants to run")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Injected seconds per LLM call")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="Injected seconds per search call")
+    parser.add_argument("--image-latency", type=float, default=0.0, help="Injected seconds per image lookup")
+    parser.add_argument("--images", type=int, default=SYNTHETIC_IMAGE_COUNT,
+                        help="Distinct synthetic images, handed out one per slide in turn")
+    parser.add_argument("--image-size", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"),
+                        default=list(SYNTHETIC_IMAGE_SIZE), help="Synthetic image size in pixels")
+    parser.add_argument("--subqueries", type=int, default=1, help="Search queries per deck, searched concurrently")
+    parser.add_argument("--slide-cache", nargs="+", choices=SLIDE_CACHE_MODES, default=["cold"],
+                        help="Slide cache modes to run: cold (the default first run), warm (a repeat run) or off")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case")
+    parser.add_argument("--in-process", action="store_true", help="Run cases in this process (shared peak RSS)")
+    parser.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+    parser.add_argument("--no-cold-start", action="store_true", help="Skip the cold-start CLI timings")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.slides, args.templates, args.pipelines, llm_latency=args.llm_latency,
+                           search_latency=args.search_latency, image_latency=args.image_latency,
+                           repeat=args.repeat, isolated=not args.in_process,
+                           cold_start=not args.no_cold_start, image_count=args.images,
+                           image_size=args.image_size, subqueries=args.subqueries,
+                           slide_cache_modes=args.slide_cache)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"✅ Benchmark report written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
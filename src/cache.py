@@ -1,28 +1,447 @@
 import os
+import sys
 import json
+import time
+import zlib
+import sqlite3
 import hashlib
+import argparse
+import threading
+
+from src.metrics import get_logger, incr, setup_logging
+
+log = get_logger(__name__)
 
 CACHE_DIR = ".cache"
 
+# Storage engine for cache entries: "sqlite" (single WAL database) or "file" (one JSON file per key)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+CACHE_DB_FILE = "cache.db"
 
-def _get_cache_path(key: str) -> str:
-    """Generate a unique cache file path based on the key."""
-    os.makedirs(CACHE_DIR, exist_ok=True)
-    hashed = hashlib.sha256(key.encode()).hexdigest()
-    return os.path.join(CACHE_DIR, f"{hashed}.json")
+# Default lifetime of an entry in seconds (0 = never expires)
+CACHE_TTL = int(os.getenv("CACHE_TTL", str(7 * 24 * 3600)))
+# Total size of the cache before least recently used entries are evicted
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+# Writes between sweeps for expired entries; size-based eviction runs as soon as the cache is over budget
+CACHE_EVICT_EVERY = int(os.getenv("CACHE_EVICT_EVERY", "200"))
+# zlib level for values stored by the sqlite backend (0 = no compression)
+CACHE_COMPRESSION_LEVEL = int(os.getenv("CACHE_COMPRESSION_LEVEL", "6"))
+# Values smaller than this are stored uncompressed
+CACHE_COMPRESSION_MIN_BYTES = 512
 
+# Marks files written with an expiry envelope (older files hold the raw data)
+_ENVELOPE_KEY = "__cache_entry__"
 
-def load_cache(key: str):
-    """Load cached result if it exists."""
-    path = _get_cache_path(key)
-    if os.path.exists(path):
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _hash_key(key: str) -> str:
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _expires_at(ttl):
+    ttl = CACHE_TTL if ttl is None else ttl
+    return time.time() + ttl if ttl else None
+
+
+class FileCacheBackend:
+    """One pretty-printed JSON file per key under CACHE_DIR."""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        # Running size of the directory, seeded by the first eviction scan; other
+        # processes' writes are picked up by the periodic rescans
+        self._total = None
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _get_cache_path(self, key: str) -> str:
+        """Generate a unique cache file path based on the key."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return os.path.join(self.cache_dir, f"{_hash_key(key)}.json")
+
+    def get(self, key):
+        path = self._get_cache_path(key)
+        if not os.path.exists(path):
+            return None
+        entry = read_cache_file(path)
+        if entry is None:
+            return None
+        data, expires_at = entry
+        if expires_at and expires_at < time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        # Bump the mtime so eviction treats this entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key, data, ttl=None):
+        self._after_writes(1, self._write(key, data, ttl))
+
+    def get_many(self, keys):
+        return {key: value for key in keys if (value := self.get(key)) is not None}
+
+    def put_many(self, items, ttl=None):
+        added = sum(self._write(key, data, ttl) for key, data in items.items())
+        self._after_writes(len(items), added)
+
+    def _write(self, key, data, ttl):
+        """Writes one entry and returns how many bytes the directory grew by."""
+        path = self._get_cache_path(key)
+        entry = {_ENVELOPE_KEY: 1, "expires_at": _expires_at(ttl), "data": data}
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, indent=2)
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        new_size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+        return new_size - old_size
+
+    def _after_writes(self, count, added):
+        """Scans the directory only when the running total passes the budget, or every CACHE_EVICT_EVERY writes."""
+        with self._lock:
+            previous = self._writes
+            self._writes += count
+            if self._total is not None:
+                self._total += added
+            due = (self._total is None or (CACHE_MAX_BYTES and self._total > CACHE_MAX_BYTES)
+                   or self._writes // CACHE_EVICT_EVERY != previous // CACHE_EVICT_EVERY)
+        if due:
+            self.evict()
+
+    def evict(self, max_bytes=None):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        if not max_bytes or not os.path.isdir(self.cache_dir):
+            return 0
+
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        if total <= max_bytes:
+            self._total = total
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self._total = total
+        return removed
+
+
+class SQLiteCacheBackend:
+    """
+    All entries in one SQLite database in WAL mode, safe for concurrent
+    readers and writers across threads and processes. Values are JSON,
+    zlib-compressed above CACHE_COMPRESSION_MIN_BYTES.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(CACHE_DIR, CACHE_DB_FILE)
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        # One writer sets up the schema, so the size total is seeded exactly once
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " compressed INTEGER NOT NULL,"
+            " expires_at REAL,"
+            " accessed_at REAL NOT NULL,"
+            " size INTEGER NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires_at)")
+        # Running total of entry sizes, kept by triggers so no write has to SUM the table
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'stats'").fetchone():
+            conn.execute("CREATE TABLE stats (id INTEGER PRIMARY KEY CHECK (id = 1), total_size INTEGER NOT NULL)")
+            conn.execute("INSERT INTO stats SELECT 1, COALESCE(SUM(size), 0) FROM entries")
+        conn.execute("CREATE TRIGGER IF NOT EXISTS entries_size_insert AFTER INSERT ON entries"
+                     " BEGIN UPDATE stats SET total_size = total_size + new.size WHERE id = 1; END")
+        conn.execute("CREATE TRIGGER IF NOT EXISTS entries_size_delete AFTER DELETE ON entries"
+                     " BEGIN UPDATE stats SET total_size = total_size - old.size WHERE id = 1; END")
+        conn.execute("CREATE TRIGGER IF NOT EXISTS entries_size_update AFTER UPDATE OF size ON entries"
+                     " BEGIN UPDATE stats SET total_size = total_size + new.size - old.size WHERE id = 1; END")
+        conn.commit()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _encode(data):
+        raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if CACHE_COMPRESSION_LEVEL and len(raw) >= CACHE_COMPRESSION_MIN_BYTES:
+            return zlib.compress(raw, CACHE_COMPRESSION_LEVEL), 1
+        return raw, 0
+
+    @staticmethod
+    def _decode(value, compressed):
+        if compressed:
+            value = zlib.decompress(value)
+        return json.loads(value)
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        hashed = {_hash_key(key): key for key in keys}
+        conn = self._connect()
+        now = time.time()
+        found = {}
+        expired = []
+        hashes = list(hashed)
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            rows = conn.execute(
+                f"SELECT key, value, compressed, expires_at FROM entries WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for hashed_key, value, compressed, expires_at in rows:
+                if expires_at and expires_at < now:
+                    expired.append(hashed_key)
+                    continue
+                try:
+                    found[hashed_key] = self._decode(value, compressed)
+                except (zlib.error, ValueError):
+                    expired.append(hashed_key)
+
+        with conn:
+            if found:
+                conn.executemany("UPDATE entries SET accessed_at = ? WHERE key = ?",
+                                 [(now, hashed_key) for hashed_key in found])
+            if expired:
+                conn.executemany("DELETE FROM entries WHERE key = ?", [(hashed_key,) for hashed_key in expired])
+        return {hashed[hashed_key]: value for hashed_key, value in found.items()}
+
+    def put(self, key, data, ttl=None):
+        self.put_many({key: data}, ttl=ttl)
+
+    def put_many(self, items, ttl=None):
+        self.put_hashed([(_hash_key(key), data, _expires_at(ttl)) for key, data in items.items()])
+
+    def put_hashed(self, rows):
+        """Stores (hashed key, data, expires_at) rows; used by put_many and migration."""
+        if not rows:
+            return
+        now = time.time()
+        encoded = []
+        for hashed_key, data, expires_at in rows:
+            value, compressed = self._encode(data)
+            encoded.append((hashed_key, value, compressed, expires_at, now, len(value)))
+        conn = self._connect()
+        with conn:
+            # An upsert rather than INSERT OR REPLACE: REPLACE's implicit delete does not fire the size trigger
+            conn.executemany(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET"
+                " value = excluded.value, compressed = excluded.compressed, expires_at = excluded.expires_at,"
+                " accessed_at = excluded.accessed_at, size = excluded.size",
+                encoded,
+            )
+            total = conn.execute("SELECT total_size FROM stats WHERE id = 1").fetchone()[0]
+        with self._lock:
+            previous = self._writes
+            self._writes += len(rows)
+            sweep = self._writes // CACHE_EVICT_EVERY != previous // CACHE_EVICT_EVERY
+        if sweep or (CACHE_MAX_BYTES and total > CACHE_MAX_BYTES):
+            self.evict()
+
+    def evict(self, max_bytes=None):
+        """Remove expired entries, then least recently used ones until the cache fits in max_bytes."""
+        max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        conn = self._connect()
+        with conn:
+            removed = conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?",
+                                   (time.time(),)).rowcount
+            if not max_bytes:
+                return removed
+            total = conn.execute("SELECT total_size FROM stats WHERE id = 1").fetchone()[0]
+            if total <= max_bytes:
+                return removed
+            victims = []
+            for hashed_key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+                if total <= max_bytes:
+                    break
+                victims.append((hashed_key,))
+                total -= size
+            conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        return removed + len(victims)
+
+
+def read_cache_file(path):
+    """Reads a file-backend entry, returning (data, expires_at) or None."""
+    try:
         with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return None
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if isinstance(entry, dict) and entry.get(_ENVELOPE_KEY):
+        return entry.get("data"), entry.get("expires_at")
+    return entry, None
+
+
+def get_backend():
+    """Returns the process-wide cache backend selected by CACHE_BACKEND."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if CACHE_BACKEND == "file":
+                _backend = FileCacheBackend()
+            elif CACHE_BACKEND == "sqlite":
+                _backend = SQLiteCacheBackend()
+            else:
+                raise ValueError(f"Unknown CACHE_BACKEND: {CACHE_BACKEND}")
+        return _backend
+
+
+def _namespace(key):
+    return key.split(":", 1)[0]
+
+
+def _count_lookups(keys, hits):
+    if not keys:
+        return
+    # Batches share a namespace in practice; label by the first key's
+    namespace = _namespace(keys[0])
+    incr("cache_hits", hits, namespace=namespace)
+    incr("cache_misses", len(keys) - hits, namespace=namespace)
+
+
+def load_cache(key: str):
+    """Load cached result if it exists and has not expired."""
+    data = get_backend().get(key)
+    _count_lookups([key], 1 if data is not None else 0)
+    return data
+
+
+def save_cache(key: str, data, ttl: int = None):
+    """Save result to cache, expiring after `ttl` seconds (default CACHE_TTL)."""
+    get_backend().put(key, data, ttl=ttl)
+
+
+def load_cache_many(keys):
+    """Load several cached results at once; returns {key: data} for the hits."""
+    keys = list(keys)
+    found = get_backend().get_many(keys)
+    _count_lookups(keys, len(found))
+    return found
+
+
+def save_cache_many(items, ttl: int = None):
+    """Save a {key: data} mapping in one batch."""
+    get_backend().put_many(items, ttl=ttl)
+
+
+def evict_cache(max_bytes: int = None):
+    """Remove least recently used entries until the cache fits in max_bytes."""
+    return get_backend().evict(max_bytes)
+
+
+def make_key(namespace: str, **parts) -> str:
+    """Build a stable cache key from a namespace and JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return f"{namespace}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def migrate_file_cache(source_dir=CACHE_DIR, db_path=None, delete=False, batch_size=500):
+    """
+    Copies every `<sha256>.json` entry from a file-backend directory into the
+    sqlite backend. Returns the number of migrated entries.
+    """
+    backend = SQLiteCacheBackend(db_path)
+    now = time.time()
+    migrated = 0
+    batch, paths = [], []
+
+    def flush():
+        backend.put_hashed(batch)
+        if delete:
+            for path in paths:
+                os.remove(path)
+        batch.clear()
+        paths.clear()
+
+    for name in sorted(os.listdir(source_dir)):
+        stem, ext = os.path.splitext(name)
+        if ext != ".json" or len(stem) != 64:
+            continue
+        path = os.path.join(source_dir, name)
+        entry = read_cache_file(path)
+        if entry is None:
+            log.warning(f"⚠️ Skipping unreadable cache file: {name}")
+            continue
+        data, expires_at = entry
+        if expires_at and expires_at < now:
+            continue
+        batch.append((stem, data, expires_at))
+        paths.append(path)
+        migrated += 1
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return migrated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cache maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate = subparsers.add_parser("migrate", help="Move a file-backend cache directory into the sqlite backend")
+    migrate.add_argument("--from", dest="source", default=CACHE_DIR, help="File cache directory")
+    migrate.add_argument("--db", default=None, help="Target database (default .cache/cache.db)")
+    migrate.add_argument("--delete", action="store_true", help="Delete JSON files once migrated")
+    evict = subparsers.add_parser("evict", help="Drop expired and least recently used entries")
+    evict.add_argument("--max-bytes", type=int, default=None, help="Size limit (default CACHE_MAX_BYTES)")
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    if args.command == "migrate":
+        if not os.path.isdir(args.source):
+            log.error(f"❌ Cache directory not found: {args.source}")
+            sys.exit(1)
+        count = migrate_file_cache(args.source, args.db, delete=args.delete)
+        print(f"✅ Migrated {count} cache entries into the sqlite backend")
+    elif args.command == "evict":
+        removed = evict_cache(args.max_bytes)
+        print(f"✅ Evicted {removed} cache entries")
 
 
-def save_cache(key: str, data):
-    """Save result to cache."""
-    path = _get_cache_path(key)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+if __name__ == "__main__":
+    main()
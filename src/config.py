@@ -1,14 +1,41 @@
 # src/config.py
 import os
-from dotenv import load_dotenv
+from pathlib import Path
 
-load_dotenv()
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+_env_loaded = False
+
+
+def load_env():
+    """
+    Loads .env from the project root (then the working directory) into the
+    environment. Runs once per process; later calls are free.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path=PROJECT_ROOT / ".env")
+    load_dotenv()
+
+
+def require_gemini_api_key():
+    """Returns GEMINI_API_KEY, raising only when a Gemini call actually needs it."""
+    load_env()
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError(f"GEMINI_API_KEY not found in environment variables (looked in {PROJECT_ROOT / '.env'})")
+    return api_key
+
+
+load_env()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY is None:
-    raise ValueError("GEMINI_API_KEY not found in environment variables")
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 SERPAPI_KEY = os.getenv('SERPAPI_KEY')
 DEFAULT_MODEL = os.getenv('DEFAULT_MODEL', 'gpt-4o-mini')
 CACHE_DIR = os.getenv('CACHE_DIR', './cache')
-MAX_SEARCH_RESULTS = int(os.getenv('MAX_SEARCH_RESULTS', '5'))
\ No newline at end of file
+MAX_SEARCH_RESULTS = int(os.getenv('MAX_SEARCH_RESULTS', '5'))
@@ -0,0 +1,164 @@
+# src/context_builder.py
+"""
+Assembles the search context for slide synthesis.
+
+Search results often repeat the same sentence across sites. Snippets are
+ranked by relevance to the topic, sentences already covered by a better
+ranked snippet (by word-shingle containment) are dropped, and what is left
+is packed into a token budget. Text read from the source pages (see
+src/page_fetcher.py) joins as extra passages ranked alongside the snippets.
+"""
+import os
+import re
+import math
+
+from src.llm_backends import estimate_tokens
+from src.metrics import get_logger, span, incr
+
+log = get_logger(__name__)
+
+# Prompt tokens the search context may use (0 = no limit)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# A sentence is a duplicate when this share of its shingles was already kept
+CONTEXT_DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.8"))
+# Words per shingle
+CONTEXT_SHINGLE_SIZE = 4
+# Fetched page text is split into passages of about this many characters
+CONTEXT_PASSAGE_CHARS = 600
+
+# BM25 parameters, and the weight of the search engine's own ranking
+BM25_K1 = 1.2
+BM25_B = 0.75
+SEARCH_RANK_WEIGHT = 0.5
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in into is it its of on or that the this to was "
+    "were what when where which who why will with about vs".split()
+)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def _words(text):
+    return _WORD_RE.findall(text.lower())
+
+
+def shingles(words, size=CONTEXT_SHINGLE_SIZE):
+    """Returns the set of `size`-word shingles (the whole text when it is shorter)."""
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def rank_snippets(topic, snippets, query=None):
+    """
+    Returns snippet indices, most relevant first: BM25 against the topic and
+    search query terms, plus a small bonus for the search engine's own order.
+    """
+    terms = {word for word in _words(f"{topic} {query or ''}") if word not in STOPWORDS}
+    docs = [_words(snippet) for snippet in snippets]
+    if not docs:
+        return []
+    doc_sets = [set(doc) for doc in docs]
+    avg_len = sum(len(doc) for doc in docs) / len(docs) or 1.0
+    idf = {}
+    for term in terms:
+        df = sum(1 for doc_set in doc_sets if term in doc_set)
+        idf[term] = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+
+    scores = []
+    for rank, doc in enumerate(docs):
+        score = 0.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(doc) / avg_len)
+        for term in terms & doc_sets[rank]:
+            tf = doc.count(term)
+            score += idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+        scores.append(score + SEARCH_RANK_WEIGHT / (1 + rank))
+    return sorted(range(len(docs)), key=lambda i: (-scores[i], i))
+
+
+def passages(text, size=CONTEXT_PASSAGE_CHARS):
+    """Splits page text into passages of whole lines, each about `size` characters."""
+    chunks = []
+    current = ""
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if current and len(current) + len(line) + 1 > size:
+            chunks.append(current)
+            current = ""
+        current = f"{current} {line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def build_context(topic, web_results, query=None, budget=None):
+    """
+    Turns search results ({title, snippet, link, optional page_text}) into the context lines for
+    synthesis: ranked, with near-duplicate sentences removed, and within
+    `budget` tokens (default CONTEXT_TOKEN_BUDGET).
+    """
+    budget = CONTEXT_TOKEN_BUDGET if budget is None else budget
+    entries = []
+    for result in web_results:
+        title = (result.get("title") or "").strip()
+        snippet = (result.get("snippet") or "").strip()
+        if snippet:
+            entries.append((title, snippet))
+        elif title:
+            entries.append(("", title))
+    # Page passages come after every snippet, so the snippets win ties on search rank
+    for result in web_results:
+        title = (result.get("title") or "").strip()
+        entries.extend((title, passage) for passage in passages(result.get("page_text") or ""))
+    snippets = [f"{title} {snippet}" for title, snippet in entries]
+
+    with span("context.build", snippets=len(snippets), budget=budget) as attrs:
+        context = []
+        seen = set()
+        tokens = 0
+        duplicates = over_budget = sentences_dropped = 0
+        for index in rank_snippets(topic, snippets, query):
+            kept_sentences = []
+            kept_shingles = set()
+            # Titles differ between sites, so only the snippet's sentences are compared
+            title, snippet = entries[index]
+            for sentence in _SENTENCE_RE.split(snippet):
+                sentence_shingles = shingles(_words(sentence))
+                if not sentence_shingles:
+                    continue
+                covered = len(sentence_shingles & (seen | kept_shingles)) / len(sentence_shingles)
+                if covered >= CONTEXT_DUPLICATE_THRESHOLD:
+                    sentences_dropped += 1
+                    continue
+                kept_sentences.append(sentence)
+                kept_shingles |= sentence_shingles
+            if not kept_sentences:
+                duplicates += 1
+                continue
+
+            text = " ".join(kept_sentences)
+            if title:
+                text = f"{title}: {text}"
+            cost = estimate_tokens(text)
+            if budget > 0 and tokens + cost > budget:
+                # A shorter, lower-ranked snippet may still fit
+                over_budget += 1
+                continue
+            context.append(text)
+            seen |= kept_shingles
+            tokens += cost
+
+        attrs.update(kept=len(context), duplicates=duplicates, over_budget=over_budget, tokens=tokens)
+
+    incr("context_snippets", len(context), outcome="kept")
+    incr("context_snippets", duplicates, outcome="duplicate")
+    incr("context_snippets", over_budget, outcome="over_budget")
+    incr("context_sentences_dropped", sentences_dropped)
+    incr("context_tokens", tokens)
+    log.info(f"🧹 Context: kept {len(context)} of {len(snippets)} snippets (~{tokens} tokens; "
+             f"{duplicates} duplicates, {over_budget} over budget, {sentences_dropped} repeated sentences removed)")
+    return context
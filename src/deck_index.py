@@ -0,0 +1,137 @@
+# src/deck_index.py
+"""
+Constant-time part bookkeeping for decks with hundreds or thousands of slides.
+
+python-pptx finds the next free partname (for notes slides and images) and
+checks whether an image is already embedded by walking every relationship
+in the package. Adding a slide also scans every existing slide
+relationship and slide id. Each new slide therefore costs time proportional
+to the deck so far, and a 1000-slide deck takes minutes. DeckPartIndex
+scans a freshly opened presentation once and then answers those questions
+from counters and dictionaries.
+
+In large-deck mode, from LARGE_DECK_SLIDES slides on, new image parts keep
+only the path of their file and read it again when the deck is saved.
+Peak memory then no longer grows with the total size of the deck's images.
+"""
+import os
+import re
+
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.packuri import PackURI
+from pptx.parts.image import Image, ImagePart
+from pptx.parts.slide import SlidePart
+
+from src.metrics import incr
+
+# Slide count from which image parts are read from disk at save time instead of held in memory
+LARGE_DECK_SLIDES = int(os.getenv("LARGE_DECK_SLIDES", "100"))
+
+_PARTNAME_RE = re.compile(r"^(.*?)(\d+)\.\w+$")
+# Lowest slide id PowerPoint accepts
+MIN_SLIDE_ID = 256
+
+
+class FileImagePart(ImagePart):
+    """An image part that reads its bytes from `path` whenever they are needed."""
+
+    def __init__(self, partname, content_type, package, path, sha1):
+        super().__init__(partname, content_type, package, b"", os.path.basename(path))
+        self._path = path
+        # Seed the lazy digest so it is not computed from a fresh read
+        self.__dict__["sha1"] = sha1
+
+    @property
+    def _blob(self):
+        with open(self._path, "rb") as f:
+            return f.read()
+
+    @_blob.setter
+    def _blob(self, value):
+        # ImagePart.__init__ stores the bytes; this part only keeps the path
+        pass
+
+
+class DeckPartIndex:
+    """
+    Partname counters and an image-part lookup for one open presentation.
+    Installing it routes the package's own next_partname(),
+    next_image_partname() and get_or_add_image_part() through the index.
+    """
+
+    def __init__(self, prs):
+        self.prs = prs
+        self.package = prs.part.package
+        self.last_numbers = {}     # partname prefix -> highest number in use
+        self.images_by_sha1 = {}
+        self.images_by_file = {}   # (path, mtime, size) -> image part
+        for part in self.package.iter_parts():
+            self._count(part.partname)
+            if isinstance(part, ImagePart):
+                self.images_by_sha1[part.sha1] = part
+        self.last_slide_id = max([MIN_SLIDE_ID - 1] + [int(sld_id.id) for sld_id in prs.slides._sldIdLst])
+
+    def install(self):
+        package = self.package
+        package.next_partname = self.next_partname
+        package.next_image_partname = self.next_image_partname
+        # Package._image_parts is a lazyproperty, which reads from the instance __dict__
+        package.__dict__["_image_parts"] = self
+        return self
+
+    def _count(self, partname):
+        match = _PARTNAME_RE.match(partname)
+        if match:
+            prefix, number = match.group(1), int(match.group(2))
+            self.last_numbers[prefix] = max(self.last_numbers.get(prefix, 0), number)
+
+    def _next(self, prefix):
+        number = self.last_numbers.get(prefix, 0) + 1
+        self.last_numbers[prefix] = number
+        return number
+
+    def next_partname(self, tmpl):
+        prefix = tmpl[: (tmpl % 42).find("42")]
+        return PackURI(tmpl % self._next(prefix))
+
+    def next_image_partname(self, ext):
+        return PackURI(f"/ppt/media/image{self._next('/ppt/media/image')}.{ext}")
+
+    def add_slide(self, layout):
+        """Same as prs.slides.add_slide(layout), without its scans over the existing slides."""
+        slide_part = SlidePart.new(self.next_partname("/ppt/slides/slide%d.xml"), self.package, layout.part)
+        # A new part cannot already be related, so skip relate_to()'s search for an existing relationship
+        rId = self.prs.part.rels._add_relationship(RT.SLIDE, slide_part)
+        slide = slide_part.slide
+        slide.shapes.clone_layout_placeholders(layout)
+        self.last_slide_id += 1
+        self.prs.slides._sldIdLst._add_sldId(id=self.last_slide_id, rId=rId)
+        return slide
+
+    def __iter__(self):
+        return iter(list(self.images_by_sha1.values()))
+
+    def get_or_add_image_part(self, image_file):
+        """Returns the deck's image part for `image_file`, adding one the first time it is seen."""
+        file_key = None
+        if isinstance(image_file, str):
+            stat = os.stat(image_file)
+            file_key = (os.path.abspath(image_file), stat.st_mtime_ns, stat.st_size)
+            image_part = self.images_by_file.get(file_key)
+            if image_part is not None:
+                return image_part
+
+        image = Image.from_file(image_file)
+        image_part = self.images_by_sha1.get(image.sha1)
+        if image_part is None:
+            if file_key and len(self.prs.slides) >= LARGE_DECK_SLIDES:
+                image_part = FileImagePart(self.next_image_partname(image.ext), image.content_type, self.package,
+                                           image_file, image.sha1)
+                incr("image_parts", storage="file")
+            else:
+                image_part = ImagePart.new(self.package, image)
+                incr("image_parts", storage="memory")
+            self.images_by_sha1[image.sha1] = image_part
+        if file_key:
+            self.images_by_file[file_key] = image_part
+        return image_part
@@ -0,0 +1,71 @@
+# src/deck_spec.py
+"""
+The deck spec: everything needed to render a deck again without search,
+synthesis or image lookups.
+
+It is a JSON file written next to the deck (`talk.pptx` -> `talk.spec.json`)
+holding the topic, the template, and for each slide its title, bullets,
+notes, layout name and resolved image file. Edit it and run
+`python -m src.main generate --from-spec talk.spec.json` to re-render. Only
+slides whose content changed are rebuilt; see the slide cache in
+src/ppt_generator.py.
+"""
+import os
+import json
+import threading
+
+from src.metrics import get_logger
+
+log = get_logger(__name__)
+
+# Write a spec next to every generated deck
+DECK_SPEC = os.getenv("DECK_SPEC", "1") == "1"
+SPEC_VERSION = 1
+SPEC_SUFFIX = ".spec.json"
+
+SLIDE_FIELDS = ("title", "content", "notes", "layout", "image")
+
+
+def spec_path_for(output):
+    """Returns the spec path that belongs to a deck path."""
+    return os.path.splitext(output)[0] + SPEC_SUFFIX
+
+
+def build_spec(topic, template, output, slides):
+    """Returns a spec dict; `slides` are the per-slide dicts returned by render_slide."""
+    return {
+        "version": SPEC_VERSION,
+        "topic": topic,
+        "template": template,
+        "output": output,
+        "slides": [{field: slide.get(field) for field in SLIDE_FIELDS} for slide in slides],
+    }
+
+
+def write_spec(path, spec):
+    """Writes a spec atomically, so a crash never leaves half a file behind."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        spec_dir = os.path.dirname(path)
+        if spec_dir:
+            os.makedirs(spec_dir, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(spec, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        log.info(f"🗂️ Deck spec saved to {path}")
+    except OSError as e:
+        log.warning(f"⚠️ Could not write deck spec {path}: {e}")
+
+
+def read_spec(path):
+    """Loads and checks a spec; raises ValueError if it is not one this version can render."""
+    with open(path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    if not isinstance(spec, dict) or spec.get("version") != SPEC_VERSION:
+        raise ValueError(f"{path}: not a version {SPEC_VERSION} deck spec")
+    if not isinstance(spec.get("slides"), list):
+        raise ValueError(f"{path}: deck spec has no slide list")
+    for number, slide in enumerate(spec["slides"], start=1):
+        if not isinstance(slide, dict):
+            raise ValueError(f"{path}: slide {number} is not an object")
+    return spec
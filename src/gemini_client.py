@@ -1,20 +1,10 @@
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv
-
-load_dotenv()
-
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("❌ GEMINI_API_KEY not found in .env file")
-
-genai.configure(api_key=api_key)
+from src.llm_backends import get_llm_backend
 
 
 def ask_gemini(prompt: str, model: str = "gemini-1.5-flash") -> str:
     """
     Query Gemini with a prompt and return the response text.
+    Goes through the shared backend in src/llm_backends.py, so the model is
+    built once and calls share LLMClient's rate limits and metrics.
     """
-    model = genai.GenerativeModel(model)
-    response = model.generate_content(prompt)
-    return response.text
+    return get_llm_backend(f"gemini:{model}").generate(prompt)
@@ -0,0 +1,159 @@
+# src/http_client.py
+import os
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src import rate_limit
+from src.metrics import incr
+
+# Connections kept alive per host, default timeout (seconds) and retry policy
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "30"))
+
+# Responses worth retrying; anything else is returned to the caller as-is
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_sessions = {}
+_stats = {}
+_lock = threading.Lock()
+
+
+def _host(url):
+    return urlparse(url).netloc.lower()
+
+
+def get_session(url):
+    """Returns the pooled keep-alive session for the URL's host."""
+    host = _host(url)
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+        return session
+
+
+def _record(host, latency=None, retried=False, failed=False, response_bytes=0):
+    if latency is not None:
+        incr("http_requests", host=host)
+        incr("http_seconds", latency, host=host)
+    if response_bytes:
+        incr("http_response_bytes", response_bytes, host=host)
+    if retried:
+        incr("http_retries", host=host)
+    if failed:
+        incr("http_errors", host=host)
+    with _lock:
+        stats = _stats.setdefault(host, {
+            "requests": 0, "retries": 0, "errors": 0, "latency_total": 0.0, "latency_max": 0.0,
+        })
+        if latency is not None:
+            stats["requests"] += 1
+            stats["latency_total"] += latency
+            stats["latency_max"] = max(stats["latency_max"], latency)
+        if retried:
+            stats["retries"] += 1
+        if failed:
+            stats["errors"] += 1
+
+
+def get_stats():
+    """Returns per-host request counts, retries, errors and latency (seconds)."""
+    with _lock:
+        stats = {host: dict(values) for host, values in _stats.items()}
+    for values in stats.values():
+        values["latency_avg"] = values["latency_total"] / values["requests"] if values["requests"] else 0.0
+    return stats
+
+
+def _content_length(response):
+    try:
+        return int(response.headers.get("Content-Length", 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _retry_after(response):
+    """Parses a Retry-After header (seconds or HTTP date) into seconds."""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt, response=None):
+    """Full-jitter exponential backoff, or the server's Retry-After if it sent one."""
+    retry_after = _retry_after(response)
+    if retry_after is not None:
+        return min(retry_after, HTTP_BACKOFF_MAX)
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+
+def request(method, url, max_retries=None, session=None, **kwargs):
+    """
+    Sends a request through the host's pooled session, retrying connection
+    errors and 429/5xx responses with backoff. Requests to quota-limited API
+    hosts wait for a slot from src/rate_limit.py on every attempt. The final
+    response (or exception) is returned to the caller unchanged.
+    """
+    host = _host(url)
+    provider = rate_limit.provider_for_host(host)
+    # Callers reaching many one-off hosts pass their own session instead of one per host
+    session = session or get_session(url)
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    max_retries = HTTP_MAX_RETRIES if max_retries is None else max_retries
+
+    attempt = 0
+    while True:
+        try:
+            with rate_limit.acquire(provider):
+                # Latency excludes time spent waiting for a rate-limit slot
+                start = time.perf_counter()
+                response = session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            _record(host, latency=time.perf_counter() - start, failed=True)
+            if attempt >= max_retries:
+                raise
+            _record(host, retried=True)
+            time.sleep(_backoff(attempt))
+            attempt += 1
+            continue
+
+        _record(host, latency=time.perf_counter() - start, response_bytes=_content_length(response))
+        if response.status_code not in RETRY_STATUSES or attempt >= max_retries:
+            if response.status_code >= 400:
+                _record(host, failed=True)
+            return response
+
+        delay = _backoff(attempt, response)
+        if response.status_code == 429:
+            # Hold back every caller of this provider, not just this retry
+            rate_limit.pause(provider, delay)
+        response.close()
+        _record(host, retried=True)
+        time.sleep(delay)
+        attempt += 1
+
+
+def get(url, **kwargs):
+    """GET through the pooled session with retries."""
+    return request("GET", url, **kwargs)
@@ -1,11 +1,24 @@
 # src/image_client.py
 import os
 import requests
-import glob
 from difflib import SequenceMatcher
 
+from src import http_client
+
+from src.image_index import get_image_index
+from src.image_store import get_image_store
+from src.image_prep import choose_pexels_variant
+from src.config import load_env
+from src.lookup_cache import cached_lookup
+from src.metrics import get_logger, span, incr
+
+log = get_logger(__name__)
+
+load_env()
 PEXELS_API_KEY = os.getenv("PEXELS_API_KEY")
 PEXELS_URL = "https://api.pexels.com/v1/search"
+# Pexels search results younger than this are used without a background refresh
+PEXELS_FRESH_SECONDS = int(os.getenv("PEXELS_FRESH_SECONDS", str(7 * 24 * 3600)))
 
 def similarity(a, b):
     """Calculate similarity between two strings"""
@@ -15,85 +28,85 @@ def find_existing_image(query, save_dir="images"):
     """Find an existing image that matches the query"""
     if not os.path.exists(save_dir):
         return None
-    
-    # Get all image files
-    image_extensions = ['*.jpg', '*.jpeg', '*.png', '*.gif', '*.bmp']
-    image_files = []
-    for ext in image_extensions:
-        image_files.extend(glob.glob(os.path.join(save_dir, ext)))
-    
-    if not image_files:
-        return None
-    
-    # Find the best matching image based on filename similarity
-    best_match = None
-    best_score = 0
-    
-    query_words = set(query.lower().split())
-    
-    for image_path in image_files:
-        filename = os.path.splitext(os.path.basename(image_path))[0]
-        
-        # Calculate similarity score
-        score = similarity(query, filename)
-        
-        # Bonus points for matching individual words
-        filename_words = set(filename.lower().split())
-        word_matches = len(query_words.intersection(filename_words))
-        if word_matches > 0:
-            score += word_matches * 0.2
-        
-        if score > best_score:
-            best_score = score
-            best_match = image_path
-    
-    # Only return if similarity is reasonable (> 0.3)
-    if best_score > 0.3:
-        print(f"✅ Found existing image: {best_match} (similarity: {best_score:.2f})")
+
+    # Candidates are narrowed through the token index before any fuzzy scoring
+    best_match, best_score = get_image_index(save_dir).find(query, threshold=0.3)
+    if best_match:
+        log.info(f"✅ Found existing image: {best_match} (similarity: {best_score:.2f})")
         return best_match
-    
+
     return None
 
-def fetch_image(query, save_dir="images"):
-    """Fetch image from Pexels API or use existing image"""
-    
+def fetch_image(query, save_dir="images", target_size=None):
+    """
+    Fetch image from Pexels API or use existing image.
+    target_size is the (width, height) in pixels the image must cover; it
+    selects the smallest Pexels size variant that is still large enough.
+    """
+    with span("image.lookup", source="none") as attrs:
+        path = _fetch_image(query, save_dir, target_size, attrs)
+    incr("image_lookups", source=attrs["source"])
+    return path
+
+def _fetch_image(query, save_dir, target_size, attrs):
+    store = get_image_store(save_dir)
+
+    # An exact title already recorded in the store needs no fuzzy matching
+    stored_image = store.lookup_title(query)
+    if stored_image:
+        log.info(f"✅ Found stored image for: {query}")
+        attrs["source"] = "exact"
+        return stored_image
+
     # First, try to find an existing image
     existing_image = find_existing_image(query, save_dir)
     if existing_image:
+        attrs["source"] = "index"
         return existing_image
     
     # If no existing image and no API key, return None
     if not PEXELS_API_KEY:
-        print("⚠️ No Pexels API key found and no matching existing image. Skipping image.")
+        log.warning("⚠️ No Pexels API key found and no matching existing image. Skipping image.")
         return None
 
-    # Try to download from Pexels
-    headers = {"Authorization": PEXELS_API_KEY}
-    params = {"query": query, "per_page": 1}
-
     try:
-        response = requests.get(PEXELS_URL, headers=headers, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
-        if data["photos"]:
-            url = data["photos"][0]["src"]["original"]
-            os.makedirs(save_dir, exist_ok=True)
-            safe_name = "".join(c for c in query if c.isalnum() or c in (" ", "_")).rstrip()
-            path = os.path.join(save_dir, f"{safe_name}.jpg")
-            
-            with requests.get(url, stream=True, timeout=10) as img_response:
-                img_response.raise_for_status()
-                with open(path, "wb") as f:
-                    for chunk in img_response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-            print(f"✅ Image downloaded and saved to {path}")
+        # Titles Pexels had no photo for, or failed on, are remembered for a while
+        photo = cached_lookup("pexels", {"query": query, "per_page": 1}, lambda: _search_pexels(query),
+                              PEXELS_FRESH_SECONDS)
+
+        if photo:
+            photo_id = photo.get("id")
+
+            # Different titles often resolve to the same photo; reuse its blob
+            if photo_id is not None:
+                known_image = store.lookup_photo(photo_id, min_size=target_size)
+                if known_image:
+                    store.record(os.path.splitext(os.path.basename(known_image))[0], titles=[query])
+                    log.info(f"✅ Reusing stored Pexels photo {photo_id} for: {query}")
+                    attrs["source"] = "photo_id"
+                    return known_image
+
+            variant, url, (width, height) = choose_pexels_variant(photo, target_size)
+            path = store.download(url, http_client.get, titles=[query], photo_id=photo_id,
+                                  variant=variant, width=width, height=height)
+            log.info(f"✅ Image downloaded and saved to {path}")
+            attrs["source"] = "download"
             return path
         else:
-            print(f"⚠️ No images found for query: {query}")
+            log.warning(f"⚠️ No images found for query: {query}")
     except requests.exceptions.MissingSchema:
-        print(f"⚠️ Pexels failed: The URL is invalid. Check the 'PEXELS_URL' variable.")
+        log.warning(f"⚠️ Pexels failed: The URL is invalid. Check the 'PEXELS_URL' variable.")
     except Exception as e:
-        print(f"⚠️ Pexels failed for query '{query}': {e}")
+        log.warning(f"⚠️ Pexels failed for query '{query}': {e}")
+        attrs["source"] = "error"
     
     return None
+
+def _search_pexels(query):
+    """Returns the first Pexels photo for the query, or None."""
+    headers = {"Authorization": PEXELS_API_KEY}
+    params = {"query": query, "per_page": 1}
+    response = http_client.get(PEXELS_URL, headers=headers, params=params)
+    response.raise_for_status()
+    photos = response.json()["photos"]
+    return photos[0] if photos else None
@@ -0,0 +1,184 @@
+# src/image_index.py
+import os
+import json
+import fnmatch
+import hashlib
+import threading
+from difflib import SequenceMatcher
+
+from src.cache import CACHE_DIR
+from src.image_store import IMAGE_EXTENSIONS, get_image_store
+from src.metrics import get_logger
+
+log = get_logger(__name__)
+
+# Kept outside the image directory so writing the index never bumps its mtime
+INDEX_DIR = os.path.join(CACHE_DIR, "image_index")
+INDEX_VERSION = 2
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def normalize_name(name):
+    """Returns the lowercased name and its set of whitespace tokens."""
+    lowered = name.lower()
+    return lowered, sorted(set(lowered.split()))
+
+
+class ImageIndex:
+    """
+    On-disk inverted index of normalized image filenames for one directory,
+    plus the title aliases recorded in the directory's image store manifest.
+
+    The index is refreshed incrementally: the directory is only re-listed when
+    its mtime (or the manifest's) changes, and only new names are normalized.
+    """
+
+    def __init__(self, save_dir):
+        self.save_dir = save_dir
+        dir_hash = hashlib.sha256(os.path.abspath(save_dir).encode()).hexdigest()[:16]
+        self.index_path = os.path.join(INDEX_DIR, f"{dir_hash}.json")
+        self.stamp = None
+        self.entries = []   # [relative path, normalized name, tokens] in glob order, then aliases
+        self.postings = {}  # token -> list of entry positions
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != INDEX_VERSION:
+            return
+        self.stamp = data.get("stamp")
+        self.entries = data.get("entries", [])
+        self.postings = data.get("postings", {})
+
+    def _save(self):
+        data = {
+            "version": INDEX_VERSION,
+            "stamp": self.stamp,
+            "entries": self.entries,
+            "postings": self.postings,
+        }
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(INDEX_DIR, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            log.warning(f"⚠️ Could not write image index {self.index_path}: {e}")
+
+    def _list_images(self):
+        """Lists image files in the same order glob produced them."""
+        with os.scandir(self.save_dir) as it:
+            names = [entry.name for entry in it if entry.is_file()]
+        filenames = []
+        for ext in IMAGE_EXTENSIONS:
+            filenames.extend(name for name in fnmatch.filter(names, ext) if not name.startswith("."))
+        return filenames
+
+    def refresh(self):
+        """Re-lists the directory if it changed since the index was built."""
+        store = get_image_store(self.save_dir)
+        try:
+            dir_mtime = os.stat(self.save_dir).st_mtime_ns
+        except OSError:
+            self.entries, self.postings, self.stamp = [], {}, None
+            return
+        try:
+            manifest_mtime = os.stat(store.manifest_path).st_mtime_ns
+        except OSError:
+            manifest_mtime = None
+        stamp = [dir_mtime, manifest_mtime]
+        if stamp == self.stamp:
+            return
+
+        known = {entry[0]: entry for entry in self.entries}
+        entries = []
+        for filename in self._list_images():
+            entry = known.get(filename)
+            if entry is None:
+                name, tokens = normalize_name(os.path.splitext(filename)[0])
+                entry = [filename, name, tokens]
+            entries.append(entry)
+        for title, blob in store.title_aliases():
+            name, tokens = normalize_name(title)
+            entries.append([blob, name, tokens])
+
+        postings = {}
+        for position, (_, _, tokens) in enumerate(entries):
+            for token in tokens:
+                postings.setdefault(token, []).append(position)
+
+        self.entries, self.postings, self.stamp = entries, postings, stamp
+        self._save()
+
+    def find(self, query, threshold=0.3):
+        """
+        Returns (path, score) of the best matching image, or (None, best score).
+
+        Scoring is identical to the original scan: SequenceMatcher ratio plus
+        0.2 per shared word, earliest file winning ties. Files sharing a token
+        with the query are scored first; the rest only need a ratio check when
+        the cheap length/character upper bounds could still beat the leader.
+        """
+        with self._lock:
+            self.refresh()
+            entries = self.entries
+            postings = self.postings
+
+        query_lower = query.lower()
+        query_words = set(query_lower.split())
+
+        candidates = set()
+        for word in query_words:
+            candidates.update(postings.get(word, ()))
+
+        best_position = None
+        best_score = 0
+
+        def consider(position, score):
+            nonlocal best_position, best_score
+            if score > best_score or (score == best_score and best_position is not None
+                                      and position < best_position):
+                best_position, best_score = position, score
+
+        for position in sorted(candidates):
+            _, name, tokens = entries[position]
+            score = SequenceMatcher(None, query_lower, name).ratio()
+            score += len(query_words.intersection(tokens)) * 0.2
+            consider(position, score)
+
+        for position, (_, name, _) in enumerate(entries):
+            if best_score > 1:
+                # A plain ratio never exceeds 1, so no remaining file can win
+                break
+            if position in candidates:
+                continue
+            floor = max(best_score, threshold)
+            matcher = SequenceMatcher(None, query_lower, name)
+            if matcher.real_quick_ratio() < floor or matcher.quick_ratio() < floor:
+                continue
+            consider(position, matcher.ratio())
+
+        if best_position is None or best_score <= threshold:
+            return None, best_score
+        return os.path.join(self.save_dir, entries[best_position][0]), best_score
+
+
+def get_image_index(save_dir):
+    """Returns the shared ImageIndex for a directory."""
+    key = os.path.abspath(save_dir)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = ImageIndex(save_dir)
+            _indexes[key] = index
+        return index
@@ -0,0 +1,120 @@
+# src/image_prep.py
+import os
+import threading
+from PIL import Image, ImageOps
+
+from src.image_store import file_sha256
+
+EMU_PER_INCH = 914400
+PREPARED_DIR = "prepared"
+# Suffix of the empty marker left when recompressing did not make an image smaller
+ORIGINAL_MARKER = ".original"
+
+# Pixel density and JPEG quality that images are prepared for before embedding
+IMAGE_TARGET_DPI = int(os.getenv("IMAGE_TARGET_DPI", "150"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "82"))
+
+# Pexels size variants from smallest to largest: (name, max width, max height)
+# None means the variant is not bounded in that direction.
+PEXELS_VARIANTS = [
+    ("small", None, 130),
+    ("medium", None, 350),
+    ("large", 940, 650),
+    ("large2x", 1880, 1300),
+]
+
+
+def box_to_pixels(width_emu, height_emu, dpi=None):
+    """Converts a placeholder box in EMU to pixel dimensions at the target DPI."""
+    dpi = dpi or IMAGE_TARGET_DPI
+    return (max(1, round(width_emu / EMU_PER_INCH * dpi)),
+            max(1, round(height_emu / EMU_PER_INCH * dpi)))
+
+
+def _variant_size(photo_width, photo_height, max_width, max_height):
+    scale = 1.0
+    if max_width:
+        scale = min(scale, max_width / photo_width)
+    if max_height:
+        scale = min(scale, max_height / photo_height)
+    return round(photo_width * scale), round(photo_height * scale)
+
+
+def choose_pexels_variant(photo, target_size=None):
+    """
+    Picks the smallest Pexels `src` variant that still covers target_size.
+    Returns (variant name, url, (width, height)).
+    """
+    src = photo.get("src", {})
+    photo_width = photo.get("width") or 0
+    photo_height = photo.get("height") or 0
+    original = ("original", src.get("original"), (photo_width, photo_height))
+    if not target_size or not photo_width or not photo_height:
+        return original
+
+    target_width, target_height = target_size
+    for name, max_width, max_height in PEXELS_VARIANTS:
+        if not src.get(name):
+            continue
+        width, height = _variant_size(photo_width, photo_height, max_width, max_height)
+        if width >= target_width and height >= target_height:
+            return name, src[name], (width, height)
+    return original
+
+
+def prepare_image(image_path, width_emu, height_emu, dpi=None, quality=None):
+    """
+    Downscales and recompresses an image to fit a placeholder box.
+
+    The result is cached next to the image store as
+    `<save_dir>/prepared/<digest>_<w>x<h>_q<quality>.<ext>`, so later decks
+    reuse it. When recompressing does not make the file smaller, an empty
+    `<same name>.original` marker records that the original is embedded, so
+    the image is not re-encoded on every deck.
+    Returns (path to embed, original bytes, prepared bytes).
+    """
+    quality = quality or IMAGE_JPEG_QUALITY
+    target_width, target_height = box_to_pixels(width_emu, height_emu, dpi)
+    original_bytes = os.path.getsize(image_path)
+
+    image_dir = os.path.dirname(image_path)
+    if os.path.basename(image_dir) == "blobs":
+        save_dir = os.path.dirname(image_dir)
+        digest = os.path.splitext(os.path.basename(image_path))[0]
+    else:
+        save_dir = image_dir
+        digest = file_sha256(image_path)
+    prepared_dir = os.path.join(save_dir, PREPARED_DIR)
+
+    with Image.open(image_path) as img:
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        ext = ".png" if has_alpha else ".jpg"
+        prepared_path = os.path.join(prepared_dir, f"{digest}_{target_width}x{target_height}_q{quality}{ext}")
+        if os.path.exists(prepared_path):
+            return prepared_path, original_bytes, os.path.getsize(prepared_path)
+        if os.path.exists(prepared_path + ORIGINAL_MARKER):
+            return image_path, original_bytes, original_bytes
+
+        img = ImageOps.exif_transpose(img)
+        # Scale so the image still covers the box (placeholders crop to fill)
+        scale = max(target_width / img.width, target_height / img.height)
+        if scale < 1:
+            img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))),
+                             Image.LANCZOS)
+
+        os.makedirs(prepared_dir, exist_ok=True)
+        tmp_path = f"{prepared_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if has_alpha:
+            img.save(tmp_path, format="PNG", optimize=True)
+        else:
+            img.convert("RGB").save(tmp_path, format="JPEG", quality=quality, optimize=True, progressive=True)
+
+    prepared_bytes = os.path.getsize(tmp_path)
+    if prepared_bytes >= original_bytes:
+        # Recompressing did not help; embed the original instead, now and on later decks
+        os.remove(tmp_path)
+        open(prepared_path + ORIGINAL_MARKER, "wb").close()
+        return image_path, original_bytes, original_bytes
+
+    os.replace(tmp_path, prepared_path)
+    return prepared_path, original_bytes, prepared_bytes
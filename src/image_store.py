@@ -0,0 +1,243 @@
+# src/image_store.py
+import os
+import sys
+import json
+import hashlib
+import fnmatch
+import argparse
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from src.metrics import get_logger, incr, setup_logging
+from src.utils import file_lock
+
+log = get_logger(__name__)
+
+BLOB_DIR = "blobs"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_LOCK_FILE = "manifest.lock"
+MANIFEST_VERSION = 1
+
+# Loose image patterns scanned in the image directory, in lookup order
+IMAGE_EXTENSIONS = ['*.jpg', '*.jpeg', '*.png', '*.gif', '*.bmp']
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def normalize_title(title):
+    """Normalizes a query/title into the key used by the manifest."""
+    return " ".join(title.lower().split())
+
+
+def file_sha256(path, chunk_size=65536):
+    """Returns the hex SHA-256 digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImageStore:
+    """
+    Content-addressed image store.
+
+    Blobs live in `<save_dir>/blobs/<sha256><ext>` and `blobs/manifest.json`
+    maps normalized titles and Pexels photo IDs to blob digests, so the same
+    photo is never downloaded or stored twice. Manifest updates hold a lock
+    file, so batch worker processes do not overwrite each other's entries.
+    """
+
+    def __init__(self, save_dir="images"):
+        self.save_dir = save_dir
+        self.blob_dir = os.path.join(save_dir, BLOB_DIR)
+        self.manifest_path = os.path.join(self.blob_dir, MANIFEST_FILE)
+        self.lock_path = os.path.join(self.blob_dir, MANIFEST_LOCK_FILE)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _updating(self):
+        """Serializes a manifest read-merge-write across threads and processes."""
+        with self._lock, file_lock(self.lock_path):
+            yield
+
+    def _empty_manifest(self):
+        return {"version": MANIFEST_VERSION, "blobs": {}, "titles": {}, "photos": {}}
+
+    def load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return self._empty_manifest()
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning(f"⚠️ Could not read image manifest {self.manifest_path}: {e}")
+            return self._empty_manifest()
+        for key, value in self._empty_manifest().items():
+            manifest.setdefault(key, value)
+        return manifest
+
+    def _save_manifest(self, manifest):
+        os.makedirs(self.blob_dir, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def blob_path(self, digest, manifest=None):
+        """Returns the on-disk path of a blob, or None if it is missing."""
+        manifest = manifest or self.load_manifest()
+        info = manifest["blobs"].get(digest)
+        if not info:
+            return None
+        path = os.path.join(self.blob_dir, f"{digest}{info.get('ext', '.jpg')}")
+        return path if os.path.exists(path) else None
+
+    def lookup_title(self, title):
+        manifest = self.load_manifest()
+        digest = manifest["titles"].get(normalize_title(title))
+        return self.blob_path(digest, manifest) if digest else None
+
+    def lookup_photo(self, photo_id, min_size=None):
+        """
+        Returns the blob for a Pexels photo ID. With min_size, a stored variant
+        smaller than (width, height) pixels is treated as missing.
+        """
+        manifest = self.load_manifest()
+        entry = manifest["photos"].get(str(photo_id))
+        if not entry:
+            return None
+        if min_size and entry.get("width") and entry.get("height"):
+            if entry["width"] < min_size[0] or entry["height"] < min_size[1]:
+                return None
+        return self.blob_path(entry["blob"], manifest)
+
+    def record(self, digest, titles=(), photo_id=None, **photo_info):
+        """Links titles and an optional Pexels photo ID to an existing blob."""
+        with self._updating():
+            manifest = self.load_manifest()
+            for title in titles:
+                if title:
+                    manifest["titles"][normalize_title(title)] = digest
+            if photo_id is not None:
+                manifest["photos"][str(photo_id)] = dict(photo_info, blob=digest)
+            self._save_manifest(manifest)
+
+    def add_file(self, path, titles=(), photo_id=None, **photo_info):
+        """
+        Adds a file to the store and returns the blob path.
+        The source file is moved (or removed when the blob already exists).
+        """
+        digest = file_sha256(path)
+        ext = os.path.splitext(path)[1].lower() or ".jpg"
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        with self._updating():
+            manifest = self.load_manifest()
+            existing = self.blob_path(digest, manifest)
+            if existing:
+                os.remove(path)
+                blob = existing
+            else:
+                blob = os.path.join(self.blob_dir, f"{digest}{ext}")
+                os.replace(path, blob)
+                manifest["blobs"][digest] = {"ext": ext, "size": os.path.getsize(blob)}
+            for title in titles:
+                if title:
+                    manifest["titles"][normalize_title(title)] = digest
+            if photo_id is not None:
+                manifest["photos"][str(photo_id)] = dict(photo_info, blob=digest)
+            self._save_manifest(manifest)
+        return blob
+
+    def download(self, url, session_get, titles=(), photo_id=None, **photo_info):
+        """Streams a URL into the store and returns the blob path."""
+        os.makedirs(self.blob_dir, exist_ok=True)
+        ext = os.path.splitext(urlparse(url).path)[1].lower()
+        if ext not in (".jpg", ".jpeg", ".png", ".gif", ".bmp"):
+            ext = ".jpg"
+        tmp_path = os.path.join(self.blob_dir, f"download-{os.getpid()}-{threading.get_ident()}{ext}")
+        try:
+            with session_get(url, stream=True) as response:
+                response.raise_for_status()
+                with open(tmp_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=8192):
+                        f.write(chunk)
+            incr("image_download_bytes", os.path.getsize(tmp_path))
+            return self.add_file(tmp_path, titles=titles, photo_id=photo_id, **photo_info)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def title_aliases(self):
+        """Returns (title, blob path relative to save_dir) pairs for indexing."""
+        manifest = self.load_manifest()
+        aliases = []
+        for title, digest in manifest["titles"].items():
+            info = manifest["blobs"].get(digest)
+            if info:
+                aliases.append((title, os.path.join(BLOB_DIR, f"{digest}{info.get('ext', '.jpg')}")))
+        return aliases
+
+    def collapse_duplicates(self, dry_run=False):
+        """
+        Moves every loose image in save_dir into the store, keeping each
+        filename as a title alias, so byte-identical copies share one blob.
+        Returns (files processed, bytes reclaimed).
+        """
+        names = sorted(n for n in os.listdir(self.save_dir) if os.path.isfile(os.path.join(self.save_dir, n)))
+        loose = [n for ext in IMAGE_EXTENSIONS for n in fnmatch.filter(names, ext) if not n.startswith(".")]
+
+        seen = set(self.load_manifest()["blobs"])
+        processed, reclaimed = 0, 0
+        for name in loose:
+            path = os.path.join(self.save_dir, name)
+            digest = file_sha256(path)
+            size = os.path.getsize(path)
+            title = os.path.splitext(name)[0]
+            if digest in seen:
+                reclaimed += size
+                log.info(f"♻️ Duplicate: {name} -> {digest[:12]}")
+            else:
+                seen.add(digest)
+            processed += 1
+            if not dry_run:
+                self.add_file(path, titles=[title])
+        return processed, reclaimed
+
+
+def get_image_store(save_dir="images"):
+    """Returns the shared ImageStore for a directory."""
+    key = os.path.abspath(save_dir)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = ImageStore(save_dir)
+            _stores[key] = store
+        return store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the content-addressed image store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    dedupe = subparsers.add_parser("dedupe", help="Collapse loose and duplicate images into the store")
+    dedupe.add_argument("--dir", default="images", help="Image directory")
+    dedupe.add_argument("--dry-run", action="store_true", help="Only report what would be reclaimed")
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    if not os.path.isdir(args.dir):
+        log.error(f"❌ Image directory not found: {args.dir}")
+        sys.exit(1)
+
+    if args.command == "dedupe":
+        store = get_image_store(args.dir)
+        processed, reclaimed = store.collapse_duplicates(dry_run=args.dry_run)
+        verb = "Would reclaim" if args.dry_run else "Reclaimed"
+        print(f"✅ Processed {processed} images. {verb} {reclaimed / (1024 * 1024):.1f} MB of duplicates.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# src/llm_backends.py
+"""
+LLM backends behind one interface, selected by a "provider:model" spec such
+as "gemini:models/gemini-2.0-flash" or "openai:gpt-4o-mini".
+
+Every backend call waits for a slot from src/rate_limit.py, is timed into a
+per-backend latency histogram, and keeps a window of recent latencies so
+hedged requests can fire after the backend's observed p95.
+"""
+import os
+import json
+import time
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import CancelledError
+
+from src import rate_limit
+from src.config import load_env, require_gemini_api_key
+from src.metrics import get_logger, span, incr, observe, current_span, record_span
+
+log = get_logger(__name__)
+
+# Token accounting for the rate limiter: a rough chars-per-token ratio, and the
+# output reserved before a call (corrected once the response is known)
+LLM_CHARS_PER_TOKEN = 4
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "2048"))
+# Recent latencies kept per backend for its p95
+LLM_LATENCY_WINDOW = 200
+
+_genai = None
+_sdk_lock = threading.Lock()
+_openai_client = None
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def estimate_tokens(*texts):
+    return sum(len(text) for text in texts) // LLM_CHARS_PER_TOKEN + 1
+
+
+def get_genai():
+    """
+    Imports and configures the Gemini SDK on first use, so commands that
+    never call Gemini neither pay for the import nor need an API key.
+    """
+    global _genai
+    with _sdk_lock:
+        if _genai is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=require_gemini_api_key())
+            _genai = genai
+        return _genai
+
+
+def get_openai_client():
+    global _openai_client
+    with _sdk_lock:
+        if _openai_client is None:
+            from openai import OpenAI
+
+            load_env()
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY not found in environment variables")
+            _openai_client = OpenAI(api_key=api_key)
+        return _openai_client
+
+
+class LLMBackend(ABC):
+    """Base class: subclasses implement _generate() and _stream() for one model."""
+
+    provider = None
+
+    def __init__(self, model, generation_config=None):
+        self.model = model
+        self.generation_config = generation_config or {}
+        self.latencies = deque(maxlen=LLM_LATENCY_WINDOW)
+        self._latency_lock = threading.Lock()
+
+    @property
+    def name(self):
+        return f"{self.provider}:{self.model}"
+
+    @property
+    def cache_id(self):
+        """Model identifier used in cache keys."""
+        return self.name
+
+    def latency_quantile(self, quantile=0.95, min_samples=5):
+        """Returns the quantile of recent non-streaming latencies, or None with too few samples."""
+        with self._latency_lock:
+            samples = sorted(self.latencies)
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(quantile * len(samples)))]
+
+    def _record_latency(self, seconds, mode):
+        observe("llm_latency_seconds", seconds, backend=self.name, mode=mode)
+        if mode == "generate":
+            with self._latency_lock:
+                self.latencies.append(seconds)
+
+    @contextmanager
+    def _scheduled(self, prompt, cancel=None):
+        """Waits for a provider slot; a quota error pauses every other caller as well."""
+        tokens = estimate_tokens(prompt) + LLM_EXPECTED_OUTPUT_TOKENS
+        with rate_limit.acquire(self.provider, tokens=tokens, cancel=cancel) as lease:
+            try:
+                yield lease
+            except Exception as e:
+                if rate_limit.is_quota_error(e):
+                    rate_limit.pause(self.provider)
+                raise
+
+    def _count_call(self, prompt, text):
+        incr("llm_calls", model=self.name)
+        incr("llm_prompt_chars", len(prompt), model=self.name)
+        incr("llm_response_chars", len(text), model=self.name)
+
+    def generate(self, prompt, cancel=None):
+        """
+        Returns the full response text for a prompt. With a `cancel` event the
+        response is streamed, so setting the event stops the request between
+        chunks (or while it waits for a slot) and raises CancelledError.
+        """
+        with self._scheduled(prompt, cancel) as lease, \
+                span("llm.generate", model=self.name, prompt_chars=len(prompt)) as attrs:
+            started = time.perf_counter()
+            text = (self._generate(prompt) if cancel is None else self._generate_cancellable(prompt, cancel)).strip()
+            self._record_latency(time.perf_counter() - started, "generate")
+            attrs["response_chars"] = len(text)
+            if lease:
+                lease.settle(estimate_tokens(prompt, text))
+        self._count_call(prompt, text)
+        return text
+
+    def _generate_cancellable(self, prompt, cancel):
+        parts = []
+        chunks = self._stream(prompt)
+        try:
+            for text in chunks:
+                if cancel.is_set():
+                    raise CancelledError(f"{self.name} call cancelled")
+                parts.append(text or "")
+        finally:
+            # Closing the stream ends the request instead of reading it to the end
+            chunks.close()
+        return "".join(parts)
+
+    def stream(self, prompt):
+        """Yields response text chunks as they are generated."""
+        parts = []
+        attrs = {"model": self.name, "prompt_chars": len(prompt)}
+        parent = current_span()
+        with self._scheduled(prompt) as lease:
+            # Timed by hand: the consumer may close this generator from another context
+            started = time.perf_counter()
+            status = "error"
+            try:
+                for text in self._stream(prompt):
+                    if text:
+                        parts.append(text)
+                        attrs.setdefault("first_chunk_seconds", time.perf_counter() - started)
+                        yield text
+                text = "".join(parts).strip()
+                attrs["response_chars"] = len(text)
+                status = "ok"
+            finally:
+                duration = time.perf_counter() - started
+                record_span("llm.stream", started, duration, status=status, parent=parent, **attrs)
+            self._record_latency(duration, "stream")
+            if lease:
+                lease.settle(estimate_tokens(prompt, text))
+        self._count_call(prompt, text)
+
+    @abstractmethod
+    def _generate(self, prompt):
+        """Returns the response text for a prompt."""
+
+    @abstractmethod
+    def _stream(self, prompt):
+        """Yields response text chunks for a prompt."""
+
+
+class GeminiBackend(LLMBackend):
+    provider = "gemini"
+
+    def __init__(self, model, generation_config=None):
+        super().__init__(model, generation_config)
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    @property
+    def cache_id(self):
+        # Bare model name, so responses cached before backends existed stay valid
+        return self.model
+
+    def _get_model(self):
+        with self._model_lock:
+            if self._model is None:
+                self._model = get_genai().GenerativeModel(self.model, generation_config=self.generation_config or None)
+            return self._model
+
+    def _generate(self, prompt):
+        response = self._get_model().generate_content(prompt)
+        if response and hasattr(response, "text"):
+            return response.text
+        return ""
+
+    def _stream(self, prompt):
+        for chunk in self._get_model().generate_content(prompt, stream=True):
+            try:
+                yield chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. safety or finish metadata)
+                continue
+
+
+class OpenAIBackend(LLMBackend):
+    provider = "openai"
+
+    # Gemini-style generation_config keys and their chat.completions equivalents
+    PARAMS = {"temperature": "temperature", "top_p": "top_p", "max_output_tokens": "max_tokens"}
+
+    def _request(self, prompt, **kwargs):
+        params = {self.PARAMS[key]: value for key, value in self.generation_config.items() if key in self.PARAMS}
+        return get_openai_client().chat.completions.create(
+            model=self.model, messages=[{"role": "user", "content": prompt}], **params, **kwargs)
+
+    def _generate(self, prompt):
+        response = self._request(prompt)
+        if not response.choices:
+            return ""
+        return response.choices[0].message.content or ""
+
+    def _stream(self, prompt):
+        chunks = self._request(prompt, stream=True)
+        try:
+            for chunk in chunks:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Ends the HTTP response when the consumer stops early
+            chunks.close()
+
+
+BACKEND_TYPES = {"gemini": GeminiBackend, "openai": OpenAIBackend}
+
+
+def get_llm_backend(spec, generation_config=None):
+    """
+    Returns the shared backend for a "provider:model" spec (a bare model name
+    means Gemini). Backends are reused, so SDK models are built once.
+    """
+    if isinstance(spec, LLMBackend):
+        return spec
+    provider, _, model = spec.partition(":")
+    if not model:
+        provider, model = "gemini", spec
+    if provider not in BACKEND_TYPES:
+        raise ValueError(f"Unknown LLM provider '{provider}' (expected one of: {', '.join(BACKEND_TYPES)})")
+    key = (provider, model, json.dumps(generation_config or {}, sort_keys=True))
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            backend = _backends[key] = BACKEND_TYPES[provider](model, generation_config)
+        return backend
@@ -1,38 +1,201 @@
 import os
-from pathlib import Path
-from dotenv import load_dotenv
-import google.generativeai as genai
+import hashlib
+import threading
+import contextvars
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+
+from src.llm_backends import get_llm_backend
+from src.cache import load_cache, save_cache, make_key
+from src.metrics import get_logger, incr
+
+log = get_logger(__name__)
+
+DEFAULT_GEMINI_MODEL = "models/gemini-2.0-flash"
+
+# Backend specs ("provider:model", e.g. "openai:gpt-4o-mini"): the default, an
+# optional one per pipeline stage (e.g. a fast model for the search query and a
+# stronger one for synthesis), and an optional second backend for hedging
+LLM_BACKEND = os.getenv("LLM_BACKEND")
+LLM_STAGE_BACKENDS = {
+    "query": os.getenv("LLM_QUERY_BACKEND"),
+    "synthesis": os.getenv("LLM_SYNTHESIS_BACKEND"),
+}
+LLM_HEDGE_BACKEND = os.getenv("LLM_HEDGE_BACKEND")
+# The hedge fires once the primary is slower than its recent p95, or after
+# LLM_HEDGE_DELAY seconds while it has too few samples for one
+LLM_HEDGE_QUANTILE = 0.95
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "8"))
+
+
+def _start_call(backend, prompt, cancel):
+    """
+    Runs backend.generate on its own thread and returns a Future for it. A
+    thread per call (not a pool) means a straggler never delays a later hedge.
+    """
+    future = Future()
+    # The call runs in a copy of this context so spans and priority carry over
+    context = contextvars.copy_context()
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(context.run(backend.generate, prompt, cancel=cancel))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=f"llm-hedge-{backend.provider}", daemon=True).start()
+    return future
 
 
 class LLMClient:
-    def __init__(self):
-        # ✅ Force load .env from project root
-        base_dir = Path(__file__).resolve().parents[1]
-        env_path = base_dir / ".env"
-        load_dotenv(dotenv_path=env_path)
+    def __init__(self, model_name=DEFAULT_GEMINI_MODEL, generation_config=None,
+                 cache=False, refresh=False, cache_ttl=None,
+                 backend=None, stage_backends=None, hedge_backend=None, hedge_delay=None):
+        """
+        backend: default "provider:model" spec (LLM_BACKEND, else Gemini `model_name`).
+        stage_backends: {"query": spec, "synthesis": spec} overrides per pipeline stage.
+        hedge_backend: spec of a second backend that is also asked when a call
+            runs past the primary's p95 latency; the first valid answer wins.
+        cache: memoize generate() results in src/cache.py (opt-in).
+        refresh: ignore cached results but store the fresh ones.
+        cache_ttl: lifetime of cached responses in seconds (default CACHE_TTL).
+        """
+        # SDKs are imported and configured on the first uncached call, not here
+        self.generation_config = generation_config or {}
+        self.backend = get_llm_backend(backend or LLM_BACKEND or f"gemini:{model_name}", self.generation_config)
+        stages = {stage: spec for stage, spec in LLM_STAGE_BACKENDS.items() if spec}
+        stages.update({stage: spec for stage, spec in (stage_backends or {}).items() if spec})
+        self.stage_backends = {stage: get_llm_backend(spec, self.generation_config) for stage, spec in stages.items()}
+        hedge_backend = hedge_backend or LLM_HEDGE_BACKEND
+        self.hedge_backend = get_llm_backend(hedge_backend, self.generation_config) if hedge_backend else None
+        self.hedge_delay = LLM_HEDGE_DELAY if hedge_delay is None else hedge_delay
+        self.model_name = self.backend.name
 
-        # Load Gemini API key
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError(f"GEMINI_API_KEY not found in environment variables (looked in {env_path})")
+        self.cache = cache
+        self.refresh = refresh
+        self.cache_ttl = cache_ttl
 
-        genai.configure(api_key=api_key)
+    def backend_for(self, stage=None):
+        """Returns the backend serving a pipeline stage ("query", "synthesis")."""
+        return self.stage_backends.get(stage, self.backend)
 
-        # Choose Gemini model (can adjust if needed)
-        self.model = genai.GenerativeModel("models/gemini-2.0-flash")
+    def _cache_key(self, prompt: str, backend) -> str:
+        return make_key(
+            "llm",
+            model=backend.cache_id,
+            prompt=hashlib.sha256(prompt.encode()).hexdigest(),
+            params=self.generation_config,
+        )
 
-    def generate(self, prompt: str) -> str:
+    def _load_cached(self, key):
+        if key and not self.refresh:
+            cached = load_cache(key)
+            if cached is not None:
+                log.info("♻️ Using cached LLM response")
+                return cached
+        return None
+
+    def generate(self, prompt: str, stage=None) -> str:
         """
-        Generate raw text output from Gemini for a given prompt.
+        Generate raw text output for a prompt with the stage's backend,
+        hedged with the hedge backend when one is configured.
         """
-        response = self.model.generate_content(prompt)
-        if response and hasattr(response, "text"):
-            return response.text.strip()
-        return ""
+        backend = self.backend_for(stage)
+        key = self._cache_key(prompt, backend) if self.cache else None
+        cached = self._load_cached(key)
+        if cached is not None:
+            return cached
+
+        if self.hedge_backend is not None and self.hedge_backend is not backend:
+            text, answered_by = self._generate_hedged(prompt, backend, self.hedge_backend)
+            # An answer from the hedge backend is cached as that model's answer
+            if key and answered_by is not backend:
+                key = self._cache_key(prompt, answered_by)
+        else:
+            text = backend.generate(prompt)
+
+        if key and text:
+            save_cache(key, text, ttl=self.cache_ttl)
+        return text
+
+    def _generate_hedged(self, prompt, primary, hedge):
+        """
+        Asks `primary`; if it has not produced a valid answer by its p95
+        latency, asks `hedge` as well, and if it fails or answers empty, asks
+        `hedge` instead. Returns (text, backend) for the first non-empty
+        answer; the other call is cancelled.
+        """
+        delay = primary.latency_quantile(LLM_HEDGE_QUANTILE)
+        if delay is None:
+            delay = self.hedge_delay
+
+        calls = {}
+
+        def ask(backend):
+            cancel = threading.Event()
+            calls[_start_call(backend, prompt, cancel)] = (backend, cancel)
+
+        ask(primary)
+        hedged = False
+        errors = []
+        try:
+            while calls:
+                done, _ = wait(calls, timeout=None if hedged else delay, return_when=FIRST_COMPLETED)
+                for future in done:
+                    backend, _ = calls.pop(future)
+                    try:
+                        text = future.result()
+                    except Exception as e:
+                        log.warning(f"⚠️ {backend.name} failed: {e}")
+                        errors.append(e)
+                        continue
+                    if text:
+                        if hedged:
+                            incr("llm_hedge_wins", backend=backend.name)
+                        return text, backend
+                if not hedged:
+                    hedged = True
+                    if calls:
+                        incr("llm_hedges", primary=primary.name, hedge=hedge.name)
+                        log.info(f"⏩ No answer from {primary.name} within {delay:.1f}s; also asking {hedge.name}")
+                    else:
+                        incr("llm_hedge_fallbacks", primary=primary.name, hedge=hedge.name)
+                        log.info(f"↪️ No answer from {primary.name}; asking {hedge.name} instead")
+                    ask(hedge)
+        finally:
+            # The losing call stops at its next chunk, freeing its rate-limit slot
+            for _, cancel in calls.values():
+                cancel.set()
+
+        if errors:
+            raise errors[-1]
+        return "", primary
+
+    def generate_stream(self, prompt: str, stage=None):
+        """
+        Yield text chunks from the stage's backend as they are generated. A
+        cached response is yielded as a single chunk; a completed stream is
+        cached. Streams are not hedged.
+        """
+        backend = self.backend_for(stage)
+        key = self._cache_key(prompt, backend) if self.cache else None
+        cached = self._load_cached(key)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        for text in backend.stream(prompt):
+            parts.append(text)
+            yield text
+
+        text = "".join(parts).strip()
+        if key and text:
+            save_cache(key, text, ttl=self.cache_ttl)
 
     def synthesize(self, topic, web_results):
         """
-        Calls Gemini to generate structured slide content.
+        Calls the LLM to generate structured slide content.
         """
         prompt = f"""
         Create a structured slide outline for a PowerPoint presentation on: {topic}.
@@ -0,0 +1,133 @@
+# src/lookup_cache.py
+"""
+Cache for the search and image lookups, in front of SerpAPI and Pexels.
+
+Results are kept in the shared cache (src/cache.py) with a freshness time.
+A fresh result is returned as is. A stale one, up to LOOKUP_STALE_SECONDS
+past freshness, is also returned at once, and a background thread fetches
+a replacement. Empty results ("no images found") are remembered for
+LOOKUP_NEGATIVE_TTL and failed calls for LOOKUP_ERROR_TTL, so the same
+dead-end request is not repeated by every deck. All lifetimes get
+LOOKUP_JITTER of random spread, so entries written together do not all
+expire, and refresh, together.
+"""
+import os
+import time
+import random
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from src.cache import load_cache, save_cache, make_key, CACHE_TTL
+from src.metrics import get_logger, incr
+
+log = get_logger(__name__)
+
+# Put the lookup cache in front of SerpAPI and Pexels at all
+LOOKUP_CACHE = os.getenv("LOOKUP_CACHE", "1") == "1"
+# How long past freshness a result is still served while it is refreshed
+LOOKUP_STALE_SECONDS = int(os.getenv("LOOKUP_STALE_SECONDS", str(CACHE_TTL)))
+# How long an empty result, and a failed call, are remembered
+LOOKUP_NEGATIVE_TTL = int(os.getenv("LOOKUP_NEGATIVE_TTL", "3600"))
+LOOKUP_ERROR_TTL = int(os.getenv("LOOKUP_ERROR_TTL", "300"))
+# Random spread applied to every lifetime, as a fraction of it
+LOOKUP_JITTER = float(os.getenv("LOOKUP_JITTER", "0.1"))
+# Background threads refreshing stale results
+LOOKUP_REFRESH_WORKERS = int(os.getenv("LOOKUP_REFRESH_WORKERS", "2"))
+
+_executor = None
+_refreshing = set()
+_lock = threading.Lock()
+
+
+def _jittered(seconds):
+    return seconds * random.uniform(1 - LOOKUP_JITTER, 1 + LOOKUP_JITTER)
+
+
+def _store(key, value, fresh_seconds, now):
+    """Saves a fetched value: results for freshness plus the stale window, empty ones briefly."""
+    if value:
+        fresh_until = now + _jittered(fresh_seconds)
+        expires_at = fresh_until + LOOKUP_STALE_SECONDS
+    else:
+        fresh_until = expires_at = now + _jittered(LOOKUP_NEGATIVE_TTL)
+    save_cache(key, {"value": value, "fresh_until": fresh_until, "expires_at": expires_at},
+                ttl=max(1, int(expires_at - now)))
+
+
+def _store_error(key, entry, error, now):
+    if entry is not None and entry["value"]:
+        # Keep serving the stale result, and try again after the error TTL, but never past its expiry
+        fresh_until = now + _jittered(LOOKUP_ERROR_TTL)
+        if fresh_until < entry["expires_at"]:
+            save_cache(key, dict(entry, fresh_until=fresh_until), ttl=max(1, int(entry["expires_at"] - now)))
+        return
+    expires_at = now + _jittered(LOOKUP_ERROR_TTL)
+    save_cache(key, {"value": None, "fresh_until": expires_at, "expires_at": expires_at, "error": str(error)},
+               ttl=max(1, int(expires_at - now)))
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=LOOKUP_REFRESH_WORKERS, thread_name_prefix="lookup-refresh")
+        return _executor
+
+
+def _refresh(namespace, key, entry, fetch, fresh_seconds):
+    try:
+        value = fetch()
+    except Exception as e:
+        log.warning(f"⚠️ Background refresh of a cached {namespace} lookup failed: {e}")
+        _store_error(key, entry, e, time.time())
+        incr("lookup_refreshes", namespace=namespace, outcome="failed")
+    else:
+        _store(key, value, fresh_seconds, time.time())
+        incr("lookup_refreshes", namespace=namespace, outcome="ok")
+    finally:
+        with _lock:
+            _refreshing.discard(key)
+
+
+def _schedule_refresh(namespace, key, entry, fetch, fresh_seconds):
+    """Starts one background refresh per key; later callers keep getting the stale value meanwhile."""
+    with _lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    _get_executor().submit(contextvars.copy_context().run, _refresh, namespace, key, entry, fetch, fresh_seconds)
+
+
+def cached_lookup(namespace, parts, fetch, fresh_seconds, default=None):
+    """
+    Returns fetch()'s result for the lookup identified by `namespace` and the
+    `parts` dict, through the cache. Falsy results count as misses. While a
+    failure is remembered, `default` is returned without calling fetch();
+    the call that fails still raises, so callers report it once.
+    """
+    if not LOOKUP_CACHE:
+        return fetch()
+
+    key = make_key(f"lookup-{namespace}", **parts)
+    entry = load_cache(key)
+    now = time.time()
+    if entry is not None:
+        if not entry["value"]:
+            incr("lookups_cached", namespace=namespace, outcome="negative")
+            return default if entry.get("error") else entry["value"]
+        if now >= entry["fresh_until"]:
+            incr("lookups_cached", namespace=namespace, outcome="stale")
+            _schedule_refresh(namespace, key, entry, fetch, fresh_seconds)
+        else:
+            incr("lookups_cached", namespace=namespace, outcome="fresh")
+        return entry["value"]
+
+    incr("lookups_cached", namespace=namespace, outcome="miss")
+    try:
+        value = fetch()
+    except Exception as e:
+        _store_error(key, None, e, now)
+        raise
+    _store(key, value, fresh_seconds, now)
+    return value
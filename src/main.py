@@ -1,67 +1,146 @@
-import argparse
-from dotenv import load_dotenv
-import os
-import re # Added import for the 're' module
-
-# Load environment variables at the very beginning
-load_dotenv()
-
-# Correctly import all necessary components
-from src.search_client import serpapi_search
-from src.synthesizer import synthesize
-from src.ppt_generator import create_presentation
-from src.llm_client import LLMClient
-from src.config import MAX_SEARCH_RESULTS
 import sys
+import argparse
+import importlib
+
+# Subcommand -> (module, function, help). A command's module is imported only
+# when that command runs, so `--help` and maintenance commands start quickly
+# and never load the Gemini SDK or python-pptx.
+COMMANDS = {
+    "generate": ("src.main", "generate", "Generate one deck (the default when no command is given)"),
+    "batch": ("src.batch", "main", "Generate many decks from a topic list"),
+    "serve": ("src.service", "main", "Run the local deck generation service"),
+    "analyze-template": ("src.main", "analyze", "Print the layouts and placeholders of a template"),
+    "cache": ("src.cache", "main", "Cache maintenance (migrate, evict)"),
+    "images": ("src.image_store", "main", "Image store maintenance (dedupe)"),
+    "benchmark": ("src.benchmark", "main", "Run the offline pipeline benchmark"),
+}
+
+
+def generate(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.main generate", description="Generate one deck")
+    parser.add_argument("--topic", help="Presentation topic")
+    parser.add_argument("--output", help="Output pptx filename")
+    parser.add_argument("--template", help="PowerPoint template path")
+    parser.add_argument("--from-spec", default=None,
+                        help="Re-render a saved deck spec (.spec.json) without search or LLM calls; "
+                             "--output and --template default to the spec's")
+    parser.add_argument("--no-spec", dest="write_spec", action="store_false", default=None,
+                        help="Do not save the deck spec next to the output")
+    parser.add_argument("--image-workers", type=int, default=None, help="Number of slide images fetched concurrently")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write cached LLM responses")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached LLM responses and store fresh ones")
+    parser.add_argument("--context-budget", type=int, default=None,
+                        help="Token budget for search context in the synthesis prompt (0 = no limit)")
+    parser.add_argument("--fetch-pages", action="store_true", default=None,
+                        help="Also read the linked pages and add their main text to the search context")
+    parser.add_argument("--no-topic-reuse", dest="topic_reuse", action="store_false", default=None,
+                        help="Always run query generation and search, even for a near-duplicate earlier topic")
+    parser.add_argument("--subqueries", type=int, default=None,
+                        help="Search this many LLM-written queries concurrently and merge the results (default 1)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Run the asyncio pipeline that overlaps image lookups with rendering")
+    parser.add_argument("--llm", default=None, help="LLM backend as provider:model (e.g. openai:gpt-4o-mini)")
+    parser.add_argument("--query-llm", default=None, help="Backend for the search query stage")
+    parser.add_argument("--synthesis-llm", default=None, help="Backend for the slide synthesis stage")
+    parser.add_argument("--hedge-llm", default=None,
+                        help="Second backend asked when the first is slower than its p95 latency")
+    parser.add_argument("--log-level", default="INFO", help="Logging level (DEBUG, INFO, WARNING, ERROR)")
+    parser.add_argument("--trace", default=None, help="Write the run's spans and counters to this JSON file")
+    parser.add_argument("--metrics-file", default=None, help="Write counters and span totals in Prometheus text format")
+    args = parser.parse_args(argv)
+    if not args.from_spec:
+        missing = [f"--{name}" for name in ("topic", "output", "template") if not getattr(args, name)]
+        if missing:
+            parser.error(f"the following arguments are required without --from-spec: {', '.join(missing)}")
+
+    from src import metrics
+
+    log = metrics.get_logger(__name__)
+    metrics.setup_logging(args.log_level)
+    metrics.reset()
+
+    if args.from_spec:
+        from src.deck_spec import read_spec
+        from src.ppt_generator import create_presentation_from_spec
+
+        spec = read_spec(args.from_spec)
+        output = args.output or spec["output"]
+        with metrics.span("render", slides=len(spec["slides"])):
+            create_presentation_from_spec(spec, output, args.template)
+        log.info(f"✅ Done! Slide deck re-rendered from {args.from_spec} to {output}")
+        _write_metrics(args, log)
+        return
+
+    from src.llm_client import LLMClient
+    from src.pipeline import generate_deck
+
+    llm_client = LLMClient(cache=not args.no_cache, refresh=args.refresh, backend=args.llm,
+                           stage_backends={"query": args.query_llm, "synthesis": args.synthesis_llm},
+                           hedge_backend=args.hedge_llm)
+
+    if args.use_async:
+        import asyncio
+        from src.async_pipeline import generate_deck_async
+        asyncio.run(generate_deck_async(args.topic, args.output, args.template, llm_client,
+                                        context_budget=args.context_budget, fetch_pages=args.fetch_pages,
+                                        topic_reuse=args.topic_reuse, write_spec=args.write_spec,
+                                        subqueries=args.subqueries))
+    else:
+        generate_deck(args.topic, args.output, args.template, llm_client, image_workers=args.image_workers,
+                      context_budget=args.context_budget, fetch_pages=args.fetch_pages, topic_reuse=args.topic_reuse,
+                      write_spec=args.write_spec, subqueries=args.subqueries)
+
+    log.info(f"✅ Done! Slide deck saved to {args.output}")
+    _write_metrics(args, log)
+
+
+def _write_metrics(args, log):
+    from src import metrics
+
+    if args.trace:
+        metrics.write_trace(args.trace)
+        log.info(f"🧭 Trace written to {args.trace}")
+    if args.metrics_file:
+        metrics.write_prometheus(args.metrics_file)
+        log.info(f"📈 Metrics written to {args.metrics_file}")
+
+
+def analyze(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.main analyze-template",
+                                     description="Print the layouts and placeholders of a template")
+    parser.add_argument("templates", nargs="+", help="PowerPoint template paths")
+    args = parser.parse_args(argv)
+
+    from src.template_analyzer import analyze_template
+
+    for template in args.templates:
+        analyze_template(template)
+
+
+def _print_usage():
+    print("usage: python -m src.main [command] [options]\n")
+    print("commands:")
+    for name, (_, _, help_text) in COMMANDS.items():
+        print(f"  {name:<18} {help_text}")
+    print("\nRun `python -m src.main <command> --help` for a command's options.")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in ("-h", "--help"):
+        _print_usage()
+        return
+    if argv and argv[0] in COMMANDS:
+        command, argv = argv[0], argv[1:]
+    else:
+        # `python -m src.main --topic ...` keeps working as before
+        command = "generate"
+
+    module_name, function_name, _ = COMMANDS[command]
+    # Commands defined here run from this module even when it was started as __main__
+    module = sys.modules[__name__] if module_name == "src.main" else importlib.import_module(module_name)
+    getattr(module, function_name)(argv)
 
-PROMPT_FILE = "prompts.md"
-
-def _read_prompt_template(file_path, section_name):
-    """Reads a specific section of the prompt template from a file."""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            # Use regex to find the specific section
-            match = re.search(rf"{section_name}:\n(.*?)(?=\n---|\Z)", content, re.DOTALL)
-            if match:
-                return match.group(1).strip()
-            else:
-                print(f"Error: Section '{section_name}' not found in {file_path}", file=sys.stderr)
-                sys.exit(1)
-    except FileNotFoundError:
-        print(f"Error: Prompt file not found at {file_path}", file=sys.stderr)
-        sys.exit(1)
-
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--topic", required=True, help="Presentation topic")
-    parser.add_argument("--output", required=True, help="Output pptx filename")
-    parser.add_argument("--template", required=True, help="PowerPoint template path")
-    args = parser.parse_args()
-
-    llm_client = LLMClient()
-
-    print("📝 Generating optimized search query...")
-    search_query_prompt_template = _read_prompt_template(PROMPT_FILE, "SEARCH_QUERY_GENERATION_PROMPT")
-    search_query_prompt = search_query_prompt_template.format(topic=args.topic)
-    optimized_search_query = llm_client.generate(search_query_prompt).strip()
-    print(f"Generated Search Query: {optimized_search_query}")
-
-    print("🔍 Searching web...")
-    # Pass the integer MAX_SEARCH_RESULTS to the search function
-    web_results = serpapi_search(optimized_search_query, num_results=MAX_SEARCH_RESULTS)
-    
-    # The search results are a list of dictionaries, but the synthesizer expects
-    # a list of strings, so we reformat them.
-    search_context = [f"{r['title']}: {r['snippet']}" for r in web_results]
-    
-    print("🧠 Synthesizing content via LLM...")
-    structured = synthesize(args.topic, search_context, llm_client)
-
-    print("📑 Generating PowerPoint deck...")
-    create_presentation(structured, args.output, args.template)
-
-    print(f"✅ Done! Slide deck saved to {args.output}")
 
 if __name__ == "__main__":
     main()
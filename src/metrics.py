@@ -0,0 +1,220 @@
+# src/metrics.py
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+LOG_FORMAT = "%(message)s"
+# Upper bounds (seconds) of the latency histogram buckets
+HISTOGRAM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+# Individual spans kept for traces; older ones are dropped (totals are kept)
+METRICS_MAX_SPANS = int(os.getenv("METRICS_MAX_SPANS", "10000"))
+
+_lock = threading.Lock()
+_spans = deque(maxlen=METRICS_MAX_SPANS)
+_counters = {}
+_span_totals = {}
+_histograms = {}
+_trace_started = time.time()
+_clock_started = time.perf_counter()
+_current_span = contextvars.ContextVar("current_span", default=None)
+_span_ids = iter(range(1, 1 << 62))
+
+
+def setup_logging(level="INFO"):
+    """
+    Routes the pipeline's progress messages through logging at `level`.
+    INFO keeps the familiar emoji progress lines; WARNING shows only problems.
+    """
+    logging.basicConfig(level=getattr(logging, str(level).upper(), logging.INFO), format=LOG_FORMAT, force=True)
+
+
+def get_logger(name):
+    return logging.getLogger(name)
+
+
+def reset():
+    """Clears all spans and counters, e.g. at the start of a run."""
+    global _trace_started, _clock_started
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+        _span_totals.clear()
+        _histograms.clear()
+        _trace_started = time.time()
+        _clock_started = time.perf_counter()
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def incr(name, value=1, **labels):
+    """Adds `value` to a counter, optionally split by labels."""
+    key = (name, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    """Records one sample (e.g. a latency in seconds) in a histogram."""
+    key = (name, _label_key(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": [0] * len(HISTOGRAM_BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(HISTOGRAM_BUCKETS):
+            if value <= bound:
+                histogram["buckets"][i] += 1
+                break
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Times a block as a named span. Spans nest within a thread or task, and
+    attributes can be added while it runs through the yielded dict.
+    """
+    with _lock:
+        span_id = next(_span_ids)
+    parent = _current_span.get()
+    token = _current_span.set(span_id)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield attrs
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _current_span.reset(token)
+        _record_span(span_id, parent, name, start, duration, status, attrs)
+
+
+def _record_span(span_id, parent, name, start, duration, status, attrs):
+    record = {
+        "id": span_id,
+        "parent": parent,
+        "name": name,
+        "start": start - _clock_started,
+        "duration": duration,
+        "status": status,
+        "thread": threading.current_thread().name,
+        "attrs": attrs,
+    }
+    with _lock:
+        _spans.append(record)
+        count, total = _span_totals.get(name, (0, 0.0))
+        _span_totals[name] = (count + 1, total + duration)
+
+
+def current_span():
+    """Returns the id of the innermost open span in this thread or task, or None."""
+    return _current_span.get()
+
+
+def record_span(name, start, duration, status="ok", parent=None, **attrs):
+    """
+    Records a span the caller timed itself (`start` from time.perf_counter()).
+    Generators use this instead of span(): a span left open across a yield
+    would parent the consumer's spans and fail if closed from another context.
+    """
+    with _lock:
+        span_id = next(_span_ids)
+    _record_span(span_id, parent, name, start, duration, status, attrs)
+
+
+def snapshot():
+    """Returns the recorded spans and counters as plain JSON-friendly data."""
+    with _lock:
+        spans = [dict(record) for record in _spans]
+        counters = [{"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(_counters.items())]
+        histograms = [{"name": name, "labels": dict(labels), "bounds": list(HISTOGRAM_BUCKETS),
+                       "buckets": list(histogram["buckets"]), "sum": histogram["sum"], "count": histogram["count"]}
+                      for (name, labels), histogram in sorted(_histograms.items())]
+    return {"started_at": _trace_started, "spans": spans, "counters": counters, "histograms": histograms}
+
+
+def counter_value(name, **labels):
+    with _lock:
+        if labels:
+            return _counters.get((name, _label_key(labels)), 0)
+        return sum(value for (counter, _), value in _counters.items() if counter == name)
+
+
+def write_trace(path):
+    """Writes the run's spans and counters to a JSON trace file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=2, default=str)
+
+
+def _prometheus_name(name):
+    return "slides_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ""
+    escaped = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def prometheus_text():
+    """Renders counters and span duration summaries in Prometheus text format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        span_totals = sorted(_span_totals.items())
+        histograms = [(key, dict(histogram, buckets=list(histogram["buckets"])))
+                      for key, histogram in sorted(_histograms.items())]
+
+    lines = []
+    seen = set()
+    for (name, labels), value in counters:
+        metric = _prometheus_name(name) + "_total"
+        if metric not in seen:
+            lines.append(f"# TYPE {metric} counter")
+            seen.add(metric)
+        lines.append(f"{metric}{_prometheus_labels(labels)} {value}")
+
+    seen = set()
+    for (name, labels), histogram in histograms:
+        metric = _prometheus_name(name)
+        if metric not in seen:
+            lines.append(f"# TYPE {metric} histogram")
+            seen.add(metric)
+        cumulative = 0
+        for bound, count in zip(HISTOGRAM_BUCKETS, histogram["buckets"]):
+            cumulative += count
+            lines.append(f"{metric}_bucket{_prometheus_labels(labels + (('le', bound),))} {cumulative}")
+        lines.append(f"{metric}_bucket{_prometheus_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+        lines.append(f"{metric}_sum{_prometheus_labels(labels)} {histogram['sum']:.6f}")
+        lines.append(f"{metric}_count{_prometheus_labels(labels)} {histogram['count']}")
+
+    if span_totals:
+        lines.append("# TYPE slides_span_duration_seconds summary")
+    for name, (count, total) in span_totals:
+        lines.append(f'slides_span_duration_seconds_count{{span="{name}"}} {count}')
+        lines.append(f'slides_span_duration_seconds_sum{{span="{name}"}} {total:.6f}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """Writes the Prometheus text exposition to a file (e.g. for node_exporter's textfile collector)."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
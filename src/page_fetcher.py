@@ -0,0 +1,248 @@
+# src/page_fetcher.py
+"""
+Optional stage that fetches the pages behind search results and extracts
+their main text, so synthesis sees more than the short snippets.
+
+Pages are fetched concurrently with a bounded pool. Each read is streamed
+and stops at PAGE_MAX_BYTES or PAGE_TIMEOUT. Extracted text is cached by
+URL with the page's ETag/Last-Modified: within PAGE_FRESH_SECONDS a repeat
+topic reuses the text with no network at all, and after that a conditional
+request revalidates it.
+"""
+import os
+import re
+import time
+import threading
+import contextvars
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor
+
+from src import http_client
+from src.cache import load_cache, save_cache, make_key
+from src.metrics import get_logger, span, incr
+
+log = get_logger(__name__)
+
+# Run the stage at all (also --fetch-pages), and how many pages load at once
+PAGE_FETCH = os.getenv("PAGE_FETCH", "0") == "1"
+PAGE_FETCH_WORKERS = int(os.getenv("PAGE_FETCH_WORKERS", "8"))
+# Per-page limits: bytes read, total seconds, and characters of text kept
+PAGE_MAX_BYTES = int(os.getenv("PAGE_MAX_BYTES", str(512 * 1024)))
+PAGE_TIMEOUT = float(os.getenv("PAGE_TIMEOUT", "5"))
+PAGE_TEXT_CHARS = int(os.getenv("PAGE_TEXT_CHARS", "4000"))
+# Cached text younger than this is used without revalidating
+PAGE_FRESH_SECONDS = int(os.getenv("PAGE_FRESH_SECONDS", str(24 * 3600)))
+# Text blocks shorter than this are menus, buttons and captions
+PAGE_MIN_BLOCK_WORDS = 8
+# Minimum words inside <article>/<main> before the rest of the page is ignored
+PAGE_MIN_MAIN_WORDS = 50
+
+PAGE_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+# Error statuses that say the page is gone for good; other errors are retried on the next run
+PAGE_GONE_STATUSES = (404, 410)
+PAGE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; AI-Slides/1.0)",
+    "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9",
+}
+
+_session = None
+_session_lock = threading.Lock()
+_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+
+
+class _TextExtractor(HTMLParser):
+    """Collects text blocks, skipping scripts and page chrome, and notes which are inside <article>/<main>."""
+
+    SKIP = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "button",
+            "select", "iframe", "template"}
+    MAIN = {"article", "main"}
+    BLOCKS = {"p", "li", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "td", "th", "dd", "dt",
+              "div", "section", "br", "tr", "table", "ul", "ol", "figcaption"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.skip_depth = 0
+        self.main_depth = 0
+        self.blocks = []
+        self.current = []
+
+    def _flush(self):
+        text = " ".join("".join(self.current).split())
+        if text:
+            self.blocks.append((text, self.main_depth > 0))
+        self.current = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self.skip_depth += 1
+        elif tag in self.MAIN or tag in self.BLOCKS:
+            self._flush()
+            if tag in self.MAIN:
+                self.main_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in self.BLOCKS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in self.MAIN or tag in self.BLOCKS:
+            self._flush()
+            if tag in self.MAIN:
+                self.main_depth = max(0, self.main_depth - 1)
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.current.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def extract_main_text(html, max_chars=PAGE_TEXT_CHARS):
+    """
+    Returns the readable body text of an HTML page: blocks of at least
+    PAGE_MIN_BLOCK_WORDS words, taken from <article>/<main> when those hold
+    enough text, one block per line, cut to `max_chars` at a block boundary.
+    """
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+
+    blocks = [(text, in_main) for text, in_main in parser.blocks if len(text.split()) >= PAGE_MIN_BLOCK_WORDS]
+    main_blocks = [text for text, in_main in blocks if in_main]
+    if sum(len(text.split()) for text in main_blocks) >= PAGE_MIN_MAIN_WORDS:
+        texts = main_blocks
+    else:
+        texts = [text for text, _ in blocks]
+
+    kept = []
+    size = 0
+    for text in texts:
+        if size + len(text) > max_chars:
+            break
+        kept.append(text)
+        size += len(text) + 1
+    return "\n".join(kept)
+
+
+def _get_session():
+    """One session for all page hosts, so one-off hosts do not each get a pool."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=PAGE_FETCH_WORKERS * 2, pool_maxsize=PAGE_FETCH_WORKERS)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def _decode(body, content_type):
+    match = re.search(r"charset=([\w-]+)", content_type or "", re.IGNORECASE)
+    charset = match.group(1) if match else None
+    if not charset:
+        meta = _CHARSET_RE.search(body[:2048])
+        charset = meta.group(1).decode("ascii", "ignore") if meta else "utf-8"
+    try:
+        return body.decode(charset, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+def _read_capped(response, deadline):
+    """Streams the body until PAGE_MAX_BYTES or the deadline; returns (bytes, truncated)."""
+    chunks = []
+    size = 0
+    for chunk in response.iter_content(chunk_size=16384):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= PAGE_MAX_BYTES or time.monotonic() > deadline:
+            return b"".join(chunks)[:PAGE_MAX_BYTES], True
+    return b"".join(chunks), False
+
+
+def fetch_page(url):
+    """Returns the main text of a page ("" when it cannot be used), from cache when possible."""
+    key = make_key("page", url=url, max_chars=PAGE_TEXT_CHARS)
+    cached = load_cache(key)
+    now = time.time()
+    if cached is not None and now - cached.get("checked_at", 0) < PAGE_FRESH_SECONDS:
+        incr("pages", outcome="cached")
+        return cached["text"]
+
+    headers = dict(PAGE_HEADERS)
+    if cached is not None:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    deadline = time.monotonic() + PAGE_TIMEOUT
+    try:
+        with http_client.get(url, session=_get_session(), headers=headers, stream=True,
+                             timeout=PAGE_TIMEOUT, max_retries=1) as response:
+            if response.status_code == 304 and cached is not None:
+                save_cache(key, dict(cached, checked_at=now))
+                incr("pages", outcome="revalidated")
+                return cached["text"]
+            content_type = response.headers.get("Content-Type", "")
+            if response.status_code >= 400 and response.status_code not in PAGE_GONE_STATUSES:
+                # Rate limits and server errors are transient: keep any cached copy and retry next time
+                response.raise_for_status()
+            if response.status_code >= 400 or not content_type.startswith(PAGE_CONTENT_TYPES):
+                # A definitive answer: remember it so the page is not fetched again soon
+                save_cache(key, {"text": "", "checked_at": now})
+                incr("pages", outcome="skipped")
+                return ""
+            body, truncated = _read_capped(response, deadline)
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+    except Exception as e:
+        log.warning(f"⚠️ Could not fetch {url}: {e}")
+        incr("pages", outcome="failed")
+        # A stale copy is still better than nothing
+        return cached["text"] if cached is not None else ""
+
+    incr("page_bytes", len(body))
+    if truncated:
+        incr("pages_truncated")
+    html = _decode(body, content_type)
+    if content_type.startswith("text/plain"):
+        text = " ".join(html.split())[:PAGE_TEXT_CHARS]
+    else:
+        text = extract_main_text(html)
+    save_cache(key, {"text": text, "etag": etag, "last_modified": last_modified, "checked_at": now})
+    incr("pages", outcome="fetched")
+    return text
+
+
+def fetch_pages(urls, max_workers=None):
+    """Fetches pages concurrently; returns {url: text} for every distinct URL."""
+    urls = list(dict.fromkeys(url for url in urls if url and url.startswith(("http://", "https://"))))
+    if not urls:
+        return {}
+    workers = max(1, min(len(urls), max_workers or PAGE_FETCH_WORKERS))
+    with span("pages.fetch", pages=len(urls)) as attrs, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="page-fetch") as executor:
+        # Each fetch runs in a copy of the caller's context so its spans nest under this one
+        futures = {url: executor.submit(contextvars.copy_context().run, fetch_page, url) for url in urls}
+        texts = {url: future.result() for url, future in futures.items()}
+        attrs["with_text"] = sum(1 for text in texts.values() if text)
+    return texts
+
+
+def attach_page_text(web_results, max_workers=None):
+    """Adds a `page_text` field to each search result whose page could be read."""
+    texts = fetch_pages([result.get("link") for result in web_results], max_workers)
+    for result in web_results:
+        text = texts.get(result.get("link"))
+        if text:
+            result["page_text"] = text
+    log.info(f"📄 Read {sum(1 for text in texts.values() if text)} of {len(texts)} source pages")
+    return web_results
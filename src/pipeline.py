@@ -0,0 +1,98 @@
+# src/pipeline.py
+import time
+
+from src.search_client import serpapi_search
+from src.synthesizer import synthesize
+from src.ppt_generator import create_presentation
+from src.deck_spec import spec_path_for, DECK_SPEC
+from src.context_builder import build_context
+from src.page_fetcher import attach_page_text, PAGE_FETCH
+from src.topic_index import find_similar_topic, record_topic, TOPIC_REUSE
+from src.search_fanout import query_prompt, parse_queries, search_all, SEARCH_SUBQUERIES
+from src.config import MAX_SEARCH_RESULTS
+from src.metrics import get_logger, span
+
+log = get_logger(__name__)
+
+
+def gather_context(topic, llm_client, timings, max_search_results=None, context_budget=None, fetch_pages=None,
+                   topic_reuse=None, subqueries=None, generate=None, search=None):
+    """
+    The stages before synthesis, shared by both pipelines: topic reuse or
+    query generation and search, optional page fetching, and the context
+    build. Records stage timings in `timings` and returns the context lines.
+    `generate` and `search` default to llm_client.generate and
+    serpapi_search; the async pipeline passes versions that wait for its
+    service limits.
+    """
+    generate = generate or llm_client.generate
+    search = search or serpapi_search
+    num_results = max_search_results or MAX_SEARCH_RESULTS
+    subqueries = SEARCH_SUBQUERIES if subqueries is None else subqueries
+    reuse = (TOPIC_REUSE if topic_reuse is None else topic_reuse) and not getattr(llm_client, "refresh", False)
+    reused = find_similar_topic(topic, num_results, subqueries) if reuse else None
+
+    if reused:
+        optimized_search_query, web_results = reused
+    else:
+        start = time.perf_counter()
+        log.info("📝 Generating optimized search query...")
+        with span("query"):
+            queries = parse_queries(generate(query_prompt(topic, subqueries), stage="query"), max(1, subqueries))
+            optimized_search_query = "; ".join(queries)
+        log.info(f"Generated Search Query: {optimized_search_query}")
+        timings["query"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        log.info("🔍 Searching web...")
+        # Pass the integer MAX_SEARCH_RESULTS to the search function
+        with span("search", results=0) as attrs:
+            web_results = search_all(queries, search, num_results)
+            attrs["results"] = len(web_results)
+        timings["search"] = time.perf_counter() - start
+        if reuse:
+            record_topic(topic, optimized_search_query, web_results, num_results, subqueries)
+
+    if PAGE_FETCH if fetch_pages is None else fetch_pages:
+        start = time.perf_counter()
+        log.info("📄 Reading source pages...")
+        attach_page_text(web_results)
+        timings["pages"] = time.perf_counter() - start
+
+    # The synthesizer expects a list of strings; repeated sentences are dropped
+    # and the rest is ranked and packed into the context token budget
+    return build_context(topic, web_results, query=optimized_search_query, budget=context_budget)
+
+
+def generate_deck(topic, output, template, llm_client, image_workers=None, max_search_results=None,
+                  context_budget=None, fetch_pages=None, topic_reuse=None, write_spec=None, subqueries=None):
+    """
+    Runs the full pipeline for one topic and saves the deck to `output`.
+    Returns the wall time of each stage in seconds. `fetch_pages` (default
+    PAGE_FETCH) also reads the linked pages into the search context.
+    `topic_reuse` (default TOPIC_REUSE, off with a refreshing client) takes
+    the query and search results of a near-identical earlier topic.
+    `write_spec` (default DECK_SPEC) saves the deck spec next to `output`.
+    `subqueries` (default SEARCH_SUBQUERIES) above 1 searches that many
+    LLM-written queries concurrently and merges their results.
+    """
+    timings = {}
+    search_context = gather_context(topic, llm_client, timings, max_search_results=max_search_results,
+                                    context_budget=context_budget, fetch_pages=fetch_pages,
+                                    topic_reuse=topic_reuse, subqueries=subqueries)
+
+    start = time.perf_counter()
+    log.info("🧠 Synthesizing content via LLM...")
+    with span("synthesize", slides=0) as attrs:
+        structured = synthesize(topic, search_context, llm_client)
+        attrs["slides"] = len(structured)
+    timings["synthesize"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    log.info("📑 Generating PowerPoint deck...")
+    with span("render", slides=len(structured)):
+        spec_path = spec_path_for(output) if (DECK_SPEC if write_spec is None else write_spec) else None
+        create_presentation(structured, output, template, max_workers=image_workers, topic=topic, spec_path=spec_path)
+    timings["render"] = time.perf_counter() - start
+
+    return timings
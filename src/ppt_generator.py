@@ -1,4 +1,8 @@
+import io
 import os
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from pptx import Presentation
 from pptx.util import Pt, Inches
 from pptx.enum.shapes import MSO_SHAPE
@@ -7,203 +11,420 @@ from pptx.enum.dml import MSO_THEME_COLOR
 from pptx.enum.shapes import PP_PLACEHOLDER
 from pptx.enum.text import MSO_ANCHOR, MSO_AUTO_SIZE # Added MSO_ANCHOR and MSO_AUTO_SIZE
 from pptx.enum.text import PP_ALIGN # Added PP_ALIGN for text alignment
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import qn
+from lxml import etree
 
+from src.cache import load_cache, save_cache, make_key
+from src.deck_spec import build_spec, write_spec
+from src.deck_index import DeckPartIndex
 from src.image_client import fetch_image
+from src.image_prep import box_to_pixels, prepare_image, IMAGE_TARGET_DPI, IMAGE_JPEG_QUALITY
+from src.template_profile import get_template_profile, template_hash, MANUAL_IMAGE_WIDTH, MANUAL_IMAGE_HEIGHT
+from src.text_fit import fit_text, get_font_metrics
+from src.metrics import get_logger, span, incr
 
-def create_presentation(slides_data, output_file, template):
+log = get_logger(__name__)
+
+# Number of slide images resolved concurrently before rendering starts
+IMAGE_PREFETCH_WORKERS = int(os.getenv("IMAGE_PREFETCH_WORKERS", "4"))
+
+# Reuse the rendered shapes of a slide whose content, layout, image and template are unchanged
+SLIDE_CACHE = os.getenv("SLIDE_CACHE", "1") == "1"
+# Bump when _add_slide changes what it draws, so older cached slides are not reused
+SLIDE_CACHE_VERSION = 2
+
+# Font size ranges (points) the text-fit engine chooses from, largest first
+TITLE_FONT_SIZES = (36, 20)
+BODY_FONT_SIZES = (20, 12)
+# Space after each bullet, and the horizontal room a level-0 bullet takes
+BULLET_SPACE_AFTER = 5
+BULLET_INDENT = Inches(0.25)
+
+# Templates with their slides already removed, keyed by (path, mtime) and
+# shared by every deck built in this process
+_template_cache = {}
+_template_lock = threading.Lock()
+
+def _strip_slides(prs):
+    """Delete all existing slides from the template"""
+    while len(prs.slides) > 0:
+        slide_part = prs.slides._sldIdLst[0]
+        prs.part.drop_rel(slide_part.rId)
+        del prs.slides._sldIdLst[0]
+
+def load_template(template):
+    """
+    Returns a fresh, slide-free Presentation for a template. The template is
+    read and stripped once per process; later calls clone the stripped bytes.
+    """
+    key = (os.path.abspath(template), os.path.getmtime(template))
+    with _template_lock:
+        data = _template_cache.get(key)
+        if data is None:
+            prs = Presentation(template)
+            _strip_slides(prs)
+            buffer = io.BytesIO()
+            prs.save(buffer)
+            data = buffer.getvalue()
+            _template_cache[key] = data
+    return Presentation(io.BytesIO(data))
+
+def prefetch_images(slides_data, max_workers=None, target_size=None):
+    """
+    Starts resolving the image for every slide title in a bounded thread pool.
+    Returns the executor and a list of futures in slide order.
+    """
+    workers = max(1, max_workers or IMAGE_PREFETCH_WORKERS)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-prefetch")
+    # Each lookup runs in a copy of the caller's context so its spans nest under the caller's
+    futures = [executor.submit(contextvars.copy_context().run, fetch_image, slide_data.get("title", ""),
+                               target_size=target_size)
+               for slide_data in slides_data]
+    return executor, futures
+
+def open_deck(template):
+    """
+    Loads a template with its existing slides removed and picks the content layout.
+    Returns (prs, layout, image_box), or None if the template cannot be read.
+    """
     if not os.path.exists(template):
         raise FileNotFoundError(f"Template not found: {template}")
     
     try:
-        prs = Presentation(template)
+        prs = load_template(template)
+        # Keeps adding a slide or image constant-time however large the deck grows
+        prs.part_index = DeckPartIndex(prs).install()
+    except Exception as e:
+        log.error(f"❌ Error loading template: {e}")
+        log.error("Please ensure the template file is not open in another application.")
+        return None
+
+    # Layout choice comes from the template's cached profile instead of scanning layouts
+    with span("layout.select", template=os.path.basename(template)):
+        profile = get_template_profile(template, prs)
+        layout = prs.slide_layouts[profile["roles"]["content"]]
+    log.info(f"✅ Using layout from template profile: {layout.name}")
+    return prs, layout, tuple(profile["image_box"])
+
+def new_image_stats():
+    return {"original_bytes": 0, "prepared_bytes": 0}
+
+def save_deck(prs, output_file, image_stats):
+    if image_stats["original_bytes"]:
+        saved = image_stats["original_bytes"] - image_stats["prepared_bytes"]
+        incr("image_bytes_saved", saved)
+        log.info(f"🗜️ Images prepared: {image_stats['original_bytes']:,} → {image_stats['prepared_bytes']:,} bytes "
+              f"(saved {saved:,} bytes)")
+
+    try:
+        with span("deck.save", slides=len(prs.slides)):
+            prs.save(output_file)
+        log.info(f"✅ Done! Slide deck saved to {output_file}")
+    except PermissionError:
+        log.error("❌ Permission denied. Please close the output file if it's open and try again.")
     except Exception as e:
-        print(f"❌ Error loading template: {e}")
-        print("Please ensure the template file is not open in another application.")
+        log.error(f"❌ An error occurred while saving the presentation: {e}")
+        # A half-written file would look like a finished deck to batch and service callers
+        if os.path.exists(output_file):
+            os.remove(output_file)
+
+def create_presentation(slides_data, output_file, template, max_workers=None, topic=None, spec_path=None):
+    """Renders synthesized slides; with `spec_path`, also writes the deck spec there."""
+    deck = open_deck(template)
+    if deck is None:
         return
+    prs, layout, image_box = deck
 
-    # Delete all existing slides from the template
-    while len(prs.slides) > 0:
-        slide_part = prs.slides._sldIdLst[0]
-        prs.part.drop_rel(slide_part.rId)
-        del prs.slides._sldIdLst[0]
-        
-    for slide_data in slides_data:
+    # Resolve all slide images up front so the downloads overlap with each other
+    executor, image_futures = prefetch_images(slides_data, max_workers, target_size=box_to_pixels(*image_box))
+    image_stats = new_image_stats()
+    try:
+        rendered = _render_slides(prs, slides_data, image_futures, layout, image_stats, template_hash(template))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    save_deck(prs, output_file, image_stats)
+    if spec_path:
+        write_spec(spec_path, build_spec(topic, template, output_file, rendered))
+
+def create_presentation_from_spec(spec, output_file=None, template=None):
+    """
+    Renders a deck spec (see src/deck_spec.py) without LLM, search or image
+    lookups. Slides keep their recorded layout and image; only an image whose
+    file has since disappeared is looked up again.
+    """
+    template = template or spec["template"]
+    output_file = output_file or spec["output"]
+    deck = open_deck(template)
+    if deck is None:
+        return
+    prs, default_layout, image_box = deck
+    layouts = {layout.name: layout for layout in prs.slide_layouts}
+    template_id = template_hash(template)
+
+    image_stats = new_image_stats()
+    for slide_data in spec["slides"]:
+        layout = layouts.get(slide_data.get("layout"), default_layout)
+        image_path = slide_data.get("image")
+        if image_path and not os.path.exists(image_path):
+            log.warning(f"⚠️ Image {image_path} is gone, looking it up again")
+            image_path = fetch_image(slide_data.get("title", ""), target_size=box_to_pixels(*image_box))
+        render_slide(prs, slide_data, layout, image_path, image_stats, template_id)
+    save_deck(prs, output_file, image_stats)
+
+def _render_slides(prs, slides_data, image_futures, layout, image_stats, template_id=None):
+    rendered = []
+    for slide_data, image_future in zip(slides_data, image_futures):
         title_text = slide_data.get("title", "")
-        
-        # Try to find a suitable layout - prefer layouts with placeholders
-        layout = None
-        
-        # First, try to find a layout with both content and picture placeholders
-        for slide_layout in prs.slide_layouts:
-            placeholders = slide_layout.placeholders
-            has_title = any(p.placeholder_format.type == PP_PLACEHOLDER.TITLE for p in placeholders)
-            has_content = any(p.placeholder_format.type == PP_PLACEHOLDER.BODY for p in placeholders)
-            has_picture = any(p.placeholder_format.type == PP_PLACEHOLDER.PICTURE for p in placeholders)
-            
-            if has_title and has_content and has_picture:
-                layout = slide_layout
-                print(f"✅ Found layout with title, content, and picture: {slide_layout.name}")
-                break
-        
-        # If no perfect layout, try to find one with title and content
-        if not layout:
-            for slide_layout in prs.slide_layouts:
-                placeholders = slide_layout.placeholders
-                has_title = any(p.placeholder_format.type == PP_PLACEHOLDER.TITLE for p in placeholders)
-                has_content = any(p.placeholder_format.type == PP_PLACEHOLDER.BODY for p in placeholders)
-                
-                if has_title and has_content:
-                    layout = slide_layout
-                    print(f"✅ Found layout with title and content: {slide_layout.name}")
-                    break
-        
-        # Fallback to any layout with a title
-        if not layout:
-            for slide_layout in prs.slide_layouts:
-                placeholders = slide_layout.placeholders
-                has_title = any(p.placeholder_format.type == PP_PLACEHOLDER.TITLE for p in placeholders)
-                
-                if has_title:
-                    layout = slide_layout
-                    print(f"✅ Found layout with title: {slide_layout.name}")
-                    break
-        
-        # Final fallback
-        if not layout:
-            layout = prs.slide_layouts[1] if len(prs.slide_layouts) > 1 else prs.slide_layouts[0]
-            print(f"⚠️ Using fallback layout: {layout.name}")
+        try:
+            image_path = image_future.result()
+        except Exception as e:
+            log.warning(f"⚠️ Image lookup failed for '{title_text}': {e}")
+            image_path = None
+        rendered.append(render_slide(prs, slide_data, layout, image_path, image_stats, template_id))
+    return rendered
+
+def _new_slide(prs, layout):
+    # Decks opened by open_deck() carry a part index that adds slides in constant time
+    part_index = getattr(prs, "part_index", None)
+    return part_index.add_slide(layout) if part_index else prs.slides.add_slide(layout)
+
+def _slide_cache_key(slide_data, layout, image_path, template_id):
+    image = None
+    if image_path:
+        stat = os.stat(image_path)
+        image = [os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size]
+    return make_key("slide", version=SLIDE_CACHE_VERSION, template=template_id, layout=layout.name,
+                    title=slide_data.get("title", ""), content=slide_data.get("content", ""), image=image,
+                    dpi=IMAGE_TARGET_DPI, quality=IMAGE_JPEG_QUALITY, font=get_font_metrics().name)
+
+def _restore_slide(prs, layout, entry, image_stats):
+    """Adds a slide from its cached shapes; returns None if the embedded image file is gone."""
+    image_path = entry["image"]
+    if image_path and not os.path.exists(image_path):
+        return None
+    slide = _new_slide(prs, layout)
+    shapes = parse_xml(entry["xml"])
+    if image_path:
+        # The cached XML points at the relationship id the picture had when it was rendered
+        _, rId = slide.part.get_or_add_image_part(image_path)
+        for blip in shapes.iter(qn("a:blip")):
+            blip.set(qn("r:embed"), rId)
+    slide._element.replace(slide._element.cSld, shapes)
+    image_stats["original_bytes"] += entry["original_bytes"]
+    image_stats["prepared_bytes"] += entry["prepared_bytes"]
+    return slide
 
-        slide = prs.slides.add_slide(layout)
+def _text_box(shape):
+    """Returns the (width, height) in EMU available to text inside a placeholder."""
+    text_frame = shape.text_frame
+    return (shape.width - text_frame.margin_left - text_frame.margin_right,
+            shape.height - text_frame.margin_top - text_frame.margin_bottom)
 
-        # Find placeholders by their type, not by text content
-        title_placeholder = None
-        body_placeholder = None
-        image_placeholder = None
+def render_slide(prs, slide_data, layout, image_path, image_stats, template_id=None):
+    """
+    Adds one slide with its title, bullets, image and speaker notes. Given
+    the template's content hash as `template_id`, an identical slide
+    rendered before is restored from the slide cache instead of redrawn.
+    Returns the slide's deck spec entry.
+    """
+    title_text = slide_data.get("title", "")
+    key = None
+    if SLIDE_CACHE and template_id and (not image_path or os.path.exists(image_path)):
+        key = _slide_cache_key(slide_data, layout, image_path, template_id)
+    with span("slide.render", has_image=bool(image_path), cached=False) as attrs:
+        entry = load_cache(key) if key else None
+        slide = _restore_slide(prs, layout, entry, image_stats) if entry else None
+        if slide is not None:
+            attrs["cached"] = True
+            overflow = entry["overflow"]
+            log.info(f"♻️ Reused rendered slide: {title_text}")
+        else:
+            original_bytes, prepared_bytes = image_stats["original_bytes"], image_stats["prepared_bytes"]
+            slide, embedded_path, overflow = _add_slide(prs, slide_data, layout, image_path, image_stats)
+            if key:
+                save_cache(key, {
+                    "xml": etree.tostring(slide._element.cSld, encoding="unicode"),
+                    "image": embedded_path,
+                    "original_bytes": image_stats["original_bytes"] - original_bytes,
+                    "prepared_bytes": image_stats["prepared_bytes"] - prepared_bytes,
+                    "overflow": overflow,
+                })
+        # Notes live in their own part, so they are added fresh either way
+        _add_notes(slide, slide_data)
+        attrs["overflow"] = overflow
+    for placeholder in overflow:
+        incr("text_overflow", placeholder=placeholder)
+        log.warning(f"⚠️ Text overflows the {placeholder} placeholder even at the smallest size: {title_text}")
+    incr("slides_rendered")
+    return {
+        "title": title_text,
+        "content": slide_data.get("content", ""),
+        "notes": slide_data.get("notes", ""),
+        "layout": layout.name,
+        "image": image_path,
+    }
+
+def _add_slide(prs, slide_data, layout, image_path, image_stats):
+    """
+    Draws a new slide. Returns it with the path of the image file embedded in
+    it (or None) and the placeholders whose text overflows at the smallest
+    allowed font size.
+    """
+    embedded_path = None
+    overflow = []
+    title_text = slide_data.get("title", "")
+
+    slide = _new_slide(prs, layout)
+
+    # Find placeholders by their type, not by text content
+    title_placeholder = None
+    body_placeholder = None
+    image_placeholder = None
+    
+    for shape in slide.placeholders:
+        placeholder_type = shape.placeholder_format.type
         
-        for shape in slide.placeholders:
-            placeholder_type = shape.placeholder_format.type
-            
-            if placeholder_type == PP_PLACEHOLDER.TITLE:
-                title_placeholder = shape
-            elif placeholder_type == PP_PLACEHOLDER.BODY:
-                body_placeholder = shape
-            elif placeholder_type == PP_PLACEHOLDER.PICTURE:
-                image_placeholder = shape
+        if placeholder_type == PP_PLACEHOLDER.TITLE:
+            title_placeholder = shape
+        elif placeholder_type == PP_PLACEHOLDER.BODY:
+            body_placeholder = shape
+        elif placeholder_type == PP_PLACEHOLDER.PICTURE:
+            image_placeholder = shape
+    
+    # Fill the title placeholder
+    if title_placeholder and title_placeholder.has_text_frame:
+        title_placeholder.text = title_text
+        text_frame = title_placeholder.text_frame
+        # Largest size that fits, measured here rather than left to PowerPoint's autofit
+        title_size, title_overflow = fit_text([title_text], *_text_box(title_placeholder), *TITLE_FONT_SIZES)
+        if title_overflow:
+            overflow.append("title")
+        for paragraph in text_frame.paragraphs:
+            for run in paragraph.runs:
+                run.font.size = Pt(title_size)
+        log.info(f"✅ Added title: {title_text} at {title_size}pt")
+    else:
+        log.warning("⚠️ No title placeholder found")
+    
+    # Add a gap between title and content by adjusting body placeholder position and size
+    if title_placeholder and body_placeholder:
+        title_bottom = title_placeholder.top + title_placeholder.height
         
-        # Fill the title placeholder
-        if title_placeholder and title_placeholder.has_text_frame:
-            title_placeholder.text = title_text
-            text_frame = title_placeholder.text_frame
-            for paragraph in text_frame.paragraphs:
-                for run in paragraph.runs:
-                    run.font.size = Pt(36) # Set title font size to 36pt
-            print(f"✅ Added title: {title_text} with adjusted font size")
+        # Set the top of the body placeholder with an additional gap (e.g., 0.2 inches)
+        body_placeholder.top = title_bottom + Inches(0.2)
+        
+        # Adjust the height to ensure it doesn't go off the slide bottom
+        # and leaves some margin at the bottom (e.g., 0.2 inches from bottom)
+        body_placeholder.height = prs.slide_height - body_placeholder.top - Inches(0.2)
+
+        # Ensure the left and width are reasonable.
+        # If there's an image placeholder, adjust width for it.
+        if image_placeholder:
+            # Assuming image is on the right, content on the left
+            body_placeholder.left = Inches(0.5) # Small left margin
+            # Calculate width to leave a gap between content and image, and a right margin
+            body_placeholder.width = image_placeholder.left - body_placeholder.left - Inches(0.5) 
         else:
-            print("⚠️ No title placeholder found")
+            # No image, use full width minus margins
+            body_placeholder.left = Inches(0.5)
+            body_placeholder.width = prs.slide_width - Inches(1) # 0.5 inch margin on both sides
+
+    # Fill the content placeholder
+    if body_placeholder and body_placeholder.has_text_frame:
+        text_frame = body_placeholder.text_frame
+        text_frame.clear()
         
-        # Add a gap between title and content by adjusting body placeholder position and size
-        if title_placeholder and body_placeholder:
-            title_bottom = title_placeholder.top + title_placeholder.height
-            
-            # Set the top of the body placeholder with an additional gap (e.g., 0.2 inches)
-            body_placeholder.top = title_bottom + Inches(0.2)
-            
-            # Adjust the height to ensure it doesn't go off the slide bottom
-            # and leaves some margin at the bottom (e.g., 0.2 inches from bottom)
-            body_placeholder.height = prs.slide_height - body_placeholder.top - Inches(0.2)
+        # Set text frame properties for left alignment and top anchoring
+        text_frame.margin_left = Inches(0.1) # Small left margin
+        text_frame.margin_right = Inches(0.1) # Small right margin
+        text_frame.vertical_anchor = MSO_ANCHOR.TOP # Ensure content starts from the top
+        text_frame.word_wrap = True # Enable word wrap
 
-            # Ensure the left and width are reasonable.
-            # If there's an image placeholder, adjust width for it.
-            if image_placeholder:
-                # Assuming image is on the right, content on the left
-                body_placeholder.left = Inches(0.5) # Small left margin
-                # Calculate width to leave a gap between content and image, and a right margin
-                body_placeholder.width = image_placeholder.left - body_placeholder.left - Inches(0.5) 
+        content_text = slide_data.get("content", "")
+        bullet_points = [p.strip() for p in content_text.split('\n') if p.strip().startswith("-")]
+        body_size, body_overflow = fit_text([point.lstrip("-") for point in bullet_points],
+                                            *_text_box(body_placeholder), *BODY_FONT_SIZES,
+                                            space_after=BULLET_SPACE_AFTER, indent_emu=BULLET_INDENT)
+        if body_overflow:
+            overflow.append("body")
+
+        for i, point in enumerate(bullet_points):
+            point = point.lstrip("-").strip()
+            if not point: 
+                continue
+
+            if i == 0:
+                p = text_frame.paragraphs[0]
             else:
-                # No image, use full width minus margins
-                body_placeholder.left = Inches(0.5)
-                body_placeholder.width = prs.slide_width - Inches(1) # 0.5 inch margin on both sides
-
-        # Fill the content placeholder
-        if body_placeholder and body_placeholder.has_text_frame:
-            text_frame = body_placeholder.text_frame
-            text_frame.clear()
-            
-            # Set text frame properties for left alignment and top anchoring
-            text_frame.margin_left = Inches(0.1) # Small left margin
-            text_frame.margin_right = Inches(0.1) # Small right margin
-            text_frame.vertical_anchor = MSO_ANCHOR.TOP # Ensure content starts from the top
-            text_frame.word_wrap = True # Enable word wrap
-
-            content_text = slide_data.get("content", "")
-            bullet_points = [p.strip() for p in content_text.split('\n') if p.strip().startswith("-")]
-
-            for i, point in enumerate(bullet_points):
-                point = point.lstrip("-").strip()
-                if not point: 
-                    continue
-
-                if i == 0:
-                    p = text_frame.paragraphs[0]
-                else:
-                    p = text_frame.add_paragraph()
-                
-                p.text = point
-                p.level = 0
-                p.font.size = Pt(20) # Increased bullet point font size to 20pt
-                p.alignment = PP_ALIGN.LEFT # Set paragraph alignment to left
-                # Add some line spacing
-                p.space_after = Pt(5) # Add 5pt space after each bullet point
+                p = text_frame.add_paragraph()
             
-            print(f"✅ Added {len(bullet_points)} bullet points with adjusted aesthetics")
-        else:
-            print("⚠️ No content placeholder found")
+            p.text = point
+            p.level = 0
+            p.font.size = Pt(body_size)
+            p.alignment = PP_ALIGN.LEFT # Set paragraph alignment to left
+            # Add some line spacing
+            p.space_after = Pt(BULLET_SPACE_AFTER)
         
-        # Handle image insertion
-        image_path = fetch_image(title_text)
-        if image_path and os.path.exists(image_path):
+        log.info(f"✅ Added {len(bullet_points)} bullet points at {body_size}pt")
+    else:
+        log.warning("⚠️ No content placeholder found")
+    
+    # Handle image insertion
+    if image_path and os.path.exists(image_path):
+        try:
+            # Downscale and recompress to the box the image is shown in
             try:
                 if image_placeholder:
-                    # Adjust image placeholder position slightly to the left
-                    original_left = image_placeholder.left
-                    image_placeholder.left = original_left - Inches(0.5) # Shift left by 0.5 inches
-                    
-                    image_placeholder.insert_picture(image_path)
-                    print(f"✅ Image inserted into picture placeholder and shifted left")
+                    image_box = (image_placeholder.width, image_placeholder.height)
                 else:
-                    # Add image manually to the right side of the slide
-                    left = Inches(5.5) # Adjusted left position for manual insertion
-                    top = Inches(1.5)
-                    width = Inches(3.5)
-                    height = Inches(4)
-                    
-                    # Make sure we don't overlap with existing content
-                    if body_placeholder:
-                        left = max(left, body_placeholder.left + body_placeholder.width + Inches(0.5))
-                    
-                    slide.shapes.add_picture(image_path, left, top, width=width, height=height)
-                    print(f"✅ Image added manually at position ({left}, {top})")
+                    image_box = (MANUAL_IMAGE_WIDTH, MANUAL_IMAGE_HEIGHT)
+                image_path, original_bytes, prepared_bytes = prepare_image(image_path, *image_box)
+                image_stats["original_bytes"] += original_bytes
+                image_stats["prepared_bytes"] += prepared_bytes
             except Exception as e:
-                print(f"⚠️ Failed to insert image: {e}")
-        else:
-            print(f"⚠️ No image found for: {title_text}")
-
-        # Add speaker notes
-        notes_text = slide_data.get("notes", "")
-        if notes_text:
-            notes_text_frame = slide.notes_slide.notes_text_frame
-            notes_text_frame.text = notes_text
-            notes_text_frame.word_wrap = True
-            notes_text_frame.auto_size = MSO_AUTO_SIZE.SHAPE_TO_FIT_TEXT
-            for paragraph in notes_text_frame.paragraphs:
-                for run in paragraph.runs:
-                    run.font.size = Pt(8) # Set notes font size to 8pt
-            print(f"✅ Added speaker notes for slide: {title_text} with adjusted aesthetics")
+                log.warning(f"⚠️ Image preparation failed, embedding original: {e}")
 
-    try:
-        prs.save(output_file)
-        print(f"✅ Done! Slide deck saved to {output_file}")
-    except PermissionError:
-        print("❌ Permission denied. Please close the output file if it's open and try again.")
-    except Exception as e:
-        print(f"❌ An error occurred while saving the presentation: {e}")
+            if image_placeholder:
+                # Adjust image placeholder position slightly to the left
+                original_left = image_placeholder.left
+                image_placeholder.left = original_left - Inches(0.5) # Shift left by 0.5 inches
+                
+                image_placeholder.insert_picture(image_path)
+                embedded_path = image_path
+                log.info(f"✅ Image inserted into picture placeholder and shifted left")
+            else:
+                # Add image manually to the right side of the slide
+                left = Inches(5.5) # Adjusted left position for manual insertion
+                top = Inches(1.5)
+                width = MANUAL_IMAGE_WIDTH
+                height = MANUAL_IMAGE_HEIGHT
+                
+                # Make sure we don't overlap with existing content
+                if body_placeholder:
+                    left = max(left, body_placeholder.left + body_placeholder.width + Inches(0.5))
+                
+                slide.shapes.add_picture(image_path, left, top, width=width, height=height)
+                embedded_path = image_path
+                log.info(f"✅ Image added manually at position ({left}, {top})")
+        except Exception as e:
+            log.warning(f"⚠️ Failed to insert image: {e}")
+    else:
+        log.warning(f"⚠️ No image found for: {title_text}")
+
+    return slide, embedded_path, overflow
+
+def _add_notes(slide, slide_data):
+    # Add speaker notes
+    title_text = slide_data.get("title", "")
+    notes_text = slide_data.get("notes", "")
+    if notes_text:
+        notes_text_frame = slide.notes_slide.notes_text_frame
+        notes_text_frame.text = notes_text
+        notes_text_frame.word_wrap = True
+        notes_text_frame.auto_size = MSO_AUTO_SIZE.SHAPE_TO_FIT_TEXT
+        for paragraph in notes_text_frame.paragraphs:
+            for run in paragraph.runs:
+                run.font.size = Pt(8) # Set notes font size to 8pt
+        log.info(f"✅ Added speaker notes for slide: {title_text} with adjusted aesthetics")
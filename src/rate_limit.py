@@ -0,0 +1,415 @@
+# src/rate_limit.py
+"""
+Shared scheduler for calls to quota-limited providers (Gemini, OpenAI, SerpAPI, Pexels).
+
+Every call takes a slot from its provider before it is sent: one token from
+a requests bucket (plus LLM tokens from a tokens bucket), one of a capped
+number of in-flight slots, and only when no higher-priority caller is
+waiting. State is kept in memory for a single process, or in a SQLite file
+shared by every worker process (RATE_LIMIT_STATE=sqlite).
+"""
+import os
+import math
+import time
+import sqlite3
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import CancelledError
+
+from src.cache import CACHE_DIR
+from src.metrics import get_logger, incr
+
+log = get_logger(__name__)
+
+# "memory" (one process) or "sqlite" (shared by worker processes)
+RATE_LIMIT_STATE = os.getenv("RATE_LIMIT_STATE", "memory")
+RATE_LIMIT_DB_FILE = "ratelimit.db"
+# Share of a per-minute quota that may be spent in a burst; the rest is paced
+# evenly so that no rolling window ever exceeds the quota
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "0.1"))
+# Calls any quota allows at once, so one deck's query and synthesis calls never wait
+RATE_LIMIT_MIN_BURST = 3
+# Quotas over windows at least this long (e.g. Pexels' 200 per hour) may be
+# spent all at once, and are then counted per fixed window: pacing them would
+# hold one deck's image searches for minutes
+RATE_LIMIT_FULL_BURST_SECONDS = 3600
+# Pause applied to a provider after it answers with a quota error and no Retry-After
+RATE_LIMIT_QUOTA_PAUSE = float(os.getenv("RATE_LIMIT_QUOTA_PAUSE", "10"))
+# Longest single sleep while waiting, so freed capacity is noticed promptly
+RATE_LIMIT_POLL_SECONDS = 0.25
+# In-flight slots older than this are treated as abandoned (e.g. a killed worker)
+RATE_LIMIT_LEASE_SECONDS = 600
+# Waiters that have not polled for this long no longer hold back lower priorities
+RATE_LIMIT_WAITER_SECONDS = 5
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+# Quotas as "count/seconds" (0 disables the limit), overridable per provider
+# and resource with RATE_LIMIT_<PROVIDER>_<RESOURCE>, e.g. RATE_LIMIT_GEMINI_REQUESTS=2000/60.
+# Defaults follow the providers' free tiers.
+DEFAULT_LIMITS = {
+    "gemini": {"requests": "15/60", "tokens": "1000000/60", "in_flight": "4"},
+    "openai": {"requests": "500/60", "tokens": "200000/60", "in_flight": "4"},
+    "serpapi": {"requests": "0/3600", "in_flight": "4"},
+    "pexels": {"requests": "200/3600", "in_flight": "4"},
+}
+
+# API hosts whose HTTP requests are scheduled under a provider
+PROVIDER_HOSTS = {"serpapi.com": "serpapi", "api.pexels.com": "pexels"}
+
+_priority = contextvars.ContextVar("rate_limit_priority", default="interactive")
+_scheduler = None
+_scheduler_lock = threading.Lock()
+_limits = {}
+
+
+def _parse_quota(value):
+    count, _, seconds = str(value).partition("/")
+    return float(count), float(seconds or 60)
+
+
+def _bucket(value):
+    """
+    Returns (capacity, refill per second, window seconds) for a quota, or None
+    when it is disabled. A paced bucket (window 0) refills continuously; a
+    fixed-window bucket (rate 0) refills to capacity once per window. Either
+    way, capacity + rate * seconds stays within the quota.
+    """
+    count, seconds = _parse_quota(value)
+    if count <= 0 or seconds <= 0:
+        return None
+    capacity = min(count, max(RATE_LIMIT_MIN_BURST, count * RATE_LIMIT_BURST))
+    if seconds >= RATE_LIMIT_FULL_BURST_SECONDS or capacity >= count:
+        return count, 0.0, seconds
+    return capacity, (count - capacity) / seconds, 0.0
+
+
+def get_limits(provider):
+    """Returns the parsed limits for a provider, or None for unscheduled providers."""
+    if provider not in DEFAULT_LIMITS:
+        return None
+    limits = _limits.get(provider)
+    if limits is None:
+        buckets = {}
+        config = {}
+        for resource, default in DEFAULT_LIMITS[provider].items():
+            config[resource] = os.getenv(f"RATE_LIMIT_{provider.upper()}_{resource.upper()}", default)
+        for resource, value in config.items():
+            if resource != "in_flight":
+                bucket = _bucket(value)
+                if bucket:
+                    buckets[resource] = bucket
+        limits = {"buckets": buckets, "in_flight": int(config.get("in_flight", 0))}
+        _limits[provider] = limits
+    return limits
+
+
+def provider_for_host(host):
+    return PROVIDER_HOSTS.get(host)
+
+
+def _plan(buckets, costs, levels, now):
+    """
+    Refills each bucket to `now` and checks whether `costs` can be paid.
+    Returns (seconds to wait, new levels); the costs are deducted only when
+    the wait is zero. A cost above a bucket's capacity is admitted once the
+    bucket is full and drives its level negative, delaying later calls.
+    Levels are (level, stamp): the last refill time for paced buckets and
+    the current window's start for fixed-window buckets.
+    """
+    refilled = {}
+    wait = 0.0
+    for resource, (capacity, rate, window) in buckets.items():
+        level, stamp = levels.get(resource, (capacity, now))
+        need = min(costs.get(resource, 0), capacity)
+        if window:
+            elapsed = max(0, math.floor((now - stamp) / window))
+            level = min(capacity, level + elapsed * capacity)
+            stamp += elapsed * window
+            if level < need:
+                wait = max(wait, stamp + math.ceil((need - level) / capacity) * window - now)
+        else:
+            level = min(capacity, level + max(0.0, now - stamp) * rate)
+            stamp = now
+            if level < need:
+                wait = max(wait, (need - level) / rate)
+        refilled[resource] = (level, stamp)
+    if wait:
+        return wait, refilled
+    return 0.0, {resource: (level - costs.get(resource, 0), stamp) for resource, (level, stamp) in refilled.items()}
+
+
+class MemoryState:
+    """Scheduler state for the threads of one process."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.levels = {}
+        self.in_flight = {}
+        self.waiters = {}
+        self.paused_until = {}
+        self._ids = itertools.count(1)
+
+    def add_waiter(self, provider, priority):
+        with self.cond:
+            waiter = next(self._ids)
+            self.waiters.setdefault(provider, {})[waiter] = priority
+            return waiter
+
+    def remove_waiter(self, provider, waiter):
+        with self.cond:
+            self.waiters.get(provider, {}).pop(waiter, None)
+            self.cond.notify_all()
+
+    def try_acquire(self, provider, limits, costs, priority, waiter):
+        with self.cond:
+            now = time.time()
+            paused = self.paused_until.get(provider, 0) - now
+            if paused > 0:
+                return None, paused
+            if any(other < priority for other_waiter, other in self.waiters.get(provider, {}).items()
+                   if other_waiter != waiter):
+                return None, RATE_LIMIT_POLL_SECONDS
+            if limits["in_flight"] and self.in_flight.get(provider, 0) >= limits["in_flight"]:
+                return None, RATE_LIMIT_POLL_SECONDS
+            wait, self.levels[provider] = _plan(limits["buckets"], costs, self.levels.get(provider, {}), now)
+            if wait:
+                return None, wait
+            self.in_flight[provider] = self.in_flight.get(provider, 0) + 1
+            return next(self._ids), 0.0
+
+    def release(self, provider, lease):
+        with self.cond:
+            self.in_flight[provider] = max(0, self.in_flight.get(provider, 0) - 1)
+            self.cond.notify_all()
+
+    def adjust(self, provider, resource, delta):
+        with self.cond:
+            levels = self.levels.get(provider, {})
+            if resource in levels:
+                level, updated = levels[resource]
+                levels[resource] = (level - delta, updated)
+
+    def pause(self, provider, until):
+        with self.cond:
+            self.paused_until[provider] = max(self.paused_until.get(provider, 0), until)
+
+    def wait(self, seconds):
+        with self.cond:
+            self.cond.wait(seconds)
+
+
+class SQLiteState:
+    """
+    Scheduler state in a SQLite database, so worker processes draw from the
+    same buckets and in-flight caps. Every decision runs in one immediate
+    transaction.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(CACHE_DIR, RATE_LIMIT_DB_FILE)
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.execute("CREATE TABLE IF NOT EXISTS buckets ("
+                     " provider TEXT, resource TEXT, level REAL, updated REAL, PRIMARY KEY (provider, resource))")
+        conn.execute("CREATE TABLE IF NOT EXISTS leases ("
+                     " id INTEGER PRIMARY KEY AUTOINCREMENT, provider TEXT, expires_at REAL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS waiters ("
+                     " id TEXT PRIMARY KEY, provider TEXT, priority INTEGER, seen_at REAL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS pauses (provider TEXT PRIMARY KEY, until REAL)")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def add_waiter(self, provider, priority):
+        waiter = f"{os.getpid()}:{threading.get_ident()}:{next(self._ids)}"
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO waiters VALUES (?, ?, ?, ?)",
+                         (waiter, provider, priority, time.time()))
+        return waiter
+
+    def remove_waiter(self, provider, waiter):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM waiters WHERE id = ?", (waiter,))
+
+    def try_acquire(self, provider, limits, costs, priority, waiter):
+        with self._transaction() as conn:
+            now = time.time()
+            conn.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+            conn.execute("DELETE FROM waiters WHERE seen_at < ?", (now - RATE_LIMIT_WAITER_SECONDS,))
+            conn.execute("UPDATE waiters SET seen_at = ? WHERE id = ?", (now, waiter))
+
+            row = conn.execute("SELECT until FROM pauses WHERE provider = ?", (provider,)).fetchone()
+            if row and row[0] > now:
+                return None, row[0] - now
+            if conn.execute("SELECT 1 FROM waiters WHERE provider = ? AND priority < ? AND id != ? LIMIT 1",
+                            (provider, priority, waiter)).fetchone():
+                return None, RATE_LIMIT_POLL_SECONDS
+            if limits["in_flight"]:
+                (in_flight,) = conn.execute("SELECT COUNT(*) FROM leases WHERE provider = ?", (provider,)).fetchone()
+                if in_flight >= limits["in_flight"]:
+                    return None, RATE_LIMIT_POLL_SECONDS
+
+            levels = {resource: (level, updated) for resource, level, updated in conn.execute(
+                "SELECT resource, level, updated FROM buckets WHERE provider = ?", (provider,))}
+            wait, levels = _plan(limits["buckets"], costs, levels, now)
+            conn.executemany("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)",
+                             [(provider, resource, level, updated) for resource, (level, updated) in levels.items()])
+            if wait:
+                return None, wait
+            cursor = conn.execute("INSERT INTO leases (provider, expires_at) VALUES (?, ?)",
+                                  (provider, now + RATE_LIMIT_LEASE_SECONDS))
+            return cursor.lastrowid, 0.0
+
+    def release(self, provider, lease):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE id = ?", (lease,))
+
+    def adjust(self, provider, resource, delta):
+        with self._transaction() as conn:
+            conn.execute("UPDATE buckets SET level = level - ? WHERE provider = ? AND resource = ?",
+                         (delta, provider, resource))
+
+    def pause(self, provider, until):
+        with self._transaction() as conn:
+            conn.execute("INSERT INTO pauses VALUES (?, ?) ON CONFLICT(provider) DO UPDATE"
+                         " SET until = max(until, excluded.until)", (provider, until))
+
+    def wait(self, seconds):
+        time.sleep(seconds)
+
+
+class Lease:
+    """A granted slot; settle() corrects the LLM token estimate once the real size is known."""
+
+    def __init__(self, scheduler, provider, tokens):
+        self.scheduler = scheduler
+        self.provider = provider
+        self.tokens = tokens
+
+    def settle(self, tokens):
+        if tokens != self.tokens:
+            self.scheduler.state.adjust(self.provider, "tokens", tokens - self.tokens)
+            self.tokens = tokens
+
+
+class Scheduler:
+    def __init__(self, state=None):
+        self.state = state or MemoryState()
+
+    @contextmanager
+    def acquire(self, provider, tokens=0, cancel=None):
+        """
+        Blocks until `provider` has capacity for one request (and `tokens`
+        LLM tokens), then holds an in-flight slot for the duration of the block.
+        Unknown providers (or None) pass straight through. Setting the `cancel`
+        event while waiting raises CancelledError instead of taking a slot.
+        """
+        limits = get_limits(provider) if provider else None
+        if limits is None:
+            yield None
+            return
+
+        priority = PRIORITIES.get(_priority.get(), 0)
+        costs = {"requests": 1, "tokens": tokens}
+        waiter = self.state.add_waiter(provider, priority)
+        started = time.perf_counter()
+        waited = False
+        try:
+            while True:
+                if cancel is not None and cancel.is_set():
+                    raise CancelledError(f"{provider} call cancelled while waiting for a slot")
+                lease, wait = self.state.try_acquire(provider, limits, costs, priority, waiter)
+                if lease is not None:
+                    break
+                waited = True
+                self.state.wait(min(wait, RATE_LIMIT_POLL_SECONDS) or RATE_LIMIT_POLL_SECONDS)
+        finally:
+            self.state.remove_waiter(provider, waiter)
+
+        if waited:
+            incr("rate_limit_waits", provider=provider)
+            incr("rate_limit_wait_seconds", time.perf_counter() - started, provider=provider)
+        try:
+            yield Lease(self, provider, tokens)
+        finally:
+            self.state.release(provider, lease)
+
+    def pause(self, provider, seconds):
+        """Holds every caller of `provider` back for `seconds`, e.g. after a 429."""
+        if provider and provider in DEFAULT_LIMITS and seconds > 0:
+            log.warning(f"⏸️ {provider} quota reached; pausing calls for {seconds:.1f}s")
+            incr("rate_limit_pauses", provider=provider)
+            self.state.pause(provider, time.time() + seconds)
+
+
+def _make_state(state):
+    if state == "memory":
+        return MemoryState()
+    if state == "sqlite":
+        return SQLiteState()
+    raise ValueError(f"Unknown RATE_LIMIT_STATE: {state}")
+
+
+def configure(state=None):
+    """Selects the process-wide scheduler state: "memory" or "sqlite" (shared across processes)."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = Scheduler(_make_state(state or RATE_LIMIT_STATE))
+        return _scheduler
+
+
+def get_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler(_make_state(RATE_LIMIT_STATE))
+        return _scheduler
+
+
+def acquire(provider, tokens=0, cancel=None):
+    return get_scheduler().acquire(provider, tokens=tokens, cancel=cancel)
+
+
+def pause(provider, seconds=None):
+    get_scheduler().pause(provider, RATE_LIMIT_QUOTA_PAUSE if seconds is None else seconds)
+
+
+def is_quota_error(error):
+    """True for quota/rate errors raised by provider SDKs (HTTP 429 / RESOURCE_EXHAUSTED)."""
+    return (getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429
+            or type(error).__name__ in ("ResourceExhausted", "TooManyRequests", "RateLimitError"))
+
+
+@contextmanager
+def priority(level):
+    """Runs the block's provider calls at `level` ("interactive" or "batch")."""
+    if level not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {level}")
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
@@ -1,34 +1,57 @@
 import os
-import requests
-from dotenv import load_dotenv
 
-load_dotenv()
+from src import http_client
+from src.config import load_env
+from src.lookup_cache import cached_lookup
+from src.metrics import get_logger, span
+
+log = get_logger(__name__)
+
+# Search results younger than this are used without a background refresh
+SEARCH_FRESH_SECONDS = int(os.getenv("SEARCH_FRESH_SECONDS", str(24 * 3600)))
 
 
 def serpapi_search(query: str, num_results: int = 5):
     """
     Return a list of dicts: {title, snippet, link}.
+    Results, empty ones and failures included, go through the lookup cache.
     """
+    load_env()
     api_key = os.getenv("SERPAPI_KEY")
     if not api_key:
-        print("⚠️ SERPAPI_KEY not set. Returning empty results.")
+        log.warning("⚠️ SERPAPI_KEY not set. Returning empty results.")
         return []
 
+    try:
+        results = cached_lookup("search", {"engine": "google", "query": query, "num_results": num_results},
+                                lambda: _search(query, num_results, api_key), SEARCH_FRESH_SECONDS, default=[])
+    except Exception as e:
+        log.warning(f"⚠️ SerpAPI search failed for query '{query}': {e}")
+        return []
+    if not results:
+        log.warning(f"⚠️ No search results for query: {query}")
+    return results
+
+
+def _search(query, num_results, api_key):
     url = "https://serpapi.com/search"
     params = {
         "engine": "google",
         "q": query,
         "api_key": api_key
     }
-    res = requests.get(url, params=params)
-    data = res.json()
-
-    results = []
-    if "organic_results" in data:
-        for item in data["organic_results"][:num_results]:
-            results.append({
-                "title": item.get("title"),
-                "snippet": item.get("snippet"),
-                "link": item.get("link")
-            })
+    with span("serpapi.request", results=0) as attrs:
+        res = http_client.get(url, params=params)
+        res.raise_for_status()
+        data = res.json()
+
+        results = []
+        if "organic_results" in data:
+            for item in data["organic_results"][:num_results]:
+                results.append({
+                    "title": item.get("title"),
+                    "snippet": item.get("snippet"),
+                    "link": item.get("link")
+                })
+        attrs["results"] = len(results)
     return results
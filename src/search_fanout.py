@@ -0,0 +1,112 @@
+# src/search_fanout.py
+"""
+Multi-query search for wider coverage of a topic.
+
+With SEARCH_SUBQUERIES above 1, the LLM writes that many search queries
+for the topic: one overview query and one per expected section. They are
+searched concurrently, so the stage takes about as long as one search. The
+result lists are merged by reciprocal-rank fusion (RRF): a result scores
+1 / (RRF_K + rank) in every list it appears in. Results that rank well in
+several lists come first, and the same page is kept only once.
+"""
+import os
+import re
+import contextvars
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+from src.synthesizer import _read_prompt_template, PROMPT_FILE
+from src.metrics import get_logger, span, incr
+
+log = get_logger(__name__)
+
+# Search queries generated per topic (1 = one optimized query)
+SEARCH_SUBQUERIES = int(os.getenv("SEARCH_SUBQUERIES", "1"))
+# Searches in flight at once for one topic
+SEARCH_FANOUT_WORKERS = int(os.getenv("SEARCH_FANOUT_WORKERS", "4"))
+# RRF damping constant; 60 is the usual choice and keeps a single #1 rank from dominating
+RRF_K = 60
+
+# List markers and quotes LLMs put around queries despite being asked not to
+_QUERY_PREFIX_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)]|query\s*\d*:)\s*", re.IGNORECASE)
+
+
+def query_prompt(topic, subqueries=None):
+    """Returns the query generation prompt for one query or for `subqueries` of them."""
+    subqueries = SEARCH_SUBQUERIES if subqueries is None else subqueries
+    if subqueries <= 1:
+        return _read_prompt_template(PROMPT_FILE, "SEARCH_QUERY_GENERATION_PROMPT").format(topic=topic)
+    return _read_prompt_template(PROMPT_FILE, "SEARCH_SUBQUERIES_GENERATION_PROMPT").format(topic=topic,
+                                                                                         count=subqueries)
+
+
+def parse_queries(text, limit):
+    """Returns up to `limit` distinct queries from the LLM's one-per-line answer."""
+    if limit <= 1:
+        # The single-query prompt's whole answer is the query, as before sub-queries existed
+        return [text.strip()]
+    queries = []
+    seen = set()
+    for line in text.splitlines():
+        query = _QUERY_PREFIX_RE.sub("", line).strip().strip("\"'`").strip()
+        if not query or query.startswith("```") or query.lower() in seen:
+            continue
+        seen.add(query.lower())
+        queries.append(query)
+        if len(queries) == limit:
+            break
+    return queries or [text.strip()]
+
+
+def _url_key(link):
+    """Identity of a result page: scheme, "www." and trailing slashes do not matter."""
+    parts = urlsplit(link.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return f"{host}{parts.path.rstrip('/')}?{parts.query}"
+
+
+def rrf_merge(result_lists, k=RRF_K):
+    """
+    Merges ranked result lists into one, best fused score first. A page found
+    by several queries is kept once, with the copy from its best rank.
+    """
+    scores = {}
+    best = {}   # url key -> (rank, result)
+    for results in result_lists:
+        for rank, result in enumerate(results, start=1):
+            link = result.get("link")
+            key = _url_key(link) if link else f"title:{(result.get('title') or '').strip().lower()}"
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            if key not in best or rank < best[key][0]:
+                best[key] = (rank, result)
+    # Ties keep first-seen order, i.e. the earlier query's results first
+    order = sorted(scores, key=lambda key: -scores[key])
+    return [best[key][1] for key in order]
+
+
+def merge_results(result_lists):
+    """rrf_merge, counting the duplicate pages it removed."""
+    merged = rrf_merge(result_lists)
+    incr("search_duplicates", sum(len(results) for results in result_lists) - len(merged))
+    return merged
+
+
+def search_all(queries, search_fn, num_results, max_workers=None):
+    """
+    Runs `search_fn(query, num_results=...)` for every query concurrently
+    and returns the RRF-merged results.
+    """
+    if len(queries) == 1:
+        return search_fn(queries[0], num_results=num_results)
+    workers = max(1, min(len(queries), max_workers or SEARCH_FANOUT_WORKERS))
+    with span("search.fanout", queries=len(queries), results=0) as attrs, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search") as executor:
+        # Each search runs in a copy of the caller's context so its spans nest under this one
+        futures = [executor.submit(contextvars.copy_context().run, search_fn, query, num_results=num_results)
+                   for query in queries]
+        result_lists = [future.result() for future in futures]
+        merged = merge_results(result_lists)
+        attrs["results"] = len(merged)
+    return merged
@@ -0,0 +1,238 @@
+# src/service.py
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.config import load_env
+from src import metrics, rate_limit
+from src.deck_spec import spec_path_for
+
+load_env()
+
+log = metrics.get_logger(__name__)
+
+# Jobs waiting beyond this are rejected with 503 instead of queueing forever
+SERVICE_QUEUE_SIZE = int(os.getenv("SERVICE_QUEUE_SIZE", "32"))
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", "2"))
+SERVICE_OUTPUT_DIR = os.getenv("SERVICE_OUTPUT_DIR", "decks")
+# Finished jobs kept for status/result lookups; older ones are forgotten and their decks deleted
+SERVICE_JOB_HISTORY = int(os.getenv("SERVICE_JOB_HISTORY", "1000"))
+
+
+class RenderService:
+    """
+    Long-lived deck generator: one warm LLM client, pooled HTTP sessions and
+    pre-stripped templates in memory, fed from a bounded job queue.
+    """
+
+    def __init__(self, workers=SERVICE_WORKERS, queue_size=SERVICE_QUEUE_SIZE, output_dir=SERVICE_OUTPUT_DIR,
+                 templates=(), default_template=None, cache=True):
+        # Pipeline modules are imported on start-up, not when the module is imported
+        from src.llm_client import LLMClient
+        from src.pipeline import generate_deck
+        from src.ppt_generator import load_template
+
+        self.output_dir = output_dir
+        self.default_template = default_template
+        self.llm_client = LLMClient(cache=cache)
+        self.generate_deck = generate_deck
+        self.jobs = {}
+        self.jobs_lock = threading.Lock()
+        self.queue = queue.Queue(maxsize=queue_size)
+
+        for template in templates:
+            load_template(template)
+            log.info(f"🔥 Template loaded: {template}")
+
+        os.makedirs(output_dir, exist_ok=True)
+        self.workers = [threading.Thread(target=self._work, name=f"render-{i}", daemon=True) for i in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, payload):
+        """Queues a job; returns its record or None when the queue is full."""
+        if not isinstance(payload, dict):
+            raise ValueError("request body must be a JSON object")
+        topic = payload.get("topic")
+        template = payload.get("template") or self.default_template
+        if not topic or not template:
+            raise ValueError("'topic' and 'template' are required")
+        if not isinstance(topic, str) or not isinstance(template, str):
+            raise ValueError("'topic' and 'template' must be strings")
+        if not os.path.exists(template):
+            raise ValueError(f"Template not found: {template}")
+        priority = payload.get("priority", "interactive")
+        if priority not in rate_limit.PRIORITIES:
+            raise ValueError(f"'priority' must be one of: {', '.join(rate_limit.PRIORITIES)}")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "topic": topic,
+            "template": template,
+            "priority": priority,
+            "output": os.path.join(self.output_dir, f"{job_id}.pptx"),
+            "status": "queued",
+            "submitted_at": time.time(),
+        }
+        with self.jobs_lock:
+            self.jobs[job_id] = job
+        try:
+            self.queue.put_nowait(job_id)
+        except queue.Full:
+            with self.jobs_lock:
+                del self.jobs[job_id]
+            return None
+        self._trim_history()
+        return dict(job)
+
+    def get(self, job_id):
+        with self.jobs_lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _update(self, job_id, **fields):
+        with self.jobs_lock:
+            self.jobs[job_id].update(fields)
+
+    def _trim_history(self):
+        trimmed = []
+        with self.jobs_lock:
+            finished = [job for job in self.jobs.values() if job["status"] in ("done", "failed")]
+            excess = len(finished) - SERVICE_JOB_HISTORY
+            if excess > 0:
+                for job in sorted(finished, key=lambda job: job["submitted_at"])[:excess]:
+                    del self.jobs[job["id"]]
+                    trimmed.append(job)
+        # No endpoint can reach a forgotten job's deck, so it would only fill the disk
+        for job in trimmed:
+            for path in (job["output"], spec_path_for(job["output"])):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    log.warning(f"⚠️ Could not delete {path}: {e}")
+
+    def _work(self):
+        while True:
+            job_id = self.queue.get()
+            job = self.get(job_id)
+            self._update(job_id, status="running", started_at=time.time())
+            try:
+                with rate_limit.priority(job["priority"]):
+                    timings = self.generate_deck(job["topic"], job["output"], job["template"], self.llm_client)
+                if not os.path.exists(job["output"]):
+                    raise RuntimeError("deck was not saved")
+                self._update(job_id, status="done", timings=timings, finished_at=time.time())
+                metrics.incr("service_jobs", status="done")
+            except (Exception, SystemExit) as e:
+                log.exception(f"❌ Job {job_id} failed")
+                self._update(job_id, status="failed", error=f"{type(e).__name__}: {e}", finished_at=time.time())
+                metrics.incr("service_jobs", status="failed")
+            finally:
+                self.queue.task_done()
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if self.path != "/jobs":
+                return self._send_json(404, {"error": "not found"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                job = service.submit(payload)
+            except (ValueError, TypeError, AttributeError) as e:
+                return self._send_json(400, {"error": str(e)})
+            if job is None:
+                return self._send_json(503, {"error": "queue full, retry later"})
+            self._send_json(202, job)
+
+        def do_GET(self):
+            parts = [part for part in self.path.split("/") if part]
+            if parts == ["health"]:
+                return self._send_json(200, {"status": "ok", "queued": service.queue.qsize()})
+            if parts == ["metrics"]:
+                body = metrics.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            if len(parts) < 2 or parts[0] != "jobs":
+                return self._send_json(404, {"error": "not found"})
+            job = service.get(parts[1])
+            if job is None:
+                return self._send_json(404, {"error": "unknown job"})
+            if len(parts) == 2:
+                return self._send_json(200, job)
+            if parts[2:] == ["result"]:
+                if job["status"] != "done":
+                    return self._send_json(409, {"error": f"job is {job['status']}"})
+                with open(job["output"], "rb") as f:
+                    body = f.read()
+                self.send_response(200)
+                self.send_header("Content-Type",
+                                 "application/vnd.openxmlformats-officedocument.presentationml.presentation")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            self._send_json(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            log.info(f"🌐 {self.address_string()} {format % args}")
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local deck generation service")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--template", action="append", default=[],
+                        help="Template to keep loaded (repeatable); the first one is the default")
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="Concurrent render jobs")
+    parser.add_argument("--queue-size", type=int, default=SERVICE_QUEUE_SIZE, help="Maximum queued jobs")
+    parser.add_argument("--output-dir", default=SERVICE_OUTPUT_DIR, help="Directory for generated decks")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write cached LLM responses")
+    parser.add_argument("--log-level", default="INFO", help="Logging level (DEBUG, INFO, WARNING, ERROR)")
+    args = parser.parse_args(argv)
+    metrics.setup_logging(args.log_level)
+
+    for template in args.template:
+        if not os.path.exists(template):
+            log.error(f"❌ Template not found: {template}")
+            sys.exit(1)
+
+    service = RenderService(workers=args.workers, queue_size=args.queue_size, output_dir=args.output_dir,
+                            templates=args.template, default_template=args.template[0] if args.template else None,
+                            cache=not args.no_cache)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    log.info(f"🚀 Deck service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log.info("👋 Shutting down")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,10 @@ import re
 import os
 import sys
 
+from src.metrics import get_logger
+
+log = get_logger(__name__)
+
 PROMPT_FILE = "prompts.md"
 
 def _read_prompt_template(file_path, section_name):
@@ -15,28 +19,38 @@ def _read_prompt_template(file_path, section_name):
             if match:
                 return match.group(1).strip()
             else:
-                print(f"Error: Section '{section_name}' not found in {file_path}", file=sys.stderr)
+                log.error(f"❌ Section '{section_name}' not found in {file_path}")
                 sys.exit(1)
     except FileNotFoundError:
-        print(f"Error: Prompt file not found at {file_path}", file=sys.stderr)
+        log.error(f"❌ Prompt file not found at {file_path}")
         sys.exit(1)
 
-def synthesize(topic, search_results, llm_client):
+def _build_prompt(topic, search_results):
     context = "\n".join(search_results)
     
     # Read the prompt template from the file
     prompt_template = _read_prompt_template(PROMPT_FILE, "SLIDE_GENERATION_PROMPT")
 
     # Format the prompt with the topic and search context
-    prompt = prompt_template.format(topic=topic, context=context)
+    return prompt_template.format(topic=topic, context=context)
 
-    response = llm_client.generate(prompt).strip()
+def _format_slide(slide):
+    # The ppt_generator expects 'content' as a single string, but the new prompt
+    # generates 'bullets' as a list. We need to convert 'bullets' to 'content'.
+    return {
+        "title": slide.get("title", ""),
+        "subtitle": slide.get("subtitle", ""),
+        "content": "\n".join([f"- {bullet}" for bullet in slide.get("bullets", [])]),
+        "notes": slide.get("notes", ""),
+        "sources": slide.get("sources", [])
+    }
 
+def _parse_response(topic, response):
     # Extract JSON string from markdown code block
     json_match = re.search(r"```json\n(.*)\n```", response, re.DOTALL)
     if not json_match:
-        print(f"⚠️ Failed to extract JSON from response. Raw text: {response}", file=sys.stderr)
-        print("Falling back to single summary slide.", file=sys.stderr)
+        log.warning(f"⚠️ Failed to extract JSON from response, falling back to a single summary slide. "
+                    f"Raw text: {response}")
         return [{"title": f"Summary: {topic}", "content": response}]
 
     json_string = json_match.group(1).strip()
@@ -46,26 +60,110 @@ def synthesize(topic, search_results, llm_client):
         slides = structured_data.get("slides", [])
         
         # Reformat slides to match the expected structure for ppt_generator
-        # The ppt_generator expects 'content' as a single string, but the new prompt
-        # generates 'bullets' as a list. We need to convert 'bullets' to 'content'.
-        formatted_slides = []
-        for slide in slides:
-            formatted_slide = {
-                "title": slide.get("title", ""),
-                "subtitle": slide.get("subtitle", ""),
-                "content": "\n".join([f"- {bullet}" for bullet in slide.get("bullets", [])]),
-                "notes": slide.get("notes", ""),
-                "sources": slide.get("sources", [])
-            }
-            formatted_slides.append(formatted_slide)
+        formatted_slides = [_format_slide(slide) for slide in slides]
         
         if not formatted_slides:
-            print("⚠️ No valid slides could be parsed from JSON. Falling back to single summary slide.", file=sys.stderr)
+            log.warning("⚠️ No valid slides could be parsed from JSON. Falling back to single summary slide.")
             return [{"title": f"Summary: {topic}", "content": response}]
 
         return formatted_slides
 
     except json.JSONDecodeError as e:
-        print(f"⚠️ Failed to parse JSON response: {e}. Raw text: {json_string}", file=sys.stderr)
-        print("Falling back to single summary slide.", file=sys.stderr)
+        log.warning(f"⚠️ Failed to parse JSON response: {e}. Falling back to a single summary slide. "
+                    f"Raw text: {json_string}")
         return [{"title": f"Summary: {topic}", "content": response}]
+
+def synthesize(topic, search_results, llm_client):
+    prompt = _build_prompt(topic, search_results)
+    response = llm_client.generate(prompt, stage="synthesis").strip()
+    return _parse_response(topic, response)
+
+class SlideStreamParser:
+    """
+    Incremental parser for the slide JSON the LLM streams back.
+
+    Text is fed in arbitrary chunks; every object in the top-level "slides"
+    array is returned from feed() as soon as its closing brace arrives.
+    """
+
+    _SLIDES_START = re.compile(r'"slides"\s*:\s*\[')
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = None         # scan position once the slides array was found
+        self.depth = 0          # brace depth inside the array
+        self.in_string = False
+        self.escaped = False
+        self.object_start = None
+        self.done = False
+
+    def feed(self, text):
+        self.buffer += text
+        if self.done:
+            return []
+        if self.pos is None:
+            match = self._SLIDES_START.search(self.buffer)
+            if not match:
+                return []
+            self.pos = match.end()
+
+        slides = []
+        buffer = self.buffer
+        for i in range(self.pos, len(buffer)):
+            ch = buffer[i]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "{":
+                if self.depth == 0:
+                    self.object_start = i
+                self.depth += 1
+            elif ch == "}":
+                self.depth -= 1
+                if self.depth == 0 and self.object_start is not None:
+                    try:
+                        slides.append(json.loads(buffer[self.object_start:i + 1]))
+                    except json.JSONDecodeError as e:
+                        log.warning(f"⚠️ Skipping malformed streamed slide: {e}")
+                    self.object_start = None
+            elif ch == "]" and self.depth == 0:
+                self.done = True
+                self.pos = i + 1
+                return slides
+        self.pos = len(buffer)
+        return slides
+
+def synthesize_stream(topic, search_results, llm_client):
+    """
+    Streaming variant of synthesize(): yields each formatted slide as soon as
+    the model has finished writing it. Falls back to parsing the whole
+    response (like synthesize) when nothing could be parsed incrementally.
+    """
+    prompt = _build_prompt(topic, search_results)
+    if not hasattr(llm_client, "generate_stream"):
+        yield from _parse_response(topic, llm_client.generate(prompt, stage="synthesis").strip())
+        return
+
+    parser = SlideStreamParser()
+    yielded = 0
+    try:
+        for chunk in llm_client.generate_stream(prompt, stage="synthesis"):
+            for slide in parser.feed(chunk):
+                yielded += 1
+                yield _format_slide(slide)
+    except Exception as e:
+        if yielded:
+            log.warning(f"⚠️ LLM stream failed after {yielded} slides: {e}")
+            return
+        log.warning(f"⚠️ LLM stream failed, retrying without streaming: {e}")
+        yield from synthesize(topic, search_results, llm_client)
+        return
+
+    if not yielded:
+        yield from _parse_response(topic, parser.buffer.strip())
@@ -41,26 +41,10 @@ def analyze_template(template_path):
         
         # Find best layouts
         best_layouts = []
-        for i, layout in enumerate(prs.slide_layouts):
-            placeholders = layout.placeholders
-            has_title = any(p.placeholder_format.type == PP_PLACEHOLDER.TITLE for p in placeholders)
-            has_content = any(p.placeholder_format.type == PP_PLACEHOLDER.BODY for p in placeholders)
-            has_picture = any(p.placeholder_format.type == PP_PLACEHOLDER.PICTURE for p in placeholders)
-            
-            score = 0
-            features = []
-            if has_title:
-                score += 3
-                features.append("Title")
-            if has_content:
-                score += 2
-                features.append("Content")
-            if has_picture:
-                score += 1
-                features.append("Picture")
-            
-            if score > 0:
-                best_layouts.append((i, layout.name, score, features))
+        for layout_info in describe_layouts(prs):
+            if layout_info["score"] > 0:
+                best_layouts.append((layout_info["index"], layout_info["name"], layout_info["score"],
+                                     layout_info["features"]))
         
         # Sort by score (best first)
         best_layouts.sort(key=lambda x: x[2], reverse=True)
@@ -72,6 +56,56 @@ def analyze_template(template_path):
     except Exception as e:
         print(f"❌ Error analyzing template: {e}")
 
+def describe_layouts(prs):
+    """
+    Returns the capabilities of every layout in a presentation: which roles it
+    can hold (title/content/picture), a suitability score and the index, type
+    and geometry of each placeholder.
+    """
+    layouts = []
+    for i, layout in enumerate(prs.slide_layouts):
+        placeholders = []
+        for placeholder in layout.placeholders:
+            placeholders.append({
+                "idx": placeholder.placeholder_format.idx,
+                "type": int(placeholder.placeholder_format.type),
+                "type_name": get_placeholder_type_name(placeholder.placeholder_format.type),
+                "has_text_frame": placeholder.has_text_frame,
+                "left": placeholder.left,
+                "top": placeholder.top,
+                "width": placeholder.width,
+                "height": placeholder.height,
+            })
+        types = {p["type"] for p in placeholders}
+        has_title = PP_PLACEHOLDER.TITLE in types
+        has_content = PP_PLACEHOLDER.BODY in types
+        has_picture = PP_PLACEHOLDER.PICTURE in types
+        
+        score = 0
+        features = []
+        if has_title:
+            score += 3
+            features.append("Title")
+        if has_content:
+            score += 2
+            features.append("Content")
+        if has_picture:
+            score += 1
+            features.append("Picture")
+
+        layouts.append({
+            "index": i,
+            "name": layout.name,
+            "has_title": has_title,
+            "has_content": has_content,
+            "has_picture": has_picture,
+            "has_center_title": PP_PLACEHOLDER.CENTER_TITLE in types,
+            "score": score,
+            "features": features,
+            "placeholders": placeholders,
+        })
+    return layouts
+
 def get_placeholder_type_name(placeholder_type):
     """
     Returns a human-readable name for placeholder types.
@@ -0,0 +1,103 @@
+# src/template_profile.py
+import os
+import hashlib
+import threading
+
+from pptx import Presentation
+from pptx.util import Inches
+
+from src.cache import load_cache, save_cache
+from src.template_analyzer import describe_layouts
+from src.metrics import get_logger
+
+log = get_logger(__name__)
+
+PROFILE_VERSION = 1
+
+# Size of images added to slides whose layout has no picture placeholder
+MANUAL_IMAGE_WIDTH = Inches(3.5)
+MANUAL_IMAGE_HEIGHT = Inches(4)
+
+_profiles = {}
+_hashes = {}
+_profiles_lock = threading.Lock()
+
+
+def template_hash(template):
+    """Returns the SHA-256 of a template file's content (memoized per path/mtime/size)."""
+    stat = os.stat(template)
+    stat_key = (os.path.abspath(template), stat.st_mtime_ns, stat.st_size)
+    with _profiles_lock:
+        cached = _hashes.get(stat_key)
+    if cached:
+        return cached
+
+    digest = hashlib.sha256()
+    with open(template, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    with _profiles_lock:
+        _hashes[stat_key] = digest.hexdigest()
+    return digest.hexdigest()
+
+
+def _pick(layouts, *required):
+    for layout in layouts:
+        if all(layout[flag] for flag in required):
+            return layout
+    return None
+
+
+def build_profile(prs, digest=None):
+    """
+    Analyzes a presentation once and records the layout to use for each
+    slide role, with that layout's placeholder geometry.
+    """
+    layouts = describe_layouts(prs)
+
+    # Same preference order the generator always used for content slides
+    content = (_pick(layouts, "has_title", "has_content", "has_picture")
+               or _pick(layouts, "has_title", "has_content")
+               or _pick(layouts, "has_title"))
+    if content is None:
+        content = layouts[1] if len(layouts) > 1 else layouts[0]
+    title = _pick(layouts, "has_center_title") or content
+
+    image_box = [MANUAL_IMAGE_WIDTH, MANUAL_IMAGE_HEIGHT]
+    for placeholder in content["placeholders"]:
+        if placeholder["type_name"] == "PICTURE":
+            image_box = [placeholder["width"], placeholder["height"]]
+            break
+
+    return {
+        "version": PROFILE_VERSION,
+        "hash": digest,
+        "layouts": layouts,
+        "roles": {"content": content["index"], "title": title["index"]},
+        "image_box": image_box,
+    }
+
+
+def get_template_profile(template, prs=None):
+    """
+    Returns the layout profile for a template, keyed by its content hash.
+    Profiles are kept in memory and persisted through src/cache.py, so a
+    template is only analyzed the first time it is seen.
+    """
+    digest = template_hash(template)
+    with _profiles_lock:
+        profile = _profiles.get(digest)
+    if profile is not None:
+        return profile
+
+    key = f"template_profile:{PROFILE_VERSION}:{digest}"
+    profile = load_cache(key)
+    if profile is None:
+        log.info(f"🔧 Profiling template layouts: {template}")
+        profile = build_profile(prs or Presentation(template), digest)
+        # A template's content hash never changes meaning, so never expire it
+        save_cache(key, profile, ttl=0)
+
+    with _profiles_lock:
+        _profiles[digest] = profile
+    return profile
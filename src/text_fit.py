@@ -0,0 +1,140 @@
+# src/text_fit.py
+"""
+In-process text measurement for choosing font sizes that fit placeholders.
+
+Glyph advances come from Pillow's FreeType binding. Each character is
+measured once per process at REFERENCE_SIZE and the table is reused for
+every size, since advances scale linearly at the resolutions slides are
+laid out in. A paragraph's word widths are computed once, and every
+candidate size only re-runs the greedy line wrap over those widths.
+"""
+import os
+import threading
+
+from PIL import ImageFont
+
+from src.metrics import get_logger
+
+log = get_logger(__name__)
+
+# Font file (path or name) to measure with; by default the first of FONT_CANDIDATES found
+TEXT_FIT_FONT = os.getenv("TEXT_FIT_FONT")
+# Common slide fonts, then fonts that ship with most Linux systems. Wider
+# fallbacks only make the chosen sizes more conservative.
+FONT_CANDIDATES = ("calibri.ttf", "Calibri.ttf", "arial.ttf", "Arial.ttf", "LiberationSans-Regular.ttf",
+                   "DejaVuSans.ttf")
+
+REFERENCE_SIZE = 1000
+# Pixel size of the bitmap font Pillow < 10.1 falls back to; its widths are scaled up from it
+PILLOW_BITMAP_FONT_SIZE = 11
+# Line height as a multiple of the font size (PowerPoint's single spacing)
+LINE_SPACING = 1.2
+EMU_PER_POINT = 12700
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+class FontMetrics:
+    """
+    Advance widths of one font at REFERENCE_SIZE, measured lazily per
+    character. `scale` converts the font's own widths when it was loaded at
+    another size.
+    """
+
+    def __init__(self, font, name, scale=1.0):
+        self.font = font
+        self.name = name
+        self.scale = scale
+        self.advances = {}
+        self._lock = threading.Lock()
+        self.space = self.text_width(" ")
+
+    def text_width(self, text):
+        """Width of `text` at REFERENCE_SIZE (kerning ignored)."""
+        advances = self.advances
+        missing = [char for char in set(text) if char not in advances]
+        if missing:
+            with self._lock:
+                for char in missing:
+                    advances[char] = self.font.getlength(char) * self.scale
+        return sum(advances[char] for char in text)
+
+
+def _load_font():
+    """Returns (font, name, scale to REFERENCE_SIZE) for the first usable font."""
+    for candidate in ([TEXT_FIT_FONT] if TEXT_FIT_FONT else []) + list(FONT_CANDIDATES):
+        try:
+            return ImageFont.truetype(candidate, REFERENCE_SIZE), os.path.basename(candidate), 1.0
+        except OSError:
+            continue
+    log.warning("⚠️ No TrueType font found for text fitting; using Pillow's built-in font")
+    try:
+        return ImageFont.load_default(REFERENCE_SIZE), "pillow-default", 1.0
+    except TypeError:
+        # Pillow < 10.1 only has a fixed-size bitmap default font
+        return ImageFont.load_default(), "pillow-bitmap", REFERENCE_SIZE / PILLOW_BITMAP_FONT_SIZE
+
+
+def get_font_metrics():
+    """Returns the shared FontMetrics, loading the font on first use."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = FontMetrics(*_load_font())
+        return _metrics
+
+
+def count_lines(word_widths, space, line_width):
+    """Number of lines a greedy wrap of the words needs; overlong words wrap by character."""
+    lines = 1
+    used = 0.0
+    for width in word_widths:
+        if used and used + space + width <= line_width:
+            used += space + width
+            continue
+        if used:
+            lines += 1
+        if width <= line_width:
+            used = width
+            continue
+        # A word wider than the line breaks across as many lines as it fills
+        full, rest = divmod(width, line_width)
+        lines += int(full) - (0 if rest else 1)
+        used = rest or line_width
+    return lines
+
+
+def fit_text(paragraphs, width_emu, height_emu, max_size, min_size, space_after=0, indent_emu=0):
+    """
+    Returns (size in points, overflow) for the largest whole point size
+    between `min_size` and `max_size` at which the paragraphs fit the box.
+    `space_after` is the gap in points after each paragraph, `indent_emu`
+    the horizontal room bullets take. overflow is True when even
+    `min_size` does not fit.
+    """
+    metrics = get_font_metrics()
+    paragraphs = [words for words in (paragraph.split() for paragraph in paragraphs) if words]
+    if not paragraphs:
+        return max_size, False
+    widths = [[metrics.text_width(word) for word in words] for words in paragraphs]
+    width_pt = (width_emu - indent_emu) / EMU_PER_POINT
+    height_pt = height_emu / EMU_PER_POINT
+    if width_pt <= 0 or height_pt <= 0:
+        return min_size, True
+
+    def fits(size):
+        line_width = width_pt * REFERENCE_SIZE / size
+        lines = sum(count_lines(word_widths, metrics.space, line_width) for word_widths in widths)
+        return lines * size * LINE_SPACING + space_after * (len(paragraphs) - 1) <= height_pt
+
+    if not fits(min_size):
+        return min_size, True
+    low, high = min_size, max_size
+    while low < high:
+        size = (low + high + 1) // 2
+        if fits(size):
+            low = size
+        else:
+            high = size - 1
+    return low, False
@@ -0,0 +1,242 @@
+# src/topic_index.py
+"""
+Reuse of earlier work for near-duplicate topics.
+
+"AI in Business" and "AI for Business" need the same web research, as do
+"Machine learning for retail supply chains" and "An overview of machine
+learning for retail supply chains". Each finished topic is recorded with its
+optimized search query and search results. A new topic is normalized to a
+token set, and MinHash/LSH over those sets finds earlier topics worth
+comparing. An earlier topic is reused when its Jaccard similarity is at
+least TOPIC_REUSE_THRESHOLD and every token the two topics do not share is
+a framing word (TOPIC_MODIFIER_WORDS). A single differing subject word
+("...in healthcare" vs "...in finance") always blocks reuse, however
+similar the rest is. Query generation and SerpAPI are then skipped.
+Synthesis still runs for the new topic.
+"""
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+
+from src.cache import CACHE_DIR, CACHE_TTL
+from src.context_builder import STOPWORDS
+from src.metrics import get_logger, incr
+from src.utils import file_lock
+
+log = get_logger(__name__)
+
+# Reuse earlier topics at all (the pipelines also take topic_reuse=)
+TOPIC_REUSE = os.getenv("TOPIC_REUSE", "1") == "1"
+# Minimum Jaccard similarity of normalized topic tokens for a reuse
+TOPIC_REUSE_THRESHOLD = float(os.getenv("TOPIC_REUSE_THRESHOLD", "0.8"))
+# Age after which recorded search results are no longer reused (0 = never expire)
+TOPIC_REUSE_TTL = int(os.getenv("TOPIC_REUSE_TTL", str(CACHE_TTL)))
+# Oldest topics are dropped past this many entries
+TOPIC_INDEX_MAX_ENTRIES = int(os.getenv("TOPIC_INDEX_MAX_ENTRIES", "5000"))
+
+# Words (after stemming) that frame a topic without changing its subject. Two
+# topics may differ only in these; any other differing token is a subject word
+TOPIC_MODIFIER_WORDS = frozenset({
+    "advantage", "application", "basic", "beginner", "benefit", "current", "emerging", "explained",
+    "exploring", "fundamental", "future", "guide", "importance", "intro", "introduction", "key", "latest",
+    "modern", "new", "overview", "primer", "recent", "role", "summary", "today", "top", "trend",
+    "understanding", "use",
+})
+
+# 64 MinHash values in 16 bands of 4: topics with Jaccard 0.8 share a band
+# with probability ~0.999, topics with Jaccard 0.3 only ~0.12
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+_MERSENNE_PRIME = (1 << 61) - 1
+# Fixed seed: signatures stored in the index must match those computed later
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(MINHASH_PERMUTATIONS)]
+
+INDEX_PATH = os.path.join(CACHE_DIR, "topic_index.json")
+INDEX_VERSION = 2
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _stem(word):
+    """Folds simple plurals so "businesses" and "business" match."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("sses", "xes", "ches", "shes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def normalize_topic(topic):
+    """Returns the sorted set of stemmed, non-stopword tokens in a topic."""
+    words = _WORD_RE.findall(topic.lower())
+    tokens = {_stem(word) for word in words if word not in STOPWORDS}
+    # A topic made only of stopwords still needs some identity
+    return sorted(tokens or set(words))
+
+
+def minhash(tokens):
+    """MinHash signature of a token set; stable across processes (unlike hash())."""
+    values = [int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big") for token in tokens]
+    if not values:
+        return [0] * MINHASH_PERMUTATIONS
+    return [min((a * value + b) % _MERSENNE_PRIME for value in values) for a, b in _PERMUTATIONS]
+
+
+def _bands(signature):
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    return [f"{band}:" + hashlib.blake2b(repr(signature[band * rows:(band + 1) * rows]).encode(),
+                                         digest_size=8).hexdigest()
+            for band in range(LSH_BANDS)]
+
+
+def jaccard(a, b):
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class TopicIndex:
+    """
+    On-disk list of finished topics with LSH band postings, in the style of
+    the image index: one JSON file, rewritten atomically. Each write re-reads
+    and merges the file while holding a lock file, so concurrent batch
+    worker processes do not drop each other's topics.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        # "<subqueries>:" + " ".join(tokens) -> {topic, tokens, bands, query, results, num_results, subqueries,
+        # created_at}
+        self.entries = {}
+        self.postings = {}  # band hash -> list of entry keys
+        self._lock = threading.Lock()
+        self._load()
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != INDEX_VERSION:
+            return {}
+        return data.get("entries", {})
+
+    def _load(self):
+        self._set_entries(self._read())
+
+    def _set_entries(self, entries):
+        if len(entries) > TOPIC_INDEX_MAX_ENTRIES:
+            newest = sorted(entries, key=lambda key: entries[key]["created_at"])[-TOPIC_INDEX_MAX_ENTRIES:]
+            entries = {key: entries[key] for key in newest}
+        postings = {}
+        for key, entry in entries.items():
+            for band in entry["bands"]:
+                postings.setdefault(band, []).append(key)
+        self.entries, self.postings = entries, postings
+
+    def _save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "entries": self.entries}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning(f"⚠️ Could not write topic index {self.path}: {e}")
+
+    def find(self, topic, threshold=None, subqueries=1):
+        """
+        Returns (entry, similarity) for the most similar unexpired earlier
+        topic searched with the same number of sub-queries, at or above
+        `threshold` and differing only in framing words; otherwise (None,
+        best similarity seen).
+        """
+        threshold = TOPIC_REUSE_THRESHOLD if threshold is None else threshold
+        tokens = normalize_topic(topic)
+        token_set = set(tokens)
+        bands = _bands(minhash(tokens))
+        now = time.time()
+        with self._lock:
+            candidates = {key for band in bands for key in self.postings.get(band, ())}
+            best, best_score = None, 0.0
+            for key in sorted(candidates):
+                entry = self.entries[key]
+                if TOPIC_REUSE_TTL and now - entry["created_at"] > TOPIC_REUSE_TTL:
+                    continue
+                if entry["subqueries"] != subqueries:
+                    continue
+                # Sharing most words is not enough: "... in healthcare" is not "... in finance"
+                if (token_set ^ set(entry["tokens"])) - TOPIC_MODIFIER_WORDS:
+                    continue
+                # LSH only proposes candidates; the decision uses the exact similarity
+                score = jaccard(tokens, entry["tokens"])
+                if score > best_score:
+                    best, best_score = entry, score
+        if best is None or best_score < threshold:
+            return None, best_score
+        return best, best_score
+
+    def record(self, topic, query, results, num_results, subqueries=1):
+        """Stores a finished topic's search query and results for later reuse."""
+        tokens = normalize_topic(topic)
+        entry = {
+            "topic": topic,
+            "tokens": tokens,
+            "bands": _bands(minhash(tokens)),
+            "query": query,
+            # Only the search fields; page text is cached separately by the page fetcher
+            "results": [{key: result.get(key) for key in ("title", "snippet", "link")} for result in results],
+            "num_results": num_results,
+            "subqueries": subqueries,
+            "created_at": time.time(),
+        }
+        with self._lock, file_lock(f"{self.path}.lock"):
+            entries = self._read()
+            entries.update({key: value for key, value in self.entries.items() if key not in entries})
+            entries[f"{subqueries}:" + " ".join(tokens)] = entry
+            self._set_entries(entries)
+            self._save()
+
+
+def get_topic_index():
+    """Returns the shared TopicIndex, loading it on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = TopicIndex()
+        return _index
+
+
+def find_similar_topic(topic, num_results, subqueries=1):
+    """
+    Returns (query, results) from a similar earlier topic searched with the
+    same number of sub-queries, or None. Entries whose search asked for
+    fewer than `num_results` results per query are not reused.
+    """
+    entry, score = get_topic_index().find(topic, subqueries=subqueries)
+    if entry is not None and entry["num_results"] < num_results:
+        entry = None
+    if entry is None:
+        incr("topic_reuse", outcome="miss")
+        return None
+    incr("topic_reuse", outcome="hit")
+    log.info(f"♻️ Reusing research from similar topic '{entry['topic']}' (similarity {score:.2f}); "
+             "pass --no-topic-reuse to search afresh")
+    # Merged sub-query results hold up to num_results pages per query
+    return entry["query"], [dict(result) for result in entry["results"][:num_results * subqueries]]
+
+
+def record_topic(topic, query, results, num_results, subqueries=1):
+    if results:
+        get_topic_index().record(topic, query, results, num_results, subqueries)
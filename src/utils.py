@@ -1,4 +1,12 @@
+import os
 import json
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 
 def pretty_json(obj) -> str:
@@ -11,3 +19,27 @@ def clean_text(text: str) -> str:
     if not text:
         return ""
     return " ".join(text.strip().split())
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Holds an exclusive lock on `path` (created if missing) for the block,
+    across processes. Wrap a read-modify-write of a shared file in it so
+    concurrent writers do not drop each other's changes.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -1,9 +1,14 @@
+from src.metrics import get_logger
+
+log = get_logger(__name__)
+
+
 def search_web(query):
     """
     Mock web search function.
     Always returns simple placeholder results for the given query.
     """
-    print(f"🔍 Mock searching for: {query}")
+    log.info(f"🔍 Mock searching for: {query}")
     return [
         f"{query} overview and introduction.",
         f"Key challenges related to {query}.",
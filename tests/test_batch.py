@@ -0,0 +1,18 @@
+from src import batch
+from src.benchmark import FakeLLMClient, make_fake_fetch_image, make_fake_search, stand_ins
+
+
+def test_a_stale_deck_does_not_turn_a_failed_job_into_ok(tmp_path, monkeypatch):
+    template = tmp_path / "broken.pptx"
+    template.write_bytes(b"not a presentation")
+    output = tmp_path / "deck.pptx"
+    output.write_bytes(b"deck from an earlier run")
+    monkeypatch.setattr(batch, "_worker_llm_client", FakeLLMClient(3))
+
+    job = {"id": 1, "topic": "Offline test", "template": str(template), "output": str(output),
+           "overrides": {"fetch_pages": False, "topic_reuse": False, "write_spec": False}}
+    with stand_ins(make_fake_search(0), make_fake_fetch_image([None], 0), str(tmp_path)):
+        record = batch.run_job(job)
+
+    assert record["status"] == "failed"
+    assert not output.exists()
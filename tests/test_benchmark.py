@@ -0,0 +1,18 @@
+import os
+
+from src import benchmark
+
+CASE = {"template_kind": "default", "slides": 10, "pipeline": "sync", "slide_cache": "cold",
+        "images": ["a.jpg", "b.jpg"], "workdir": "/tmp"}
+
+
+def _killed(case, result_queue):
+    os._exit(137)
+
+
+def test_a_case_process_that_dies_is_recorded_as_failed():
+    record = benchmark._run_isolated(CASE, target=_killed)
+    assert record["status"] == "failed"
+    assert "137" in record["error"]
+    assert record["images"] == 2
+    assert "workdir" not in record
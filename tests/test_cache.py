@@ -0,0 +1,56 @@
+import os
+import sqlite3
+import time
+
+from src import cache
+from src.cache import FileCacheBackend, SQLiteCacheBackend
+
+
+def _totals(backend):
+    conn = backend._connect()
+    stored = conn.execute("SELECT total_size FROM stats").fetchone()[0]
+    actual = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    return stored, actual
+
+
+def test_sqlite_size_total_follows_writes_and_evictions(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+    backend.put_many({f"key{i}": {"value": "x" * i} for i in range(50)})
+    backend.put("key1", {"value": "replaced with something longer"})
+    backend.put_hashed([("gone", {"value": 1}, time.time() - 1)])
+    backend.evict(max_bytes=200)
+    stored, actual = _totals(backend)
+    assert stored == actual <= 200
+
+
+def test_sqlite_size_total_is_seeded_for_an_existing_database(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, compressed INTEGER NOT NULL,"
+                 " expires_at REAL, accessed_at REAL NOT NULL, size INTEGER NOT NULL)")
+    conn.execute("INSERT INTO entries VALUES ('old', x'00', 0, NULL, 0, 123)")
+    conn.commit()
+    conn.close()
+
+    backend = SQLiteCacheBackend(db_path)
+    backend.put("new", {"value": 1})
+    assert _totals(backend)[0] == _totals(backend)[1] > 123
+
+
+def test_sqlite_put_evicts_once_over_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_MAX_BYTES", 300)
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+    for i in range(40):
+        backend.put(f"key{i}", {"value": "x" * 20})
+    assert _totals(backend)[1] <= 300
+    assert backend.get("key39") is not None
+
+
+def test_file_put_evicts_once_over_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_MAX_BYTES", 1000)
+    backend = FileCacheBackend(str(tmp_path))
+    for i in range(40):
+        backend.put(f"key{i}", {"value": "x" * 20})
+    size = sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+    assert size <= 1000
+    assert backend.get("key39") is not None
@@ -0,0 +1,21 @@
+import os
+
+from PIL import Image
+
+from src import image_prep
+from src.image_prep import EMU_PER_INCH, prepare_image
+
+
+def test_originals_that_do_not_shrink_are_not_recompressed_again(tmp_path, monkeypatch):
+    path = str(tmp_path / "small.jpg")
+    Image.effect_noise((200, 150), 60).convert("RGB").save(path, format="JPEG", quality=20)
+    box = (4 * EMU_PER_INCH, 3 * EMU_PER_INCH)
+
+    assert prepare_image(path, *box)[0] == path
+    assert any(name.endswith(image_prep.ORIGINAL_MARKER) for name in os.listdir(tmp_path / image_prep.PREPARED_DIR))
+
+    saves = []
+    monkeypatch.setattr(Image.Image, "save", lambda *args, **kwargs: saves.append(args))
+    size = os.path.getsize(path)
+    assert prepare_image(path, *box) == (path, size, size)
+    assert saves == []
@@ -0,0 +1,25 @@
+import multiprocessing
+
+from src.image_store import ImageStore
+
+WORKERS = 4
+TITLES_PER_WORKER = 25
+
+
+def _record_titles(save_dir, worker):
+    store = ImageStore(save_dir)
+    for i in range(TITLES_PER_WORKER):
+        store.record(f"digest-{worker}-{i}", titles=[f"title {worker} {i}"])
+
+
+def test_concurrent_processes_keep_every_manifest_entry(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_record_titles, args=(str(tmp_path), worker)) for worker in range(WORKERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    titles = ImageStore(str(tmp_path)).load_manifest()["titles"]
+    assert len(titles) == WORKERS * TITLES_PER_WORKER
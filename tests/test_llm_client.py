@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from src import cache, metrics
+from src.cache import load_cache
+from src.llm_backends import LLMBackend
+from src.llm_client import LLMClient
+
+
+class FakeBackend(LLMBackend):
+    provider = "fake"
+
+    def __init__(self, model, chunks=("answer",), chunk_delay=0.0, error=None):
+        super().__init__(model)
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+        self.error = error
+        self.prompts = []
+        self.finished = threading.Event()
+
+    def _generate(self, prompt):
+        return "".join(self._stream(prompt))
+
+    def _stream(self, prompt):
+        self.prompts.append(prompt)
+        try:
+            if self.error:
+                raise self.error
+            for chunk in self.chunks:
+                time.sleep(self.chunk_delay)
+                yield chunk
+        finally:
+            self.finished.set()
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "_backend", cache.SQLiteCacheBackend(str(tmp_path / "cache.db")))
+    metrics.reset()
+
+
+def test_backends_are_abstract():
+    with pytest.raises(TypeError):
+        LLMBackend("model")
+
+
+def test_stages_are_routed_to_their_backends():
+    default, query = FakeBackend("default", ("default answer",)), FakeBackend("query", ("query answer",))
+    client = LLMClient(backend=default, stage_backends={"query": query})
+
+    assert client.generate("q", stage="query") == "query answer"
+    assert client.generate("s", stage="synthesis") == "default answer"
+    assert "".join(client.generate_stream("s2", stage="synthesis")) == "default answer"
+    assert query.prompts == ["q"]
+    assert default.prompts == ["s", "s2"]
+
+
+def test_a_slow_primary_is_hedged_and_cancelled():
+    primary = FakeBackend("primary", ("slow ",) * 100, chunk_delay=0.05)
+    hedge = FakeBackend("hedge", ("hedged answer",))
+    client = LLMClient(backend=primary, hedge_backend=hedge, hedge_delay=0.1, cache=True)
+
+    assert client.generate("prompt") == "hedged answer"
+    assert primary.finished.wait(1)
+    assert metrics.counter_value("llm_hedges", primary="fake:primary", hedge="fake:hedge") == 1
+    assert metrics.counter_value("llm_hedge_wins", backend="fake:hedge") == 1
+    # The hedge's answer belongs to the hedge model, not the primary
+    assert load_cache(client._cache_key("prompt", hedge)) == "hedged answer"
+    assert load_cache(client._cache_key("prompt", primary)) is None
+
+
+def test_a_failed_primary_falls_back_without_counting_a_hedge():
+    primary = FakeBackend("primary", error=RuntimeError("boom"))
+    hedge = FakeBackend("hedge", ("fallback answer",))
+    client = LLMClient(backend=primary, hedge_backend=hedge, hedge_delay=5)
+
+    started = time.perf_counter()
+    assert client.generate("prompt") == "fallback answer"
+    assert time.perf_counter() - started < 1
+    assert metrics.counter_value("llm_hedges", primary="fake:primary", hedge="fake:hedge") == 0
+    assert metrics.counter_value("llm_hedge_fallbacks", primary="fake:primary", hedge="fake:hedge") == 1
+
+
+def test_a_partly_read_stream_can_be_closed_from_another_thread():
+    backend = FakeBackend("stream", ("one ", "two ", "three"))
+    with metrics.span("outer"):
+        chunks = backend.stream("prompt")
+        assert next(chunks) == "one "
+    errors = []
+
+    def close():
+        try:
+            chunks.close()
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=close)
+    thread.start()
+    thread.join()
+    assert errors == []
+    spans = {record["name"]: record for record in metrics.snapshot()["spans"]}
+    assert spans["llm.stream"]["parent"] == spans["outer"]["id"]
+    assert spans["llm.stream"]["status"] == "error"
@@ -0,0 +1,135 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src import cache, metrics, page_fetcher
+
+ARTICLE = ("Solar power capacity grew faster than any other energy source during the last decade. "
+           "Falling module prices made utility scale projects cheaper than new coal plants in most markets.")
+
+ARTICLE_PAGE = f"""<html><head><title>Solar</title><script>var tracking = "script text should be dropped";</script></head>
+<body>
+<nav><ul><li>Home navigation link that is long enough to count as a block of text</li></ul></nav>
+<article><p>{ARTICLE}</p><p>{ARTICLE}</p><p>{ARTICLE}</p></article>
+<footer><p>Copyright footer text that is also long enough to count as a block of text</p></footer>
+</body></html>"""
+
+CAP_BYTES = 4096
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    requests = []
+    # /flaky answers 503 this many times before it recovers
+    outages = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/article":
+            self._send(200, ARTICLE_PAGE.encode(), [("Content-Type", "text/html; charset=utf-8")])
+        elif self.path == "/big":
+            body = f"<html><body><p>{ARTICLE}</p>".encode() + b" " * (CAP_BYTES * 4)
+            body += b"<p>Marker paragraph past the byte cap that must never be read by the fetcher.</p></body></html>"
+            self._send(200, body, [("Content-Type", "text/html")])
+        elif self.path == "/flaky":
+            if FixtureHandler.outages:
+                FixtureHandler.outages -= 1
+                self._send(503, headers=[("Retry-After", "0")])
+            else:
+                self._send(200, ARTICLE_PAGE.encode(), [("Content-Type", "text/html")])
+        elif self.path == "/gone":
+            self._send(404)
+        elif self.path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self._send(304, headers=[("ETag", '"v1"')])
+            else:
+                self._send(200, ARTICLE_PAGE.encode(), [("Content-Type", "text/html"), ("ETag", '"v1"')])
+        else:
+            self._send(404)
+
+
+@pytest.fixture
+def server():
+    FixtureHandler.requests = []
+    FixtureHandler.outages = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "_backend", cache.SQLiteCacheBackend(str(tmp_path / "cache.db")))
+    monkeypatch.setattr(page_fetcher, "PAGE_MAX_BYTES", CAP_BYTES)
+    metrics.reset()
+
+
+def test_extraction_keeps_the_article_and_drops_navigation_scripts_and_footers(server):
+    text = page_fetcher.fetch_page(f"{server}/article")
+    assert ARTICLE in text
+    for dropped in ("navigation link", "script text", "Copyright footer"):
+        assert dropped not in text
+
+
+def test_pages_over_the_byte_cap_are_truncated(server):
+    text = page_fetcher.fetch_page(f"{server}/big")
+    assert ARTICLE in text
+    assert "Marker paragraph" not in text
+    assert metrics.counter_value("pages_truncated") == 1
+    assert metrics.counter_value("page_bytes") <= CAP_BYTES
+
+
+def test_stale_pages_are_revalidated_without_a_full_fetch(server, monkeypatch):
+    first = page_fetcher.fetch_page(f"{server}/etag")
+    assert metrics.counter_value("pages", outcome="fetched") == 1
+
+    # Within PAGE_FRESH_SECONDS the cached text is used with no request at all
+    assert page_fetcher.fetch_page(f"{server}/etag") == first
+    assert len(FixtureHandler.requests) == 1
+
+    monkeypatch.setattr(page_fetcher, "PAGE_FRESH_SECONDS", 0)
+    assert page_fetcher.fetch_page(f"{server}/etag") == first
+    assert FixtureHandler.requests[-1] == ("/etag", '"v1"')
+    assert metrics.counter_value("pages", outcome="revalidated") == 1
+    assert metrics.counter_value("pages", outcome="fetched") == 1
+
+
+def test_server_errors_are_not_cached(server):
+    FixtureHandler.outages = 2
+    assert page_fetcher.fetch_page(f"{server}/flaky") == ""
+    assert metrics.counter_value("pages", outcome="failed") == 1
+
+    # The next call asks again instead of trusting a cached empty page
+    assert ARTICLE in page_fetcher.fetch_page(f"{server}/flaky")
+    assert len(FixtureHandler.requests) == 3
+
+
+def test_server_errors_fall_back_to_the_stale_copy(server, monkeypatch):
+    first = page_fetcher.fetch_page(f"{server}/flaky")
+    monkeypatch.setattr(page_fetcher, "PAGE_FRESH_SECONDS", 0)
+
+    FixtureHandler.outages = 2
+    assert page_fetcher.fetch_page(f"{server}/flaky") == first
+    FixtureHandler.outages = 2
+    assert page_fetcher.fetch_page(f"{server}/flaky") == first
+
+
+def test_missing_pages_are_remembered(server):
+    assert page_fetcher.fetch_page(f"{server}/gone") == ""
+    assert page_fetcher.fetch_page(f"{server}/gone") == ""
+    assert len(FixtureHandler.requests) == 1
+    assert metrics.counter_value("pages", outcome="cached") == 1
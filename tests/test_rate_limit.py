@@ -0,0 +1,52 @@
+import time
+
+import pytest
+
+from src import metrics, rate_limit
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    for name in ("RATE_LIMIT_PEXELS_REQUESTS", "RATE_LIMIT_GEMINI_REQUESTS", "RATE_LIMIT_GEMINI_TOKENS"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(rate_limit, "_limits", {})
+    metrics.reset()
+    return rate_limit.Scheduler(rate_limit.MemoryState())
+
+
+def test_50_image_deck_is_not_throttled_with_default_limits(scheduler):
+    started = time.perf_counter()
+    for _ in range(50):
+        with scheduler.acquire("pexels"):
+            pass
+    assert time.perf_counter() - started < 1
+    assert metrics.counter_value("rate_limit_waits", provider="pexels") == 0
+
+
+def test_query_and_synthesis_calls_do_not_wait_with_default_limits(scheduler):
+    for _ in range(2):
+        with scheduler.acquire("gemini", tokens=2000):
+            pass
+    assert metrics.counter_value("rate_limit_waits", provider="gemini") == 0
+
+
+def _admitted_in_first_window(quota, seconds):
+    """Calls admitted during the first `seconds` when callers retry as soon as they are told to."""
+    buckets = {"requests": rate_limit._bucket(quota)}
+    levels, now, admitted = {}, 0.0, 0
+    while True:
+        wait, levels = rate_limit._plan(buckets, {"requests": 1}, levels, now)
+        now += wait
+        if now >= seconds:
+            return admitted
+        if not wait:
+            admitted += 1
+
+
+@pytest.mark.parametrize("quota, count, seconds", [("15/60", 15, 60), ("200/3600", 200, 3600), ("2/60", 2, 60)])
+def test_per_minute_quotas_stay_within_their_window(quota, count, seconds):
+    capacity, rate, window = rate_limit._bucket(quota)
+    assert capacity + rate * seconds <= count
+    assert _admitted_in_first_window(quota, seconds) <= count
+    # The next window gets its own quota
+    assert _admitted_in_first_window(quota, 2 * seconds) <= 2 * count
@@ -0,0 +1,68 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from src import service as service_module
+from src.service import RenderService, make_handler
+
+
+@pytest.fixture
+def server(tmp_path):
+    template = tmp_path / "template.pptx"
+    template.write_bytes(b"")
+    # Validation runs before any pipeline state is touched, so no workers are needed
+    service = object.__new__(RenderService)
+    service.default_template = str(template)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _post(url, body):
+    request = urllib.request.Request(f"{url}/jobs", data=body, method="POST")
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+@pytest.mark.parametrize("body", [
+    b"[]",
+    b'"topic"',
+    b"42",
+    b"null",
+    b"not json",
+    b'{"topic": ["a", "list"]}',
+    b'{"topic": "AI", "template": {"a": 1}}',
+    b'{"topic": "AI", "priority": ["interactive"]}',
+])
+def test_malformed_payloads_are_rejected_with_400(server, body):
+    status, response = _post(server, body)
+    assert status == 400
+    assert response["error"]
+
+
+def test_trimmed_jobs_have_their_decks_deleted(tmp_path, monkeypatch):
+    monkeypatch.setattr(service_module, "SERVICE_JOB_HISTORY", 1)
+    service = object.__new__(RenderService)
+    service.jobs_lock = threading.Lock()
+    service.jobs = {}
+    for i, job_id in enumerate(["old", "new"]):
+        output = tmp_path / f"{job_id}.pptx"
+        output.write_bytes(b"deck")
+        service.jobs[job_id] = {"id": job_id, "status": "done", "output": str(output), "submitted_at": time.time() + i}
+    (tmp_path / "old.spec.json").write_text("{}")
+
+    service._trim_history()
+
+    assert list(service.jobs) == ["new"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["new.pptx"]
@@ -0,0 +1,11 @@
+import logging
+
+from src import synthesizer
+
+
+def test_unparseable_responses_fall_back_with_a_logged_warning(caplog, capsys):
+    with caplog.at_level(logging.WARNING, logger="src.synthesizer"):
+        slides = synthesizer._parse_response("AI", "```json\n{not json\n```")
+    assert slides == [{"title": "Summary: AI", "content": "```json\n{not json\n```"}]
+    assert "Failed to parse JSON response" in caplog.text
+    assert capsys.readouterr().err == ""
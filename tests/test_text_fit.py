@@ -0,0 +1,23 @@
+import pytest
+from PIL import ImageFont
+
+from src import text_fit
+from src.text_fit import FontMetrics, REFERENCE_SIZE
+
+
+def _old_pillow_load_default(*args):
+    if args:
+        raise TypeError("load_default() takes 0 positional arguments but 1 was given")
+    return ImageFont.load_default_imagefont()
+
+
+@pytest.mark.skipif(not hasattr(ImageFont, "load_default_imagefont"), reason="needs the bitmap font loader")
+def test_pillow_without_a_sized_default_font_falls_back_to_the_scaled_bitmap_font(monkeypatch):
+    monkeypatch.setattr(text_fit, "TEXT_FIT_FONT", None)
+    monkeypatch.setattr(text_fit, "FONT_CANDIDATES", ())
+    monkeypatch.setattr(ImageFont, "load_default", _old_pillow_load_default)
+
+    metrics = FontMetrics(*text_fit._load_font())
+    assert metrics.name == "pillow-bitmap"
+    # Roughly an average glyph width at REFERENCE_SIZE, not at the bitmap's 11 pixels
+    assert REFERENCE_SIZE * 0.3 < metrics.text_width("M") < REFERENCE_SIZE * 1.5
@@ -0,0 +1,64 @@
+import multiprocessing
+
+import pytest
+
+from src import topic_index
+from src.topic_index import TopicIndex
+
+RESULTS = [{"title": "Result", "snippet": "Snippet", "link": "https://example.com/1"}]
+
+DIFFERENT_SUBJECTS = [
+    ("History of machine learning in healthcare", "History of machine learning in finance"),
+    ("Climate change impacts on agriculture", "Climate change impacts on tourism"),
+    ("Renewable energy policy in Germany", "Renewable energy policy in India"),
+]
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    index = TopicIndex(path=str(tmp_path / "topic_index.json"))
+    monkeypatch.setattr(topic_index, "_index", index)
+    return index
+
+
+@pytest.mark.parametrize("recorded, asked", DIFFERENT_SUBJECTS)
+def test_topics_with_a_different_subject_word_are_not_reused(index, recorded, asked):
+    index.record(recorded, "query", RESULTS, 5)
+    assert topic_index.find_similar_topic(asked, 5) is None
+
+
+@pytest.mark.parametrize("recorded, asked", [
+    ("AI in Business", "AI for Business"),
+    ("Machine learning for retail supply chains", "An overview of machine learning for retail supply chains"),
+])
+def test_near_identical_topics_are_reused(index, recorded, asked):
+    index.record(recorded, "recorded query", RESULTS, 5)
+    assert topic_index.find_similar_topic(asked, 5) == ("recorded query", RESULTS)
+
+
+def test_reuse_requires_the_same_subquery_count(index):
+    index.record("AI in Business", "single query", RESULTS, 5, subqueries=1)
+    assert topic_index.find_similar_topic("AI for Business", 5, subqueries=4) is None
+
+    index.record("AI in Business", "fan-out query", RESULTS, 5, subqueries=4)
+    assert topic_index.find_similar_topic("AI for Business", 5, subqueries=4)[0] == "fan-out query"
+    assert topic_index.find_similar_topic("AI for Business", 5, subqueries=1)[0] == "single query"
+
+
+def _record_topics(path, worker):
+    index = TopicIndex(path=path)
+    for i in range(10):
+        index.record(f"worker{worker} subject{i}", "query", RESULTS, 5)
+
+
+def test_concurrent_processes_keep_every_topic(tmp_path):
+    path = str(tmp_path / "topic_index.json")
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_record_topics, args=(path, worker)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    assert len(TopicIndex(path=path).entries) == 40